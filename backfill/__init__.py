@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史公告回填模块
+并发翻取监控目标的全部历史分页，批量写入数据库，不发送通知；
+进度按页保存在数据库中，中断后可从上次完成的位置继续。
+第一页和比目标水位线新的公告留给常规监控处理，回填不会抢先入库而使这些新公告漏发通知
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import MONITOR_CONFIG
+from crawler import APICrawler
+from extraction import extract_fields
+from utils import get_keyword_matcher, rate_limiters
+import metrics
+
+logger = logging.getLogger('GrainMonitor')
+
+
+class HistoricalBackfill:
+    """
+    单个监控目标的历史公告回填
+    同时在途的页数不超过window，各页完成顺序不定，只有连续完成的页写入数据库后才推进检查点，
+    因此检查点之前的公告一定已入库；恢复时重复抓取的少量公告由入库去重忽略。
+    回填从第二页开始，只写入发布时间不晚于截止时间（开始时目标的水位线）的公告
+    """
+    
+    # 常规监控抓取的页数，回填跳过这些页
+    LIVE_PAGES = 1
+    
+    def __init__(self, target, db_manager, crawler=None, backfill_config=None):
+        """
+        :param target: 监控目标配置（仅支持api类型）
+        :param db_manager: 数据库管理器
+        :param crawler: API爬虫（可选）
+        :param backfill_config: 回填配置（可选，默认使用MONITOR_CONFIG['backfill']）
+        """
+        config = backfill_config if backfill_config is not None else MONITOR_CONFIG.get('backfill', {})
+        self.target = target
+        self.name = target['name']
+        self.db_manager = db_manager
+        self.crawler = crawler or APICrawler()
+        
+        self.page_size = target.get('backfill_page_size', config.get('page_size', 100))
+        self.window = max(1, config.get('window', 8))
+        self.batch_size = config.get('batch_size', 1000)
+        self.max_pages = config.get('max_pages', 0)
+        self.checkpoint_interval = config.get('checkpoint_interval', 5)
+        
+        # 与常规监控使用相同的关键词过滤
+        self.matcher = get_keyword_matcher(MONITOR_CONFIG.get('keywords', []) + target.get('keywords', []))
+        # 发布时间晚于该时间的公告由常规监控入库并通知，在run()开始时确定
+        self.cutoff = None
+    
+    def _fetch_page(self, page):
+        """
+        抓取并解析一页公告
+        
+        :param page: 页码
+        :return: (该页原始公告数量, 通过关键词过滤的公告列表)
+        """
+        with metrics.target_scope(self.name):
+            with metrics.stage_timer('fetch'):
+                raw_items = self.crawler.fetch_announcements(
+                    self.target['api_url'], self.target['tag_id'], self.target['article_type'], page, self.page_size
+                )
+            
+            announcements = []
+            with metrics.stage_timer('parse'):
+                for item in raw_items:
+                    announcement = self.crawler.parse_announcement(item)
+                    if not announcement:
+                        continue
+                    # 列表在回填期间会后移，新发布的公告可能出现在任意一页，留给常规监控
+                    if self.cutoff and (announcement.get('pub_date') or '') > self.cutoff:
+                        continue
+                    if self.matcher.match(announcement.get('title', '')) or not self.matcher:
+                        announcements.append(extract_fields(announcement))
+        
+        metrics.BACKFILL_PAGES.inc(target=self.name)
+        metrics.ITEMS.inc(len(raw_items), target=self.name)
+        return len(raw_items), announcements
+    
+    def _start_page(self, checkpoint):
+        """
+        根据检查点计算起始页码，分页大小改变时按已完成的公告数量换算；常规监控抓取的页不回填
+        
+        :param checkpoint: 检查点字典（可为None）
+        :return: 起始页码
+        """
+        if not checkpoint or not checkpoint['completed_pages']:
+            return self.LIVE_PAGES + 1
+        completed_items = checkpoint['completed_pages'] * checkpoint['page_size']
+        return max(completed_items // self.page_size + 1, self.LIVE_PAGES + 1)
+    
+    def _get_cutoff(self):
+        """
+        确定回填的截止发布时间：目标已有水位线时为水位线的发布时间，
+        否则为当前第一页最后一条公告的发布时间（常规监控首次运行时处理第一页）
+        
+        :return: 发布时间字符串，无法确定时返回None
+        """
+        watermark = self.db_manager.get_watermark(self.name)
+        if watermark and watermark.get('last_publish_time'):
+            return watermark['last_publish_time']
+        
+        raw_items = self.crawler.fetch_announcements(
+            self.target['api_url'], self.target['tag_id'], self.target['article_type'], 1, self.page_size
+        )
+        pub_dates = [announcement.get('pub_date') for announcement in map(self.crawler.parse_announcement, raw_items)
+                     if announcement and announcement.get('pub_date')]
+        return min(pub_dates) if pub_dates else None
+    
+    def run(self, restart=False):
+        """
+        执行回填，直到最后一页、达到最大页数或抓取失败
+        
+        :param restart: 是否忽略检查点重新开始
+        :return: 回填结果字典（status、pages、items、new_items、elapsed），items和new_items为含以往进度的累计值
+        """
+        checkpoint = None if restart else self.db_manager.get_backfill_checkpoint(self.name)
+        if checkpoint and checkpoint['status'] == 'done':
+            logger.info(f"目标 {self.name} 的历史回填已完成（共 {checkpoint['items']} 条公告），"
+                        f"如需重新回填请使用--restart")
+            return {'status': 'done', 'pages': 0, 'items': 0, 'new_items': 0, 'elapsed': 0.0}
+        
+        first_page = self._start_page(checkpoint)
+        items = checkpoint['items'] if checkpoint else 0
+        new_items = checkpoint['new_items'] if checkpoint else 0
+        self.cutoff = self._get_cutoff()
+        logger.info(f"开始回填目标 {self.name} 的历史公告，从第 {first_page} 页开始，"
+                    f"每页 {self.page_size} 条，同时抓取 {self.window} 页，只回填 {self.cutoff or '-'} 及之前发布的公告")
+        
+        start = time.monotonic()
+        next_page = first_page
+        frontier = first_page - 1  # 已连续完成并入库的最后一页
+        last_page = self.max_pages or None  # 遇到不满一页的响应后确定最后一页
+        finished = {}
+        buffer = []
+        pages = 0
+        status = 'running'
+        error = None
+        insert_failed = False
+        last_checkpoint = frontier
+        # 已保存到检查点的进度，入库失败时检查点停留在此
+        saved_pages = frontier
+        saved_items = items
+        
+        def flush():
+            """
+            批量写入缓冲区中的公告，成功后推进检查点
+            
+            :return: 写入成功返回True；失败时检查点保持不变并标记为failed
+            """
+            nonlocal new_items, items, status, error, insert_failed, last_checkpoint, saved_pages, saved_items
+            if buffer:
+                try:
+                    with metrics.stage_timer('db_insert', self.name):
+                        inserted = self.db_manager.batch_insert_announcements(buffer)
+                except Exception as e:
+                    status = 'failed'
+                    error = f"批量入库失败: {str(e)}"
+                    insert_failed = True
+                    items = saved_items
+                    logger.error(f"目标 {self.name} 回填{error}，检查点保持在第 {saved_pages} 页")
+                    self.db_manager.save_backfill_checkpoint(
+                        self.name, self.page_size, saved_pages, saved_items, new_items, status, error
+                    )
+                    return False
+                new_items += len(inserted)
+                metrics.NEW_ITEMS.inc(len(inserted), target=self.name)
+                buffer.clear()
+            saved_pages = min(frontier, last_page) if last_page else frontier
+            saved_items = items
+            self.db_manager.save_backfill_checkpoint(
+                self.name, self.page_size, saved_pages, saved_items, new_items, status, error
+            )
+            last_checkpoint = frontier
+            return True
+        
+        executor = ThreadPoolExecutor(max_workers=self.window, thread_name_prefix='backfill')
+        in_flight = {}
+        try:
+            while True:
+                # 保持窗口内有window页在途，出错后不再提交新页
+                while (error is None and len(in_flight) < self.window
+                       and (last_page is None or next_page <= last_page)):
+                    in_flight[executor.submit(self._fetch_page, next_page)] = next_page
+                    next_page += 1
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        raw_count, announcements = future.result()
+                    except Exception as e:
+                        if error is None:
+                            error = f"第 {page} 页抓取失败: {str(e)}"
+                            logger.error(f"目标 {self.name} 回填{error}，将保存检查点后停止")
+                        continue
+                    
+                    finished[page] = announcements
+                    pages += 1
+                    if raw_count < self.page_size and (last_page is None or page < last_page):
+                        last_page = page
+                
+                # 按页码顺序推进，连续完成的页才放入写入缓冲区
+                while frontier + 1 in finished:
+                    frontier += 1
+                    announcements = finished.pop(frontier)
+                    buffer.extend(announcements)
+                    items += len(announcements)
+                
+                if len(buffer) >= self.batch_size or frontier - last_checkpoint >= self.checkpoint_interval:
+                    if not flush():
+                        break
+            
+            status = 'failed' if error else 'done'
+        except KeyboardInterrupt:
+            status = 'interrupted'
+            logger.info(f"目标 {self.name} 回填被中断，保存检查点")
+            raise
+        finally:
+            # 在途的页数不超过线程数，没有排队等待的任务，等待其完成即可
+            executor.shutdown(wait=True)
+            if status == 'running':
+                status = 'failed'
+            if not insert_failed:
+                flush()
+            
+            elapsed = time.monotonic() - start
+            logger.info(f"目标 {self.name} 回填{'完成' if status == 'done' else '停止'}: 本次抓取 {pages} 页，"
+                        f"累计 {items} 条公告（新入库 {new_items} 条），耗时 {elapsed:.1f}秒")
+        
+        return {'status': status, 'pages': pages, 'items': items, 'new_items': new_items, 'elapsed': elapsed}
+
+
+def run_backfill(targets, db_manager, restart=False):
+    """
+    依次回填多个监控目标的历史公告
+    回填通常在单独的进程中运行，按主机限流只在进程内生效，回填的请求速率按rate_limit_scale降低，
+    与常规监控合计不超过配置速率的(1 + rate_limit_scale)倍
+    
+    :param targets: 监控目标配置列表，只回填api类型的目标
+    :param db_manager: 数据库管理器
+    :param restart: 是否忽略检查点重新开始
+    :return: 目标名称到回填结果的映射
+    """
+    previous_scale = rate_limiters.set_scale(MONITOR_CONFIG.get('backfill', {}).get('rate_limit_scale', 0.5))
+    crawler = APICrawler()
+    results = {}
+    try:
+        for target in targets:
+            if target.get('type', 'api') != 'api':
+                logger.warning(f"目标 {target['name']} 不是api类型，列表页不支持翻页，跳过回填")
+                continue
+            try:
+                results[target['name']] = HistoricalBackfill(target, db_manager, crawler).run(restart)
+            except Exception as e:
+                logger.error(f"目标 {target['name']} 回填失败: {str(e)}")
+                results[target['name']] = {'status': 'failed', 'error': str(e)}
+    finally:
+        rate_limiters.set_scale(previous_scale)
+    return results
@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能基准测试模块
+提供模拟国家粮食交易中心接口的本地服务器、模拟SMTP服务器和端到端基准测试
+"""
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时基准测试
+在全新的解释器进程中多次导入main模块，统计导入耗时和进程总耗时，
+并检查单次运行（--no-scheduler）用不到的重量级依赖没有在导入时加载
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_import_time --runs 10 --max-ms 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# 项目根目录
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 应在真正使用时才导入的模块：定时调度、网页解析、邮件发送、指标接口、性能分析和协程
+LAZY_MODULES = ('apscheduler', 'bs4', 'lxml', 'smtplib', 'email.mime', 'http.server', 'pstats', 'asyncio')
+
+# 子进程中执行的脚本：计时导入main，并报告已加载的重量级模块和日志处理器
+PROBE_SCRIPT = """
+import sys, json, time, logging
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+lazy = %r
+print(json.dumps({
+    'import_ms': elapsed * 1000,
+    'loaded': sorted(name for name in sys.modules if any(name == m or name.startswith(m + '.') for m in lazy)),
+    'log_handlers': len(logging.getLogger('GrainMonitor').handlers)
+}))
+""" % (LAZY_MODULES,)
+
+
+def run_probe(extra_args=()):
+    """
+    在新进程中执行一次导入
+    
+    :param extra_args: 额外的解释器参数
+    :return: (探测结果字典, 进程总耗时秒数, 标准错误输出)
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *extra_args, '-c', PROBE_SCRIPT],
+        cwd=ROOT_DIR, capture_output=True, text=True, encoding='utf-8'
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"导入main失败:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), wall, completed.stderr
+
+
+def parse_importtime(stderr, top_n):
+    """
+    解析-X importtime的输出，取main直接导入的模块中累计耗时最多的几个
+    
+    :param stderr: 解释器的标准错误输出
+    :param top_n: 返回的模块数量
+    :return: [(模块名, 自身耗时ms, 累计耗时ms)] 列表
+    """
+    children = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0:
+            # 子模块先于父模块输出，遇到顶层的main时，之前收集的即为main的直接依赖
+            if name == 'main':
+                break
+            children = []
+        elif depth == 1:
+            children.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    children.sort(key=lambda item: item[2], reverse=True)
+    return children[:top_n]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run(args):
+    """
+    执行基准测试
+    
+    :return: 测试结果字典
+    """
+    # 第一次运行预热文件系统缓存和字节码缓存，不计入统计
+    run_probe()
+    
+    import_samples = []
+    wall_samples = []
+    loaded = set()
+    log_handlers = 0
+    for _ in range(args.runs):
+        result, wall, _ = run_probe()
+        import_samples.append(result['import_ms'])
+        wall_samples.append(wall * 1000)
+        loaded.update(result['loaded'])
+        log_handlers = max(log_handlers, result['log_handlers'])
+    
+    _, _, stderr = run_probe(('-X', 'importtime'))
+    
+    return {
+        'runs': args.runs,
+        'import_ms': {
+            'p50': percentile(import_samples, 50),
+            'p95': percentile(import_samples, 95),
+            'min': min(import_samples)
+        },
+        'process_ms': {
+            'p50': percentile(wall_samples, 50),
+            'p95': percentile(wall_samples, 95)
+        },
+        'eager_lazy_modules': sorted(loaded),
+        'log_handlers_after_import': log_handlers,
+        'top_imports': [
+            {'module': name, 'self_ms': self_ms, 'cumulative_ms': cumulative_ms}
+            for name, self_ms, cumulative_ms in parse_importtime(stderr, args.top)
+        ]
+    }
+
+
+def print_report(report):
+    print("=" * 78)
+    print(f"启动耗时基准测试: 导入main {report['runs']} 次")
+    print("=" * 78)
+    imports = report['import_ms']
+    process = report['process_ms']
+    print(f"导入main耗时: p50 {imports['p50']:.1f}ms  p95 {imports['p95']:.1f}ms  min {imports['min']:.1f}ms")
+    print(f"进程总耗时（含解释器启动）: p50 {process['p50']:.1f}ms  p95 {process['p95']:.1f}ms")
+    if report['eager_lazy_modules']:
+        print(f"导入时加载了应延迟导入的模块: {', '.join(report['eager_lazy_modules'])}")
+    else:
+        print("未加载应延迟导入的模块")
+    if report['log_handlers_after_import']:
+        print(f"导入时已配置 {report['log_handlers_after_import']} 个日志处理器")
+    print("-" * 78)
+    print(f"{'main直接导入的模块':<30}{'自身ms':>12}{'累计ms':>12}")
+    for item in report['top_imports']:
+        print(f"{item['module']:<30}{item['self_ms']:>12.1f}{item['cumulative_ms']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='粮食公告监控启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=10, help='导入次数')
+    parser.add_argument('--top', type=int, default=10, help='输出累计耗时最多的模块数量')
+    parser.add_argument('--max-ms', type=float, default=0, help='导入耗时p50上限（毫秒），超过时返回非零退出码，0表示不检查')
+    parser.add_argument('--json', help='将结果以JSON格式写入指定文件')
+    args = parser.parse_args()
+    
+    report = run(args)
+    print_report(report)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    
+    failed = bool(report['eager_lazy_modules']) or bool(report['log_handlers_after_import'])
+    if args.max_ms and report['import_ms']['p50'] > args.max_ms:
+        print(f"导入耗时p50超过上限 {args.max_ms:.0f}ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
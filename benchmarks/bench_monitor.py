@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+监控任务端到端基准测试
+在本地模拟接口和SMTP服务器上执行若干次monitor_task，统计吞吐量、各阶段耗时分位数和内存峰值
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_monitor --targets 60 --announcements 200 --ticks 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import functools
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONITOR_CONFIG, LOG_CONFIG
+from utils import extract_domain
+from benchmarks.fake_grainmarket import FakeGrainMarketServer
+from benchmarks.fake_smtp import FakeSMTPServer
+
+
+class StageTimer:
+    """
+    阶段耗时记录器
+    包装各模块的关键方法，记录每次调用的耗时
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self._patched = []
+    
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+    
+    def wrap(self, stage, owner, name):
+        original = getattr(owner, name)
+        timer = self
+        
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer.record(stage, time.perf_counter() - start)
+        
+        setattr(owner, name, wrapper)
+        self._patched.append((owner, name, original))
+    
+    def restore(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+
+
+def percentile(values, pct):
+    """
+    计算分位数（最近秩法）
+    
+    :param values: 数值列表
+    :param pct: 百分位（0-100）
+    :return: 分位数
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "total_ms": sum(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0
+    }
+
+
+def configure(args, workdir, api_server, smtp_server):
+    """
+    将配置指向临时数据库、模拟接口和模拟SMTP服务器
+    """
+    LOG_CONFIG['level'] = args.log_level
+    LOG_CONFIG['file_path'] = os.path.join(workdir, 'bench.log')
+    
+    MONITOR_CONFIG['storage']['file_path'] = os.path.join(workdir, 'bench.db')
+    MONITOR_CONFIG['concurrency']['max_workers'] = args.workers
+    MONITOR_CONFIG['request']['pool_maxsize'] = max(args.workers, MONITOR_CONFIG['request'].get('pool_maxsize', 10))
+    MONITOR_CONFIG['detail']['enabled'] = not args.no_detail
+    
+    # 默认不对本地模拟服务器限流，指定--rate-limit时按该速率限流
+    rate_limit_config = MONITOR_CONFIG['request']['rate_limit']
+    rate_limit_config['enabled'] = args.rate_limit > 0
+    rate_limit_config['domains'][extract_domain(api_server.base_url)] = {
+        "rate": args.rate_limit or 1.0,
+        "max_rate": args.rate_limit or 1.0,
+        "burst": args.workers
+    }
+    MONITOR_CONFIG['keywords'] = ["竞价销售"]
+    MONITOR_CONFIG['targets'] = [
+        {
+            "name": f"基准测试目标-{i}",
+            "type": "api",
+            "api_url": api_server.api_url,
+            "tag_id": "3",
+            "article_type": str(i),
+            "keywords": ["进口大豆", "玉米", "小麦"]
+        }
+        for i in range(args.targets)
+    ]
+    
+    notification_config = MONITOR_CONFIG['notification']
+    notification_config['enabled'] = True
+    notification_config['email'].update({
+        "smtp_server": smtp_server.host,
+        "smtp_port": smtp_server.port,
+        "use_ssl": False,
+        "username": "bench@example.com",
+        "password": "bench",
+        "recipient": "bench@example.com"
+    })
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='grain_bench_')
+    api_server = FakeGrainMarketServer(args.latency, args.latency_jitter, args.error_rate).start()
+    smtp_server = FakeSMTPServer(args.smtp_latency).start()
+    
+    configure(args, workdir, api_server, smtp_server)
+    
+    # 配置完成后再导入业务模块
+    import main
+    import crawler
+    import database
+    import notification
+    import utils
+    utils.setup_logger()
+    
+    timer = StageTimer()
+    timer.wrap('fetch', crawler.APICrawler, 'fetch_announcements')
+    timer.wrap('parse', crawler.APICrawler, 'parse_announcement')
+    timer.wrap('keyword_filter', utils.KeywordMatcher, 'match')
+    timer.wrap('db_insert', database.DatabaseManager, 'batch_insert_announcements')
+    timer.wrap('notify', notification.NotificationManager, 'notify_new_announcements')
+    timer.wrap('smtp_send', notification.OutboxSender, 'flush')
+    timer.wrap('detail_fetch', crawler.DetailFetcher, '_fetch_and_store')
+    
+    for target in MONITOR_CONFIG['targets']:
+        api_server.publish(target['article_type'], args.announcements)
+    
+    # 与定时运行一样，所有监控任务复用同一个运行时上下文
+    runtime = main.MonitorRuntime()
+    
+    if args.trace_memory:
+        tracemalloc.start()
+    
+    tick_times = []
+    stored_before = runtime.db_manager.count_announcements()
+    started = time.perf_counter()
+    for tick in range(args.ticks):
+        if tick > 0:
+            for target in MONITOR_CONFIG['targets']:
+                api_server.publish(target['article_type'], args.new_per_tick)
+        
+        tick_start = time.perf_counter()
+        main.monitor_task(runtime=runtime)
+        outbox_sender = runtime.outbox_sender
+        if outbox_sender:
+            outbox_sender.flush()
+        tick_times.append(time.perf_counter() - tick_start)
+    
+    # monitor_task返回的是关键词过滤前的新发布数量，新入库的公告数量按数据库统计
+    new_total = runtime.db_manager.count_announcements() - stored_before
+    detail_start = time.perf_counter()
+    runtime.shutdown_detail_fetcher(wait=True)
+    detail_drain = time.perf_counter() - detail_start
+    elapsed = time.perf_counter() - started
+    runtime.close()
+    
+    peak_memory = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+    if args.trace_memory:
+        tracemalloc.stop()
+    
+    timer.restore()
+    api_server.stop()
+    smtp_server.stop()
+    
+    parsed_total = len(timer.samples.get('parse', []))
+    tick_total = sum(tick_times)
+    report = {
+        "params": vars(args),
+        "ticks": summarize(tick_times),
+        "throughput_items_per_s": parsed_total / tick_total if tick_total else 0.0,
+        "announcements_parsed": parsed_total,
+        "announcements_new": new_total,
+        "detail_drain_ms": detail_drain * 1000,
+        "elapsed_s": elapsed,
+        "peak_traced_memory_mb": peak_memory / 1024 / 1024 if peak_memory is not None else None,
+        "stages": {stage: summarize(samples) for stage, samples in sorted(timer.samples.items())},
+        "api_requests": api_server.request_count,
+        "api_errors": api_server.error_count,
+        "smtp_messages": smtp_server.message_count,
+        "smtp_connections": smtp_server.connection_count
+    }
+    return report
+
+
+def print_report(report):
+    ticks = report['ticks']
+    print("=" * 78)
+    print(f"监控任务基准测试: {report['params']['targets']} 个目标, "
+          f"初始 {report['params']['announcements']} 条公告/目标, {report['params']['ticks']} 次执行")
+    print("=" * 78)
+    print(f"单次执行耗时: p50 {ticks['p50_ms']:.1f}ms  p95 {ticks['p95_ms']:.1f}ms  max {ticks['max_ms']:.1f}ms")
+    print(f"吞吐量: {report['throughput_items_per_s']:.1f} 条/秒 "
+          f"（解析 {report['announcements_parsed']} 条，新公告 {report['announcements_new']} 条）")
+    print(f"正文抓取收尾耗时: {report['detail_drain_ms']:.1f}ms")
+    if report['peak_traced_memory_mb'] is not None:
+        print(f"内存峰值（tracemalloc）: {report['peak_traced_memory_mb']:.2f}MB")
+    print(f"接口请求 {report['api_requests']} 次（失败 {report['api_errors']} 次），"
+          f"SMTP 邮件 {report['smtp_messages']} 封 / 连接 {report['smtp_connections']} 次")
+    print("-" * 78)
+    print(f"{'阶段':<16}{'次数':>8}{'总计ms':>12}{'p50ms':>10}{'p95ms':>10}{'p99ms':>10}{'maxms':>10}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<16}{stats['count']:>8}{stats['total_ms']:>12.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='粮食公告监控端到端基准测试')
+    parser.add_argument('--targets', type=int, default=20, help='监控目标数量')
+    parser.add_argument('--announcements', type=int, default=100, help='每个目标初始公告数量')
+    parser.add_argument('--new-per-tick', type=int, default=5, help='每次执行前每个目标新发布的公告数量')
+    parser.add_argument('--ticks', type=int, default=5, help='执行监控任务的次数')
+    parser.add_argument('--workers', type=int, default=8, help='并发抓取数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟接口延迟（秒）')
+    parser.add_argument('--latency-jitter', type=float, default=0.02, help='模拟接口延迟波动（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟接口错误率')
+    parser.add_argument('--smtp-latency', type=float, default=0.0, help='模拟SMTP每封邮件延迟（秒）')
+    parser.add_argument('--no-detail', action='store_true', help='不抓取公告正文')
+    parser.add_argument('--rate-limit', type=float, default=0, help='对模拟服务器的限流速率（请求/秒），0表示不限流')
+    parser.add_argument('--no-trace-memory', dest='trace_memory', action='store_false',
+                        help='不使用tracemalloc统计内存峰值')
+    parser.add_argument('--log-level', default='WARNING', help='日志级别')
+    parser.add_argument('--json', help='将结果以JSON格式写入指定文件')
+    args = parser.parse_args()
+    
+    report = run(args)
+    print_report(report)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模拟国家粮食交易中心接口
+在本地模拟 https://www.grainmarket.com.cn/centerweb/getData 的分页列表接口和公告详情页
+"""
+
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+COMMODITIES = ["进口大豆", "玉米", "小麦", "稻谷", "菜籽油", "棉花"]
+
+
+class FakeGrainMarketServer:
+    """
+    模拟公告接口服务器
+    每个articleTypeID对应一个独立的公告列表，支持分页、可配置的延迟和错误率
+    """
+    
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, host='127.0.0.1', port=0):
+        """
+        :param latency: 每个请求的固定延迟（秒）
+        :param latency_jitter: 延迟的随机波动上限（秒）
+        :param error_rate: 返回HTTP 500的概率
+        :param host: 监听地址
+        :param port: 监听端口，0表示随机端口
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        
+        self._lock = threading.Lock()
+        self._listings = {}
+        self._next_id = 0
+        self.request_count = 0
+        self.error_count = 0
+        
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def api_url(self):
+        return f"{self.base_url}/centerweb/getData"
+    
+    def publish(self, article_type, count):
+        """
+        在指定分类下发布新公告，新公告排在列表最前
+        
+        :param article_type: 文章类型（articleTypeID）
+        :param count: 发布数量
+        """
+        with self._lock:
+            listing = self._listings.setdefault(str(article_type), [])
+            new_items = []
+            for _ in range(count):
+                self._next_id += 1
+                item_id = self._next_id
+                commodity = COMMODITIES[item_id % len(COMMODITIES)]
+                now = time.localtime()
+                day = time.strftime('%Y-%m-%d', now)
+                new_items.append({
+                    "title": f"{now.tm_year}年{now.tm_mon}月{now.tm_mday}日{commodity}竞价销售交易公告（第{item_id}期）",
+                    "contentUrl": f"{self.base_url}/detail/{item_id}.html",
+                    "publishtime": f"{day} {time.strftime('%H:%M:%S', now)}"
+                })
+            # 列表按发布时间从新到旧排列
+            listing[:0] = reversed(new_items)
+    
+    def _page(self, article_type, page, page_size):
+        with self._lock:
+            listing = self._listings.get(str(article_type), [])
+            start = (page - 1) * page_size
+            return listing[start:start + page_size]
+    
+    def _simulate_network(self):
+        delay = self.latency + random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+        
+        with self._lock:
+            self.request_count += 1
+            failed = random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return failed
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                
+                if server._simulate_network():
+                    self._send(500, b'Internal Server Error', 'text/plain')
+                    return
+                
+                try:
+                    params = json.loads(form['param'][0])
+                    page = int(params.get('indexid', 1))
+                    page_size = int(params.get('pagesize', 20))
+                    items = server._page(params.get('articleTypeID'), page, page_size)
+                    payload = {"code": "001", "msg": "成功", "data": items}
+                except (KeyError, ValueError) as e:
+                    payload = {"code": "002", "msg": f"参数错误: {e}", "data": []}
+                
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self._send(200, body, 'application/json;charset=UTF-8')
+            
+            def do_GET(self):
+                if server._simulate_network():
+                    self._send(500, b'Internal Server Error', 'text/plain')
+                    return
+                
+                item_id = self.path.rsplit('/', 1)[-1].split('.')[0]
+                body = (
+                    '<html><head><meta charset="utf-8"><script>var t = 1;</script></head><body>'
+                    '<div class="header">国家粮食交易中心</div>'
+                    f'<div class="TRS_Editor"><p>第{item_id}期竞价销售交易公告</p>'
+                    f'<p>本次计划销售{COMMODITIES[int(item_id) % len(COMMODITIES)]}{int(item_id) * 100}吨，'
+                    f'共{int(item_id) % 50 + 1}个标的。</p>'
+                    '<p>交易时间：' + time.strftime('%Y年%m月%d日') + '上午9:00</p></div>'
+                    + '<div class="footer">' + '版权所有 ' * 200 + '</div></body></html>'
+                ).encode('utf-8')
+                self._send(200, body, 'text/html; charset=utf-8')
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def start(self):
+        """
+        在后台线程中启动服务器
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-grainmarket', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """
+        停止服务器
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
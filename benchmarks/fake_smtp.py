@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模拟SMTP服务器
+接收并丢弃邮件，只统计收到的邮件数量，用于基准测试通知模块
+"""
+
+import time
+import threading
+import socketserver
+
+
+class FakeSMTPServer:
+    """
+    模拟SMTP服务器（不加密）
+    支持EHLO、AUTH、MAIL、RCPT、DATA、NOOP、RSET、QUIT，可配置每封邮件的处理延迟
+    """
+    
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        """
+        :param latency: 每封邮件的处理延迟（秒）
+        :param host: 监听地址
+        :param port: 监听端口，0表示随机端口
+        """
+        self.latency = latency
+        
+        self._lock = threading.Lock()
+        self.message_count = 0
+        self.connection_count = 0
+        self.login_count = 0
+        
+        self.server = socketserver.ThreadingTCPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def host(self):
+        return self.server.server_address[0]
+    
+    @property
+    def port(self):
+        return self.server.server_address[1]
+    
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+        
+            def reply(self, line):
+                self.wfile.write((line + '\r\n').encode('ascii'))
+            
+            def handle(self):
+                server._count('connection_count')
+                self.reply('220 fake-smtp ready')
+                
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    
+                    command = line.decode('utf-8', 'replace').strip()
+                    verb = command.split(' ', 1)[0].upper()
+                    
+                    if verb == 'EHLO':
+                        self.reply('250-fake-smtp')
+                        self.reply('250 AUTH PLAIN LOGIN')
+                    elif verb == 'HELO':
+                        self.reply('250 fake-smtp')
+                    elif verb == 'AUTH':
+                        server._count('login_count')
+                        self.reply('235 Authentication successful')
+                    elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                        self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                            pass
+                        if server.latency:
+                            time.sleep(server.latency)
+                        server._count('message_count')
+                        self.reply('250 OK queued')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+        
+        return Handler
+    
+    def start(self):
+        """
+        在后台线程中启动服务器
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-smtp', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """
+        停止服务器
+        """
+        self.server.shutdown()
+        self.server.server_close()
@@ -19,16 +19,114 @@ MONITOR_CONFIG = {
     # 监控间隔时间（秒）
     "monitor_interval": 3600,  # 默认每小时监控一次
     
+    # 调度配置
+    "schedule": {
+        "mode": "adaptive",  # adaptive: 每个目标按发布频率自适应轮询；fixed: 按monitor_interval统一轮询
+        "min_interval": 300,  # 最短轮询间隔（秒）
+        "max_interval": 7200,  # 最长轮询间隔（秒）
+        "items_per_poll": 1,  # 期望每次轮询平均发现的新公告数量
+        "smoothing": 0.5,  # 发布速率指数加权平均系数，越大越偏重最近的观测
+        "jitter": 60,  # 随机抖动上限（秒），避免所有目标同时请求
+        # 交易时段，非交易时段按off_hours_interval放慢轮询；windows为空表示不区分时段
+        "trading_hours": {
+            "weekdays": [0, 1, 2, 3, 4],  # 周一至周五
+            "windows": [["08:00", "12:00"], ["13:00", "18:00"]],
+            "off_hours_interval": 7200
+        }
+        # 单个监控目标可通过自身的"schedule"字段覆盖以上配置
+    },
+    
+    # 多进程协作配置（使用--worker启动时生效）
+    # 多个进程共用同一个SQLite数据库，通过租约表分担监控目标，每个目标每个轮询间隔只由一个进程执行一次
+    "worker": {
+        "worker_id": os.environ.get("WORKER_ID"),  # 进程标识，默认使用"主机名:进程号"
+        "lease_ttl": 90,  # 租约有效期（秒），进程崩溃后其目标在租约过期后由其他进程接管
+        "heartbeat_interval": 30,  # 续约和心跳间隔（秒），应明显小于lease_ttl
+        "poll_interval": 5  # 检查到期目标的最长间隔（秒）
+    },
+    
+    # 并发抓取配置
+    "concurrency": {
+        "enabled": True,  # 是否并发抓取所有监控目标
+        "max_workers": 8  # 最大并发数
+    },
+    
+    # 分页抓取配置（增量抓取时逐页翻到上次的水位线为止）
+    "pagination": {
+        "page_size": 20,  # 每页公告数量
+        "max_pages": 20  # 单次监控最多翻页数
+    },
+    
+    # 历史公告回填配置（使用--backfill启动时生效，与常规监控进程分开运行）
+    "backfill": {
+        "page_size": 100,  # 每页公告数量，单个目标可通过"backfill_page_size"覆盖
+        "window": 8,  # 同时在途的页数（请求仍受按主机限流约束）
+        "batch_size": 1000,  # 累计多少条公告批量写入一次数据库
+        "checkpoint_interval": 5,  # 连续完成多少页保存一次检查点
+        "max_pages": 0,  # 最多回填的页数，0表示直到最后一页
+        # 回填进程的请求速率相对于rate_limit配置的比例；限流器只在进程内共享，与常规监控同时运行时两者的请求速率相加
+        "rate_limit_scale": 0.5
+    },
+    
+    # 公告正文抓取配置（新公告入库后在后台抓取正文，不阻塞监控和通知）
+    "detail": {
+        "enabled": True,
+        "max_workers": 4,  # 正文抓取线程数
+        "per_host_limit": 2,  # 同一主机的最大并发请求数
+        # 正文所在容器的CSS选择器，按顺序尝试，都未匹配时使用整个页面
+        "content_selectors": ["div.TRS_Editor", "div.article-content", "div.content", "#content", "article"]
+    },
+    
     # 关键词过滤（可选，只监控包含这些关键词的公告）
     "keywords": [
         "进口大豆"
         # 可以添加更多关键词
     ],
     
+    # 结构化字段提取：从竞价交易公告的标题和正文中提取交易日期、品种、标的数量和计划交易数量
+    "extraction": {
+        "enabled": True,
+        # 品种名称及其别名，匹配到多个别名时取最长的别名对应的品种
+        "commodities": {
+            "进口大豆": ["进口大豆"],
+            "大豆": ["国产大豆", "大豆"],
+            "玉米": ["玉米"],
+            "小麦": ["小麦"],
+            "稻谷": ["稻谷", "粳稻", "籼稻"],
+            "菜籽油": ["菜籽油", "菜油"],
+            "油菜籽": ["油菜籽"],
+            "大豆油": ["大豆油", "豆油"],
+            "棉花": ["棉花"]
+        }
+    },
+    
     # 数据存储配置
     "storage": {
         "type": "sqlite",  # 支持 sqlite, mysql 等
-        "file_path": "grain_announcements.db"  # SQLite数据库文件路径
+        "file_path": "grain_announcements.db",  # SQLite数据库文件路径
+        "content_compress_level": 6,  # 公告正文zlib压缩级别
+        # SQLite PRAGMA参数，在持久连接建立时设置
+        "pragmas": {
+            "journal_mode": "WAL",  # 写前日志，读写互不阻塞
+            "synchronous": "NORMAL",  # WAL模式下兼顾安全与写入速度
+            "busy_timeout": 5000,  # 数据库被锁定时的等待时间（毫秒）
+            "cache_size": -16000,  # 页缓存大小（负数表示KB）
+            "temp_store": "MEMORY"  # 临时表和索引放在内存中
+        },
+        # 已入库URL的内存索引，已知公告无需访问数据库
+        "seen_index": {
+            "enabled": True,
+            "max_exact_items": 500000,  # 精确集合的最大条数，超过后转为布隆过滤器
+            "bloom_capacity": 10000000,  # 布隆过滤器容量
+            "bloom_error_rate": 1e-6  # 布隆过滤器误判率（误判会使新公告被当作已存在）
+        },
+        # 近似重复检测：转载、换栏目发布或更正重发的同一公告关联到最早的公告，不再发送通知
+        "near_duplicate": {
+            "enabled": True,
+            "max_distance": 3,  # 标题/正文SimHash的最大汉明距离，修改后需调用rebuild_fingerprints重建指纹索引
+            "min_length": 6,  # 规范化后文本的最短长度，过短的标题不参与检测
+            "max_numeric_changes": 1  # 带"更正"等标记的标题与原公告最多可以不同的数字个数（日期、批次号、数量）
+        }
     },
     
     # 通知配置
@@ -37,17 +135,79 @@ MONITOR_CONFIG = {
         "email": {
             "smtp_server": os.environ.get("EMAIL_SMTP_SERVER", "smtp.163.com"),
             "smtp_port": int(os.environ.get("EMAIL_SMTP_PORT", 465)),
+            "use_ssl": os.environ.get("EMAIL_SMTP_SSL", "true").lower() != "false",  # 是否使用SMTP over SSL
             "username": os.environ.get("EMAIL_USERNAME", ""),
             "password": os.environ.get("EMAIL_PASSWORD", ""),
             "recipient": os.environ.get("EMAIL_RECIPIENT", "")
+        },
+        # 通知发件箱：通知先写入数据库，由后台线程复用SMTP连接批量发送，失败后退避重试
+        "outbox": {
+            "enabled": True,
+            "batch_size": 20,  # 每批发送的最大数量
+            "poll_interval": 10,  # 检查发件箱的间隔（秒）
+            "max_attempts": 8,  # 最大发送次数，超过后标记为失败
+            "retry_base_delay": 30,  # 首次重试的基础延迟（秒）
+            "retry_max_delay": 3600,  # 最大重试延迟（秒）
+            "claim_timeout": 300  # 取出待发送通知后的占用时间（秒），多个进程不会重复发送，进程崩溃后超时重发
         }
     },
     
+    # 运行指标配置（按监控目标和处理阶段统计计数和耗时）
+    "metrics": {
+        # 定时运行时提供本地HTTP指标接口：/metrics为Prometheus文本格式，/metrics.json为JSON摘要
+        "http": {
+            "enabled": os.environ.get("METRICS_HTTP_ENABLED", "false").lower() == "true",
+            "host": os.environ.get("METRICS_HTTP_HOST", "127.0.0.1"),
+            "port": int(os.environ.get("METRICS_HTTP_PORT", 9108))
+        },
+        # --no-scheduler运行结束时输出JSON摘要，同时写入该文件（可选）
+        "summary_file": os.environ.get("METRICS_SUMMARY_FILE")
+    },
+    
+    # 性能分析配置（使用--profile启动时生效）
+    "profiling": {
+        "output_dir": "profiles",  # 分析结果目录，每次分析生成.prof（可用pstats/snakeviz查看）和.txt摘要
+        "every_n_ticks": int(os.environ.get("PROFILE_EVERY_N_TICKS", 1)),  # 每N次监控任务分析一次，常驻生产环境时可调大
+        "max_files": 20,  # 保留最近的分析结果数量
+        "top_n": 15,  # 日志和摘要中输出的热点数量
+        "trace_memory": True,  # 是否同时跟踪内存分配（tracemalloc）
+        "tracemalloc_frames": 1  # tracemalloc记录的调用栈深度
+    },
+    
     # 网络请求配置
     "request": {
         "timeout": 30,  # 请求超时时间（秒）
-        "retry_count": 3,  # 重试次数
-        "retry_delay": 2,  # 重试间隔（秒）
+        "retry_count": 3,  # 最大尝试次数（含首次请求）
+        "retry_delay": 2,  # 首次重试间隔（秒）
+        "retry_backoff": 2,  # 重试间隔增长倍数
+        "retry_max_delay": 30,  # 最大重试间隔（秒）
+        "retry_jitter": 0.5,  # 重试间隔随机抖动比例，实际间隔在[1 - jitter, 1]倍之间
+        "retry_after_max": 120,  # 遵循Retry-After响应头时的最长等待（秒）
+        "tick_deadline": 600,  # 单次监控任务的截止时间（秒），超过后不再重试，请求超时也会相应缩短；0表示不限制
+        # 按主机熔断：连续失败达到阈值后在reset_timeout内直接跳过该主机，之后放行一个探测请求
+        "circuit_breaker": {
+            "enabled": True,
+            "failure_threshold": 5,  # 连续失败次数阈值（连接错误、超时、5xx和429）
+            "reset_timeout": 60  # 熔断持续时间（秒）
+        },
+        # 按主机限流（令牌桶），所有爬虫共享，同一主机的请求按到达顺序排队
+        "rate_limit": {
+            "enabled": True,
+            "default": {
+                "rate": 2.0,  # 初始速率（请求/秒）
+                "burst": 4,  # 允许的突发请求数
+                "adaptive": True,  # 遇到429/503时速率减半，之后每次成功提高increase_step
+                "min_rate": 0.2,  # 自适应时的最低速率
+                "max_rate": 5.0,  # 自适应时的最高速率
+                "increase_step": 0.05
+            },
+            # 按主机（extract_domain的结果）覆盖默认配置
+            "domains": {
+                "www.grainmarket.com.cn": {"rate": 2.0, "burst": 4, "max_rate": 5.0}
+            }
+        },
+        "pool_connections": 10,  # 连接池缓存的主机数量
+        "pool_maxsize": 10,  # 每个主机保持的最大连接数（不应小于并发数）
         "headers": {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "X-Requested-With": "XMLHttpRequest"
@@ -60,5 +220,9 @@ LOG_CONFIG = {
     "level": "INFO",  # 日志级别：DEBUG, INFO, WARNING, ERROR, CRITICAL
     "file_path": "monitor.log",  # 日志文件路径
     "max_bytes": 10 * 1024 * 1024,  # 日志文件最大大小（10MB）
-    "backup_count": 5  # 保留的日志备份数量
+    "backup_count": 5,  # 保留的日志备份数量
+    "format": os.environ.get("LOG_FORMAT", "text"),  # 日志格式：text 或 json（每行一个JSON对象）
+    # 异步日志：业务线程只把日志放入有界队列，由后台线程写控制台和文件，磁盘阻塞或日志滚动不影响抓取
+    "async": True,
+    "queue_size": 10000  # 队列上限，队列已满时丢弃日志并计数
 }
@@ -6,12 +6,305 @@
 负责从目标网站获取公告数据
 """
 
-from utils import retry, setup_logger
+from utils import retry, extract_domain, validate_url, deadline_timeout, circuit_breakers, rate_limiters
 from config import MONITOR_CONFIG
+from extraction import extract_fields
+import metrics
+import re
+import logging
 import requests
 import json
+import hashlib
+import threading
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import importlib.util
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
 
-logger = setup_logger()
+logger = logging.getLogger('GrainMonitor')
+
+# HTML解析器，安装lxml时使用速度更快的lxml
+# lxml和BeautifulSoup较大，只在首次解析网页时导入，只抓取接口的运行不必加载
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+
+@functools.lru_cache(maxsize=None)
+def _load_lxml():
+    """
+    导入lxml
+    
+    :return: (lxml.html模块, lxml.etree模块)，未安装lxml时返回None
+    """
+    if HTML_PARSER != 'lxml':
+        return None
+    import lxml.html
+    from lxml import etree
+    return lxml.html, etree
+
+
+def _is_lxml_element(element):
+    modules = _load_lxml()
+    return modules is not None and isinstance(element, modules[1]._Element)
+
+
+def make_soup(html):
+    """
+    使用BeautifulSoup解析HTML
+    
+    :param html: HTML内容
+    :return: BeautifulSoup对象
+    """
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, HTML_PARSER)
+
+# 进程内共享的HTTP会话
+_session = None
+_session_lock = threading.Lock()
+
+
+def _create_session():
+    """
+    创建带连接池的HTTP会话
+    
+    :return: requests.Session实例
+    """
+    request_config = MONITOR_CONFIG.get('request', {})
+    
+    session = requests.Session()
+    
+    # 按主机维护连接池，复用TCP/TLS连接
+    adapter = HTTPAdapter(
+        pool_connections=request_config.get('pool_connections', 10),
+        pool_maxsize=request_config.get('pool_maxsize', 10)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    
+    # 声明支持的压缩格式（安装brotli后自动包含br）并保持长连接
+    session.headers.update(make_headers(accept_encoding=True, keep_alive=True))
+    session.headers.update(request_config.get('headers', {}))
+    
+    return session
+
+
+def get_session():
+    """
+    获取进程内共享的HTTP会话，所有爬虫及其重试均复用该会话
+    
+    :return: requests.Session实例
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+                logger.debug("HTTP会话已创建")
+    return _session
+
+
+def close_session():
+    """
+    关闭共享的HTTP会话，释放连接池
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def guarded_request(session, method, url, timeout=None, **kwargs):
+    """
+    经过主机熔断器和限流器发送请求，请求超时不超过当前监控任务的剩余时间
+    
+    :param session: requests.Session实例
+    :param method: 请求方法
+    :param url: 请求地址
+    :param timeout: 请求超时时间（秒）
+    :return: requests.Response对象
+    :raises CircuitOpenError: 主机处于熔断状态
+    :raises DeadlineExceeded: 已超过或限流等待将超过本次监控任务的截止时间
+    """
+    host = extract_domain(url)
+    breaker = circuit_breakers.get(host)
+    limiter = rate_limiters.get(host)
+    
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except Exception:
+            metrics.CIRCUIT_REJECTED.inc(host=host)
+            raise
+    
+    requested = False
+    succeeded = False
+    try:
+        # 按主机排队，等待后再计算剩余时间
+        if limiter is not None:
+            metrics.RATE_LIMIT_WAIT.observe(limiter.acquire(), host=host)
+        request_timeout = deadline_timeout(timeout)
+        
+        requested = True
+        response = session.request(method, url, timeout=request_timeout, **kwargs)
+        
+        # 服务端错误和限流计为失败，其他响应说明主机可用
+        throttled = response.status_code in (429, 503)
+        succeeded = response.status_code < 500 and not throttled
+        if limiter is not None:
+            if throttled:
+                limiter.on_throttled()
+            elif succeeded:
+                limiter.on_success()
+        return response
+    finally:
+        if breaker is not None:
+            if succeeded:
+                breaker.record_success()
+            elif requested:
+                breaker.record_failure()
+            else:
+                # 请求未发出（超过截止时间），不计入主机失败
+                breaker.release()
+
+
+# 按主机缓存的页面编码，同一站点的页面编码通常一致，只需检测一次
+_host_encodings = {}
+
+# 页面头部<meta>中声明的编码
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w-]+)', re.IGNORECASE)
+
+
+def decode_response(response, encoding=None):
+    """
+    解码响应内容
+    
+    优先使用指定编码和响应头声明的编码；都没有时按主机缓存的编码解码，
+    首次访问该主机时先查找<meta>声明，仍没有时才对全文做编码检测
+    
+    :param response: requests.Response对象
+    :param encoding: 指定编码（可选）
+    :return: 解码后的文本
+    """
+    if encoding:
+        response.encoding = encoding
+        return response.text
+    
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        return response.text
+    
+    host = extract_domain(response.url)
+    cached = _host_encodings.get(host)
+    if cached is None:
+        match = _META_CHARSET_PATTERN.search(response.content[:4096])
+        cached = match.group(1).decode('ascii') if match else response.apparent_encoding
+        _host_encodings[host] = cached
+        logger.debug(f"主机 {host} 页面编码: {cached}")
+    
+    response.encoding = cached
+    try:
+        return response.content.decode(cached)
+    except (LookupError, UnicodeDecodeError):
+        # 缓存的编码不适用于该页面，重新检测
+        _host_encodings.pop(host, None)
+        response.encoding = response.apparent_encoding
+        return response.text
+
+
+class ConditionalFetchCache:
+    """
+    条件请求缓存
+    记录每个监控目标上次成功处理的响应的ETag、Last-Modified和内容哈希，用于跳过未变化的响应。
+    比较时只记下本次响应的校验信息，目标的公告全部入库后才由commit生效，
+    后续翻页、解析或入库失败时下次仍会重新解析
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self._pending = {}
+        self._skip_counts = {}
+    
+    def request_headers(self, key):
+        """
+        生成条件请求头
+        
+        :param key: 请求标识
+        :return: 条件请求头字典
+        """
+        with self._lock:
+            state = self._states.get(key, {})
+        
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+    
+    def is_unchanged(self, key, response):
+        """
+        判断响应是否与上次成功处理的响应相同，本次响应的校验信息暂存，调用commit后才生效
+        
+        :param key: 请求标识
+        :param response: requests响应对象
+        :return: 未变化返回True
+        """
+        with self._lock:
+            state = self._states.get(key, {})
+            
+            if response.status_code == 304:
+                unchanged = 'body_hash' in state
+            else:
+                body_hash = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+                unchanged = state.get('body_hash') == body_hash
+                if not unchanged:
+                    self._pending[key] = {
+                        'body_hash': body_hash,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')
+                    }
+            
+            if unchanged:
+                self._pending.pop(key, None)
+                self._skip_counts[key] = self._skip_counts.get(key, 0) + 1
+            return unchanged
+    
+    def commit(self, key):
+        """
+        本次响应中的公告已全部处理并入库，保存其校验信息供下次比较
+        
+        :param key: 请求标识
+        """
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                self._states[key] = pending
+    
+    def invalidate(self, key):
+        """
+        清除请求的校验信息，下次请求必定重新解析
+        
+        :param key: 请求标识
+        """
+        with self._lock:
+            self._states.pop(key, None)
+            self._pending.pop(key, None)
+    
+    def skip_count(self, key):
+        """
+        获取请求因内容未变化而跳过的次数
+        
+        :param key: 请求标识
+        :return: 跳过次数
+        """
+        with self._lock:
+            return self._skip_counts.get(key, 0)
+
+
+# 进程内共享的条件请求缓存
+fetch_cache = ConditionalFetchCache()
 
 
 class APICrawler:
@@ -24,42 +317,65 @@ class APICrawler:
         self.request_config = MONITOR_CONFIG.get('request', {})
         self.timeout = self.request_config.get('timeout', 30)
         self.headers = self.request_config.get('headers', {})
-        
-    @retry(max_retries=3, delay=2, backoff=2, exceptions=(requests.RequestException,))
-    def fetch_announcements(self, api_url, tag_id, article_type):
+        self.session = get_session()
+        self.pagination = MONITOR_CONFIG.get('pagination', {})
+    
+    @retry(exceptions=(requests.RequestException,))
+    def fetch_announcements(self, api_url, tag_id, article_type, page=1, page_size=20, conditional=False,
+                            cache_key=None):
         """
         从API获取公告列表
         
         :param api_url: API地址
         :param tag_id: 分类ID
         :param article_type: 文章类型
-        :return: 公告列表
+        :param page: 页码（从1开始）
+        :param page_size: 每页数量
+        :param conditional: 是否使用条件请求，响应与上次相同时不解析
+        :param cache_key: 条件请求缓存的标识（默认按请求参数），监控目标使用cache_key_for生成的按目标区分的标识
+        :return: 公告列表，条件请求且内容未变化时返回None
         """
         # 使用正确的API参数格式
         news_params = {
             "m": "tradeCenterOtherNewsList",
             "articleTypeID": article_type,
-            "indexid": "1",
-            "pagesize": "20"
+            "indexid": str(page),
+            "pagesize": str(page_size)
         }
         
         payload = {"param": json.dumps(news_params)}
         
-        logger.info(f"请求API: {api_url}, 参数: articleTypeID={article_type}")
+        logger.info(f"请求API: {api_url}, 参数: articleTypeID={article_type}, 页码={page}")
         
-        response = requests.post(
+        cache_key = cache_key or f"{api_url}#{article_type}#{page_size}"
+        headers = dict(self.headers)
+        if conditional:
+            headers.update(fetch_cache.request_headers(cache_key))
+        
+        response = guarded_request(
+            self.session,
+            'POST',
             api_url,
             data=payload,
-            headers=self.headers,
+            headers=headers,
             timeout=self.timeout
         )
         
         response.raise_for_status()  # 检查请求是否成功
         
-        data = response.json()
+        if conditional and fetch_cache.is_unchanged(cache_key, response):
+            logger.info(f"公告列表未变化，跳过解析（累计跳过 {fetch_cache.skip_count(cache_key)} 次）")
+            return None
         
-        if data.get('code') != '001':
-            raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
+        try:
+            data = response.json()
+            
+            if data.get('code') != '001':
+                raise Exception(f"API返回错误: {data.get('msg', '未知错误')}")
+        except Exception:
+            # 错误响应不作为下次比较的依据
+            fetch_cache.invalidate(cache_key)
+            raise
         
         logger.info(f"成功获取 {len(data.get('data', []))} 条公告")
         return data.get('data', [])
@@ -81,12 +397,46 @@ class APICrawler:
         }
         return announcement
     
-    def get_announcements(self, target_config):
+    @staticmethod
+    def cache_key_for(target_config):
+        """
+        生成监控目标列表第一页的条件请求缓存标识
+        相同接口和分类的多个目标（关键词不同）分别比较，互不影响
+        
+        :param target_config: 目标配置
+        :return: 缓存标识
+        """
+        return f"{target_config.get('name')}#{target_config.get('api_url')}#{target_config.get('article_type')}"
+    
+    @staticmethod
+    def reached_watermark(announcement, watermark):
+        """
+        判断公告是否已到达上次抓取的水位线
+        
+        :param announcement: 格式化后的公告数据
+        :param watermark: 水位线（包含last_publish_time和last_url）
+        :return: 是否已到达水位线（True/False）
+        """
+        if not watermark:
+            return False
+        
+        if announcement.get('url') and announcement.get('url') == watermark.get('last_url'):
+            return True
+        
+        # 发布时间早于水位线的公告一定已抓取过，同一时间的公告继续比较URL
+        pub_date = announcement.get('pub_date')
+        last_publish_time = watermark.get('last_publish_time')
+        return bool(pub_date and last_publish_time and pub_date < last_publish_time)
+    
+    def get_announcements(self, target_config, watermark=None):
         """
         获取目标配置的公告列表
         
+        有水位线时逐页翻取，直到遇到已抓取过的公告；没有水位线（首次运行）时只抓取第一页
+        
         :param target_config: 目标配置
-        :return: 格式化后的公告列表
+        :param watermark: 该目标的水位线（可选）
+        :return: 格式化后的公告列表，按发布时间从新到旧排列
         """
         api_url = target_config.get('api_url')
         tag_id = target_config.get('tag_id')
@@ -96,13 +446,37 @@ class APICrawler:
             logger.error("目标配置不完整")
             return []
         
-        raw_items = self.fetch_announcements(api_url, tag_id, article_type)
+        page_size = target_config.get('page_size', self.pagination.get('page_size', 20))
+        max_pages = target_config.get('max_pages', self.pagination.get('max_pages', 20)) if watermark else 1
         
         announcements = []
-        for item in raw_items:
-            announcement = self.parse_announcement(item)
-            if announcement:
-                announcements.append(announcement)
+        for page in range(1, max_pages + 1):
+            # 第一页使用条件请求，列表未变化时整个目标直接跳过
+            with metrics.stage_timer('fetch'):
+                raw_items = self.fetch_announcements(api_url, tag_id, article_type, page, page_size,
+                                                     conditional=(page == 1), cache_key=self.cache_key_for(target_config))
+            if raw_items is None:
+                metrics.UNCHANGED.inc(target=metrics.current_target())
+                return []
+            
+            reached = False
+            with metrics.stage_timer('parse'):
+                for item in raw_items:
+                    announcement = self.parse_announcement(item)
+                    if not announcement:
+                        continue
+                    if self.reached_watermark(announcement, watermark):
+                        reached = True
+                        break
+                    # 提取交易日期、品种、标的数量等结构化字段
+                    announcements.append(extract_fields(announcement))
+            
+            # 已到达水位线或已是最后一页
+            if reached or len(raw_items) < page_size:
+                break
+        else:
+            if watermark:
+                logger.warning(f"翻页达到上限 {max_pages} 页仍未到达水位线，可能遗漏部分公告")
         
         return announcements
 
@@ -117,45 +491,120 @@ class WebCrawler:
         self.request_config = MONITOR_CONFIG.get('request', {})
         self.timeout = self.request_config.get('timeout', 30)
         self.headers = self.request_config.get('headers', {})
+        self.session = get_session()
     
-    @retry(max_retries=3, delay=2, backoff=2, exceptions=(requests.RequestException,))
-    def fetch_page(self, url):
+    @retry(exceptions=(requests.RequestException,))
+    def fetch_page(self, url, encoding=None, cache_key=None):
         """
         获取网页内容
         
         :param url: 网页地址
-        :return: 网页内容
+        :param encoding: 页面编码（可选，默认按响应头或主机缓存确定）
+        :param cache_key: 条件请求缓存的标识（默认为URL），监控目标使用cache_key_for生成的按目标区分的标识
+        :return: 网页内容，内容与上次相同时返回None
         """
         logger.info(f"请求网页: {url}")
         
-        response = requests.get(
+        cache_key = cache_key or url
+        headers = dict(self.headers)
+        headers.update(fetch_cache.request_headers(cache_key))
+        
+        response = guarded_request(
+            self.session,
+            'GET',
             url,
-            headers=self.headers,
+            headers=headers,
             timeout=self.timeout
         )
         
         response.raise_for_status()
-        response.encoding = response.apparent_encoding
         
-        return response.text
+        if fetch_cache.is_unchanged(cache_key, response):
+            logger.info(f"网页内容未变化，跳过解析（累计跳过 {fetch_cache.skip_count(cache_key)} 次）")
+            return None
+        
+        return decode_response(response, encoding)
     
-    def parse_page(self, html):
+    def parse_page(self, html, target_config=None):
         """
-        解析网页内容，提取公告信息
+        按目标配置的选择器解析网页内容，提取公告信息
         
         :param html: 网页HTML内容
-        :return: 公告列表
+        :param target_config: 目标配置，selectors字段指定列表容器、列表项、标题、链接、日期的CSS选择器
+        :return: 公告列表，按页面中的顺序排列
         """
-        # 这里可以根据实际网页结构实现解析逻辑
-        # 暂时返回空列表
-        return []
+        target_config = target_config or {}
+        selectors = target_config.get('selectors')
+        if not selectors or not selectors.get('item'):
+            logger.error("网页目标缺少列表项选择器（selectors.item）")
+            return []
+        
+        # 指定列表容器时只解析容器部分，导航、页脚等其他内容不构建成树
+        container_selector = compile_selector(selectors.get('container'))
+        fragment = _slice_container(html, container_selector) if container_selector else None
+        root = _parse_html(fragment if fragment is not None else html, selectors)
+        if container_selector:
+            container = container_selector.find(root, include_self=True)
+            if container is not None:
+                root = container
+        
+        title_selector = compile_selector(selectors.get('title'))
+        # link为空表示列表项本身就是链接
+        link_selector = compile_selector(selectors.get('link', 'a'))
+        date_selector = compile_selector(selectors.get('date'))
+        title_attr = selectors.get('title_attr')
+        link_attr = selectors.get('link_attr', 'href')
+        base_url = target_config.get('url', '')
+        
+        announcements = []
+        for element in compile_selector(selectors['item']).find_all(root):
+            link_element = link_selector.find(element) if link_selector else element
+            # 未配置标题选择器时使用链接的文本作为标题
+            title_element = title_selector.find(element) if title_selector else link_element
+            if title_element is None or link_element is None:
+                continue
+            
+            title = (title_element.get(title_attr) if title_attr else None) or _element_text(title_element)
+            href = link_element.get(link_attr)
+            if not title or not href:
+                continue
+            
+            pub_date = ''
+            if date_selector:
+                date_element = date_selector.find(element)
+                if date_element is not None:
+                    pub_date = normalize_date(_element_text(date_element))
+            
+            announcements.append({
+                'title': title,
+                'url': urljoin(base_url, href.strip()),
+                'pub_date': pub_date,
+                'source': '',
+                'tag_id': '',
+                'article_type': ''
+            })
+        
+        if not announcements:
+            logger.warning(f"按选择器 {selectors['item']} 未解析到公告，请检查页面结构是否变化")
+        return announcements
+    
+    @staticmethod
+    def cache_key_for(target_config):
+        """
+        生成监控目标列表页的条件请求缓存标识，相同URL的多个目标分别比较
+        
+        :param target_config: 目标配置
+        :return: 缓存标识
+        """
+        return f"{target_config.get('name')}#{target_config.get('url')}"
     
-    def get_announcements(self, target_config):
+    def get_announcements(self, target_config, watermark=None):
         """
         获取目标配置的公告列表
         
         :param target_config: 目标配置
-        :return: 格式化后的公告列表
+        :param watermark: 该目标的水位线（可选）
+        :return: 格式化后的公告列表，只包含水位线之前的公告
         """
         url = target_config.get('url')
         
@@ -163,8 +612,319 @@ class WebCrawler:
             logger.error("目标配置缺少URL")
             return []
         
-        html = self.fetch_page(url)
-        return self.parse_page(html)
+        with metrics.stage_timer('fetch'):
+            html = self.fetch_page(url, target_config.get('encoding'), self.cache_key_for(target_config))
+        if html is None:
+            metrics.UNCHANGED.inc(target=metrics.current_target())
+            return []
+        
+        with metrics.stage_timer('parse'):
+            announcements = self.parse_page(html, target_config)
+            
+            # 列表页按发布时间从新到旧排列，遇到水位线即停止
+            for index, announcement in enumerate(announcements):
+                if APICrawler.reached_watermark(announcement, watermark):
+                    announcements = announcements[:index]
+                    break
+                extract_fields(announcement)
+        return announcements
+
+
+# 简单选择器：标签名、.类名、#id 及其组合
+_SIMPLE_SELECTOR_PATTERN = re.compile(r'^([a-zA-Z][\w-]*)?(?:([.#])([\w-]+))?$')
+
+# 常见的日期写法：2024-05-01、2024/5/1、2024.05.01、2024年5月1日，可带时间
+_DATE_PATTERN = re.compile(r'(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})日?(?:\s*(\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+
+
+class CompiledSelector:
+    """
+    预编译的CSS选择器
+    简单选择器（标签名、.类名、#id及其组合）直接用find/find_all匹配，避免CSS选择器引擎的开销；
+    其他选择器使用select/select_one
+    """
+    
+    def __init__(self, selector):
+        self.selector = selector.strip()
+        self.name = None
+        self.attrs = None
+        
+        self._xpath = None
+        self._xpath_self = None
+        
+        match = _SIMPLE_SELECTOR_PATTERN.match(self.selector)
+        if match and (match.group(1) or match.group(3)):
+            name, kind, value = match.groups()
+            self.name = name.lower() if name else None
+            self.attrs = {}
+            if kind == '.':
+                self.attrs['class'] = value
+            elif kind == '#':
+                self.attrs['id'] = value
+            
+            modules = _load_lxml()
+            if modules is not None:
+                etree = modules[1]
+                condition = ''
+                if kind == '.':
+                    condition = f"[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+                elif kind == '#':
+                    condition = f"[@id='{value}']"
+                self._xpath = etree.XPath(f"descendant::{self.name or '*'}{condition}")
+                self._xpath_self = etree.XPath(f"descendant-or-self::{self.name or '*'}{condition}")
+    
+    @property
+    def is_simple(self):
+        return self.attrs is not None
+    
+    @property
+    def supports_lxml(self):
+        return self._xpath is not None
+    
+    def find(self, element, include_self=False):
+        """
+        查找第一个匹配的后代元素
+        
+        :param element: BeautifulSoup元素或lxml元素
+        :param include_self: 是否包括元素本身（仅lxml元素需要，BeautifulSoup根节点不是标签）
+        :return: 匹配的元素，没有时返回None
+        """
+        if _is_lxml_element(element):
+            found = (self._xpath_self if include_self else self._xpath)(element)
+            return found[0] if found else None
+        if self.is_simple:
+            return element.find(self.name, self.attrs)
+        return element.select_one(self.selector)
+    
+    def find_all(self, element):
+        if _is_lxml_element(element):
+            return self._xpath(element)
+        if self.is_simple:
+            return element.find_all(self.name, self.attrs)
+        return element.select(self.selector)
+    
+    def start_tag_pattern(self):
+        """
+        匹配该选择器元素开始标签的正则，只支持简单选择器
+        
+        :return: 编译后的正则，不支持时返回None
+        """
+        if not self.is_simple:
+            return None
+        
+        name = re.escape(self.name) if self.name else r'[a-zA-Z][\w-]*'
+        if 'class' in self.attrs:
+            attr = r'\bclass\s*=\s*["\']?[^"\'>]*(?<![\w-])' + re.escape(self.attrs['class']) + r'(?![\w-])'
+        elif 'id' in self.attrs:
+            attr = r'\bid\s*=\s*["\']?' + re.escape(self.attrs['id']) + r'(?![\w-])'
+        else:
+            return re.compile(r'<(' + name + r')[\s>/]', re.IGNORECASE)
+        return re.compile(r'<(' + name + r')\s[^>]*' + attr, re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_selector(selector):
+    """
+    获取预编译的选择器，按选择器文本缓存
+    
+    :param selector: CSS选择器
+    :return: CompiledSelector对象，选择器为空时返回None
+    """
+    if not selector:
+        return None
+    return CompiledSelector(selector)
+
+
+def _parse_html(html, selectors):
+    """
+    解析HTML
+    安装了lxml且所有选择器都是简单选择器时直接使用lxml和XPath，否则使用BeautifulSoup
+    
+    :param html: HTML内容
+    :param selectors: 目标的选择器配置
+    :return: lxml元素或BeautifulSoup对象
+    """
+    compiled = [compile_selector(selectors.get(key)) for key in ('container', 'item', 'title', 'link', 'date')]
+    modules = _load_lxml()
+    if modules is not None and all(selector is None or selector.supports_lxml for selector in compiled):
+        lxml_html, etree = modules
+        try:
+            return lxml_html.fromstring(html)
+        except (etree.ParserError, ValueError) as e:
+            logger.debug(f"lxml解析失败，改用BeautifulSoup: {str(e)}")
+    return make_soup(html)
+
+
+def _element_text(element):
+    """
+    获取元素的文本，各段文本去掉首尾空白后拼接
+    """
+    if hasattr(element, 'get_text'):
+        return element.get_text(strip=True)
+    return ''.join(text.strip() for text in element.itertext())
+
+
+def _slice_container(html, selector):
+    """
+    从页面中截取列表容器所在的HTML片段，只解析该片段
+    
+    :param html: 网页HTML内容
+    :param selector: 列表容器的预编译选择器
+    :return: 容器的HTML片段，不是简单选择器或未找到时返回None
+    """
+    pattern = selector.start_tag_pattern()
+    if pattern is None:
+        return None
+    
+    start_match = pattern.search(html)
+    if not start_match:
+        return None
+    
+    # 按同名标签的嵌套层数找到对应的结束标签，找不到时截取到页面末尾
+    tag_pattern = re.compile(r'<(/?)' + re.escape(start_match.group(1)) + r'[\s>/]', re.IGNORECASE)
+    depth = 0
+    for match in tag_pattern.finditer(html, start_match.start()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            end = html.find('>', match.end() - 1)
+            return html[start_match.start():end + 1 if end >= 0 else len(html)]
+    return html[start_match.start():]
+
+
+def normalize_date(text):
+    """
+    将页面中的日期文本规范化为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS，与接口返回的格式一致
+    
+    :param text: 日期文本
+    :return: 规范化后的日期，无法识别时返回原文本
+    """
+    match = _DATE_PATTERN.search(text or '')
+    if not match:
+        return text or ''
+    
+    year, month, day, hour, minute, second = match.groups()
+    date = f"{year}-{int(month):02d}-{int(day):02d}"
+    if hour is None:
+        return date
+    return f"{date} {int(hour):02d}:{minute}:{second or '00'}"
+
+
+def extract_main_text(html, selectors=None):
+    """
+    从公告详情页HTML中提取正文文本
+    
+    :param html: 网页HTML内容
+    :param selectors: 正文容器的CSS选择器列表，按顺序尝试
+    :return: 正文文本
+    """
+    soup = make_soup(html)
+    
+    # 去掉脚本、样式和页面框架部分
+    for tag in soup(['script', 'style', 'noscript', 'iframe', 'nav', 'header', 'footer']):
+        tag.decompose()
+    
+    container = None
+    for selector in selectors or []:
+        container = soup.select_one(selector)
+        if container is not None:
+            break
+    if container is None:
+        container = soup.body or soup
+    
+    lines = (line.strip() for line in container.get_text('\n').splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+class DetailFetcher:
+    """
+    公告正文抓取器
+    在后台线程池中并发下载公告详情页，提取正文后保存，不阻塞列表监控和通知
+    """
+    
+    def __init__(self, store_func):
+        """
+        :param store_func: 保存正文的函数，接收 (url, 正文文本)
+        """
+        self.detail_config = MONITOR_CONFIG.get('detail', {})
+        self.request_config = MONITOR_CONFIG.get('request', {})
+        self.timeout = self.request_config.get('timeout', 30)
+        self.headers = self.request_config.get('headers', {})
+        self.selectors = self.detail_config.get('content_selectors', [])
+        self.per_host_limit = self.detail_config.get('per_host_limit', 2)
+        self.session = get_session()
+        self.store_func = store_func
+        
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.detail_config.get('max_workers', 4),
+            thread_name_prefix='detail'
+        )
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+    
+    def _host_limit(self, url):
+        host = extract_domain(url)
+        with self._host_limits_lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_limits[host] = semaphore
+            return semaphore
+    
+    @retry(exceptions=(requests.RequestException,))
+    def fetch_detail(self, url):
+        """
+        获取公告详情页
+        
+        :param url: 公告URL
+        :return: 网页内容
+        """
+        with self._host_limit(url):
+            response = guarded_request(self.session, 'GET', url, headers=self.headers, timeout=self.timeout)
+        
+        response.raise_for_status()
+        
+        # 响应头未声明编码时requests默认使用ISO-8859-1，此时按主机缓存的编码解码
+        return decode_response(response)
+    
+    def _fetch_and_store(self, announcement):
+        url = announcement.get('url')
+        try:
+            with metrics.stage_timer('detail'):
+                html = self.fetch_detail(url)
+                content = extract_main_text(html, self.selectors)
+                self.store_func(url, content)
+            logger.info(f"成功抓取公告正文: {announcement.get('title')}（{len(content)} 字）")
+        except Exception as e:
+            logger.error(f"抓取公告正文失败: {url}, {str(e)}")
+    
+    def submit(self, announcements):
+        """
+        提交需要抓取正文的公告，立即返回
+        
+        :param announcements: 公告列表
+        """
+        for announcement in announcements:
+            if validate_url(announcement.get('url') or ''):
+                self.executor.submit(self._fetch_and_store, announcement)
+    
+    def shutdown(self, wait=True):
+        """
+        停止抓取器
+        
+        :param wait: 是否等待已提交的正文抓取完成
+        """
+        self.executor.shutdown(wait=wait)
+
+
+def commit_fetch(target_config):
+    """
+    监控目标本次抓取的公告已全部入库后调用，保存列表响应的校验信息，
+    之后列表未变化时才会跳过解析；未调用（翻页、解析或入库失败）时下次仍会重新解析
+    
+    :param target_config: 目标配置
+    """
+    crawler_class = WebCrawler if target_config.get('type', 'api') == 'web' else APICrawler
+    fetch_cache.commit(crawler_class.cache_key_for(target_config))
 
 
 def create_crawler(crawler_type):
@@ -7,10 +7,197 @@
 """
 
 import sqlite3
-from utils import setup_logger
+import logging
+import threading
+import hashlib
+import math
+import time
+import zlib
+import datetime
+from contextlib import contextmanager
 from config import MONITOR_CONFIG
+from dedup import SimHasher
+from extraction import FIELD_NAMES, NOTICE_AUCTION, get_extractor
 
-logger = setup_logger()
+logger = logging.getLogger('GrainMonitor')
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+    以固定内存记录海量元素，判断不存在时一定不存在，判断存在时有极小误判概率
+    """
+    
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        
+        # 根据容量和误判率计算位数组大小和哈希函数个数
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key_hash):
+        # 由64位哈希值拆分出两个哈希值，组合生成k个位置
+        h1 = key_hash & 0xFFFFFFFF
+        h2 = (key_hash >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def add(self, key_hash):
+        for position in self._positions(key_hash):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, key_hash):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key_hash))
+
+
+class SeenUrlIndex:
+    """
+    已入库公告URL的内存索引
+    数量较少时使用精确集合，超过上限后转为布隆过滤器，内存占用保持有界
+    """
+    
+    def __init__(self, max_exact_items=500000, bloom_capacity=10000000, bloom_error_rate=1e-6):
+        self.max_exact_items = max_exact_items
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        
+        self._lock = threading.Lock()
+        self._exact = set()
+        self._bloom = None
+        # 布隆过滤器无法删除元素，已删除的URL单独记录
+        self._removed = set()
+    
+    @staticmethod
+    def _hash(url):
+        return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+    
+    def _switch_to_bloom(self, expected_items):
+        capacity = max(self.bloom_capacity, expected_items * 2)
+        bloom = BloomFilter(capacity, self.bloom_error_rate)
+        for key_hash in self._exact:
+            bloom.add(key_hash)
+        self._bloom = bloom
+        self._exact = set()
+        logger.info(f"已入库URL超过 {self.max_exact_items} 条，索引切换为布隆过滤器"
+                    f"（容量 {capacity}，约 {len(bloom.bits) // 1024 // 1024}MB）")
+    
+    def add(self, url):
+        """
+        记录已入库的URL
+        
+        :param url: 公告URL
+        """
+        key_hash = self._hash(url)
+        with self._lock:
+            self._removed.discard(key_hash)
+            if self._bloom is not None:
+                self._bloom.add(key_hash)
+                return
+            self._exact.add(key_hash)
+            if len(self._exact) > self.max_exact_items:
+                self._switch_to_bloom(len(self._exact))
+    
+    def discard(self, url):
+        """
+        移除已删除的URL
+        
+        :param url: 公告URL
+        """
+        key_hash = self._hash(url)
+        with self._lock:
+            if self._bloom is not None:
+                self._removed.add(key_hash)
+            else:
+                self._exact.discard(key_hash)
+    
+    def clear(self):
+        """
+        清空索引
+        """
+        with self._lock:
+            self._exact = set()
+            self._bloom = None
+            self._removed = set()
+    
+    def warm(self, urls, total=0):
+        """
+        用已入库的URL预热索引
+        
+        :param urls: URL可迭代对象
+        :param total: URL总数，用于预先决定索引类型
+        """
+        with self._lock:
+            if total > self.max_exact_items:
+                self._switch_to_bloom(total)
+        for url in urls:
+            self.add(url)
+    
+    def __contains__(self, url):
+        key_hash = self._hash(url)
+        with self._lock:
+            if key_hash in self._removed:
+                return False
+            if self._bloom is not None:
+                return key_hash in self._bloom
+            return key_hash in self._exact
+    
+    def __len__(self):
+        with self._lock:
+            return self._bloom.count if self._bloom is not None else len(self._exact)
+
+
+def compress_content(text, level=6):
+    """
+    压缩公告正文
+    
+    :param text: 正文文本
+    :param level: zlib压缩级别
+    :return: 压缩后的字节串
+    """
+    return zlib.compress(text.encode('utf-8'), level)
+
+
+def decompress_content(value):
+    """
+    解压公告正文，兼容未压缩的文本
+    
+    :param value: 数据库中content字段的值
+    :return: 正文文本，为空时返回None
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+def bigram_tokens(text):
+    """
+    生成文本的双字词元，供两个字的检索词使用索引
+    
+    :param text: 标题或正文文本
+    :return: 以空格分隔的词元，文本为空时返回None
+    """
+    if not text:
+        return None
+    tokens = []
+    previous = None
+    # 只组合相邻的文字和数字，标点和空白处断开
+    for char in text:
+        if not char.isalnum():
+            previous = None
+            continue
+        if previous is not None:
+            tokens.append(previous + char)
+        previous = char
+    return ' '.join(tokens)
+
+
+# 进程内共享的已入库URL索引，按数据库文件区分
+_seen_url_indexes = {}
+_seen_url_indexes_lock = threading.Lock()
 
 
 class DatabaseManager:
@@ -19,252 +206,1797 @@ class DatabaseManager:
     负责数据库的初始化、数据存储和查询
     """
     
-    def __init__(self):
-        self.db_path = MONITOR_CONFIG.get('storage', {}).get('file_path', 'grain_announcements.db')
-        self.init_db()
+    # 分页查询支持的排序字段
+    PAGE_ORDER_COLUMNS = ('publish_date', 'crawl_date', 'id')
+    
+    def __init__(self):
+        self.storage_config = MONITOR_CONFIG.get('storage', {})
+        self.db_path = self.storage_config.get('file_path', 'grain_announcements.db')
+        
+        # 持久连接在多个线程间共享，由锁保证同一时刻只有一个线程使用
+        self._lock = threading.RLock()
+        self.conn = self._connect()
+        
+        # 近似重复检测
+        dedup_config = self.storage_config.get('near_duplicate', {})
+        self.simhasher = None
+        if dedup_config.get('enabled', True):
+            self.simhasher = SimHasher(dedup_config.get('max_distance', 3), dedup_config.get('min_length', 6),
+                                       dedup_config.get('max_numeric_changes', 1))
+        
+        self.init_db()
+        self.seen_urls = self._get_seen_url_index()
+    
+    def _connect(self):
+        """
+        创建数据库连接并设置PRAGMA参数
+        
+        :return: sqlite3连接对象
+        """
+        pragmas = self.storage_config.get('pragmas', {})
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=pragmas.get('busy_timeout', 5000) / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # 供全文索引触发器和查询解压正文使用，所有连接都需要注册
+        conn.create_function('decompress_content', 1, decompress_content, deterministic=True)
+        conn.create_function('bigram_tokens', 1, bigram_tokens, deterministic=True)
+        
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """
+        在事务中使用持久连接，退出时自动提交，出错时回滚
+        
+        :return: sqlite3连接对象
+        """
+        with self._lock:
+            with self.conn:
+                yield self.conn
+    
+    def _get_seen_url_index(self):
+        """
+        获取进程内共享的已入库URL索引，首次使用时从数据库预热
+        
+        :return: SeenUrlIndex对象，未启用时返回None
+        """
+        index_config = self.storage_config.get('seen_index', {})
+        if not index_config.get('enabled', True):
+            return None
+        
+        with _seen_url_indexes_lock:
+            seen_urls = _seen_url_indexes.get(self.db_path)
+            if seen_urls is not None:
+                return seen_urls
+            
+            seen_urls = SeenUrlIndex(
+                max_exact_items=index_config.get('max_exact_items', 500000),
+                bloom_capacity=index_config.get('bloom_capacity', 10000000),
+                bloom_error_rate=index_config.get('bloom_error_rate', 1e-6)
+            )
+            
+            with self._lock:
+                total = self.conn.execute('SELECT COUNT(*) FROM announcements').fetchone()[0]
+                cursor = self.conn.execute('SELECT url FROM announcements')
+                seen_urls.warm((row[0] for row in cursor), total)
+            
+            logger.info(f"已入库URL索引预热完成，共 {len(seen_urls)} 条")
+            _seen_url_indexes[self.db_path] = seen_urls
+            return seen_urls
+    
+    def _is_seen(self, url):
+        """
+        通过内存索引判断URL是否已入库
+        
+        :param url: 公告URL
+        :return: 已入库返回True，未知返回False
+        """
+        return bool(url) and self.seen_urls is not None and url in self.seen_urls
+    
+    def _mark_seen(self, urls):
+        """
+        将URL记录到内存索引
+        
+        :param urls: URL列表
+        """
+        if self.seen_urls is None:
+            return
+        for url in urls:
+            self.seen_urls.add(url)
+    
+    @staticmethod
+    def _row_to_dict(row):
+        """
+        将查询结果行转换为字典，并解压正文
+        
+        :param row: sqlite3.Row对象
+        :return: 公告字典
+        """
+        announcement = dict(row)
+        if 'content' in announcement:
+            announcement['content'] = decompress_content(announcement['content'])
+        return announcement
+    
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+    
+    def init_db(self):
+        """
+        初始化数据库表
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                # 多个进程同时启动时，建表和建触发器在同一个写事务中依次进行
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                # 创建公告表，兼容原有表结构
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS announcements (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        title TEXT NOT NULL,
+                        url TEXT NOT NULL UNIQUE,
+                        content TEXT,
+                        source TEXT,
+                        publish_date TEXT NOT NULL,
+                        crawl_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        keywords TEXT
+                    )
+                ''')
+                
+                # 创建抓取水位线表，记录每个监控目标最新公告的发布时间和URL
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS crawl_watermarks (
+                        target_name TEXT PRIMARY KEY,
+                        last_publish_time TEXT,
+                        last_url TEXT,
+                        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
+                # 按发布日期、抓取日期排序和分页查询的索引
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_announcements_publish_date
+                    ON announcements (publish_date, id)
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_announcements_crawl_date
+                    ON announcements (crawl_date, id)
+                ''')
+                
+                # 创建通知发件箱表，待发送的通知先持久化，由后台发送线程投递
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS notification_outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        subject TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        next_attempt_at REAL NOT NULL DEFAULT 0,
+                        last_error TEXT,
+                        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        sent_at TEXT
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+                    ON notification_outbox (status, next_attempt_at)
+                ''')
+                
+                # 创建监控目标租约表，多个工作进程通过条件更新认领到期的目标
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS target_leases (
+                        target_name TEXT PRIMARY KEY,
+                        owner TEXT,
+                        lease_token INTEGER NOT NULL DEFAULT 0,
+                        lease_expires_at REAL NOT NULL DEFAULT 0,
+                        next_run_at REAL NOT NULL DEFAULT 0,
+                        last_run_at REAL,
+                        poll_rate REAL NOT NULL DEFAULT 0,
+                        poll_interval REAL,
+                        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_target_leases_next_run
+                    ON target_leases (next_run_at)
+                ''')
+                
+                # 创建工作进程心跳表
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS worker_heartbeats (
+                        worker_id TEXT PRIMARY KEY,
+                        host TEXT,
+                        pid INTEGER,
+                        started_at REAL NOT NULL,
+                        heartbeat_at REAL NOT NULL
+                    )
+                ''')
+                
+                # 创建历史回填检查点表，记录每个目标已连续完成并入库的页数
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                        target_name TEXT PRIMARY KEY,
+                        page_size INTEGER NOT NULL,
+                        completed_pages INTEGER NOT NULL DEFAULT 0,
+                        items INTEGER NOT NULL DEFAULT 0,
+                        new_items INTEGER NOT NULL DEFAULT 0,
+                        status TEXT NOT NULL DEFAULT 'running',
+                        last_error TEXT,
+                        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
+                self.fts_enabled = self._init_fts(cursor)
+                self._init_fingerprints(cursor)
+                self._init_auction_fields(cursor)
+                
+                conn.commit()
+                logger.info(f"数据库初始化成功: {self.db_path}")
+        except Exception as e:
+            logger.error(f"数据库初始化失败: {str(e)}")
+            raise
+    
+    def _init_fts(self, cursor):
+        """
+        创建公告全文索引（FTS5，trigram分词）及同步触发器
+        
+        :param cursor: 数据库游标
+        :return: 全文索引是否可用（True/False）
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcements_fts'")
+        exists = cursor.fetchone() is not None
+        
+        try:
+            # trigram分词按连续三个字符建立索引，适用于不以空格分词的中文
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS announcements_fts USING fts5(
+                    title,
+                    content,
+                    content='announcements',
+                    content_rowid='id',
+                    tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"当前SQLite不支持FTS5 trigram分词，全文检索退化为LIKE查询: {str(e)}")
+            return False
+        
+        # 正文以压缩形式存储，触发器通过decompress_content函数取出正文文本建立索引
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_fts_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_fts_delete')
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_fts_update')
+        cursor.execute('''
+            CREATE TRIGGER announcements_fts_insert AFTER INSERT ON announcements BEGIN
+                INSERT INTO announcements_fts (rowid, title, content)
+                VALUES (new.id, new.title, decompress_content(new.content));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER announcements_fts_delete AFTER DELETE ON announcements BEGIN
+                INSERT INTO announcements_fts (announcements_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, decompress_content(old.content));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER announcements_fts_update AFTER UPDATE OF title, content ON announcements BEGIN
+                INSERT INTO announcements_fts (announcements_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, decompress_content(old.content));
+                INSERT INTO announcements_fts (rowid, title, content)
+                VALUES (new.id, new.title, decompress_content(new.content));
+            END
+        ''')
+        
+        # 首次创建时为已有公告建立索引
+        if not exists:
+            cursor.execute('''
+                INSERT INTO announcements_fts (rowid, title, content)
+                SELECT id, title, decompress_content(content) FROM announcements
+            ''')
+            logger.info("公告全文索引创建完成")
+        
+        self._init_bigram_index(cursor)
+        return True
+    
+    def _init_bigram_index(self, cursor):
+        """
+        创建双字检索词索引及同步触发器
+        trigram索引无法匹配少于3个字符的检索词，而常用的品种和关键词多为两个字（大豆、玉米），
+        因此另建一个无内容的FTS5表，按相邻两个字组成的词元索引标题和正文
+        
+        :param cursor: 数据库游标
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcements_bigram'")
+        exists = cursor.fetchone() is not None
+        
+        # 每个检索词只对应一个词元，不需要位置信息，detail='column'可明显减小索引
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS announcements_bigram USING fts5(
+                title,
+                content,
+                content='',
+                detail='column',
+                tokenize='unicode61'
+            )
+        ''')
+        
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_bigram_insert')
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_bigram_delete')
+        cursor.execute('DROP TRIGGER IF EXISTS announcements_bigram_update')
+        cursor.execute('''
+            CREATE TRIGGER announcements_bigram_insert AFTER INSERT ON announcements BEGIN
+                INSERT INTO announcements_bigram (rowid, title, content)
+                VALUES (new.id, bigram_tokens(new.title), bigram_tokens(decompress_content(new.content)));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER announcements_bigram_delete AFTER DELETE ON announcements BEGIN
+                INSERT INTO announcements_bigram (announcements_bigram, rowid, title, content)
+                VALUES ('delete', old.id, bigram_tokens(old.title), bigram_tokens(decompress_content(old.content)));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER announcements_bigram_update AFTER UPDATE OF title, content ON announcements BEGIN
+                INSERT INTO announcements_bigram (announcements_bigram, rowid, title, content)
+                VALUES ('delete', old.id, bigram_tokens(old.title), bigram_tokens(decompress_content(old.content)));
+                INSERT INTO announcements_bigram (rowid, title, content)
+                VALUES (new.id, bigram_tokens(new.title), bigram_tokens(decompress_content(new.content)));
+            END
+        ''')
+        
+        if not exists:
+            cursor.execute('''
+                INSERT INTO announcements_bigram (rowid, title, content)
+                SELECT id, bigram_tokens(title), bigram_tokens(decompress_content(content)) FROM announcements
+            ''')
+            logger.info("公告双字检索词索引创建完成")
+    
+    def _init_fingerprints(self, cursor):
+        """
+        创建近似重复检测的指纹表、分段索引表和duplicate_of字段
+        
+        :param cursor: 数据库游标
+        """
+        # 兼容原有表结构，缺少duplicate_of字段时添加
+        cursor.execute('PRAGMA table_info(announcements)')
+        if 'duplicate_of' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE announcements ADD COLUMN duplicate_of INTEGER')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_announcements_duplicate_of
+            ON announcements (duplicate_of)
+        ''')
+        
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'announcement_fingerprints'")
+        exists = cursor.fetchone() is not None
+        
+        # 每条未重复公告的标题/正文指纹
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS announcement_fingerprints (
+                announcement_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                simhash INTEGER NOT NULL,
+                numeric_sig TEXT NOT NULL,
+                PRIMARY KEY (announcement_id, kind)
+            ) WITHOUT ROWID
+        ''')
+        # 指纹各分段的值，近似重复的指纹至少有一段相同，按分段值索引查询候选
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fingerprint_bands (
+                kind TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                announcement_id INTEGER NOT NULL,
+                PRIMARY KEY (kind, band, value, announcement_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_fingerprint_bands_announcement
+            ON fingerprint_bands (announcement_id)
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS announcement_fingerprints_delete AFTER DELETE ON announcements BEGIN
+                DELETE FROM fingerprint_bands WHERE announcement_id = old.id;
+                DELETE FROM announcement_fingerprints WHERE announcement_id = old.id;
+                UPDATE announcements SET duplicate_of = NULL WHERE duplicate_of = old.id;
+            END
+        ''')
+        
+        # 首次创建时为已有公告建立指纹索引
+        if not exists and self.simhasher is not None:
+            count = self._index_fingerprints(cursor)
+            logger.info(f"公告指纹索引创建完成，共 {count} 条公告")
+        elif self.simhasher is not None:
+            self._index_plain_bands(cursor)
+    
+    def _index_plain_bands(self, cursor):
+        """
+        为早期建立的指纹补充不含数字签名的分段索引（供更正重发的公告查找原公告）
+        
+        :param cursor: 数据库游标
+        """
+        band_count = len(self.simhasher.plain_bands(0))
+        if cursor.execute('SELECT 1 FROM fingerprint_bands WHERE band >= ? LIMIT 1', (band_count,)).fetchone():
+            return
+        rows = cursor.execute('SELECT announcement_id, kind, simhash FROM announcement_fingerprints').fetchall()
+        cursor.executemany(
+            'INSERT OR IGNORE INTO fingerprint_bands (kind, band, value, announcement_id) VALUES (?, ?, ?, ?)',
+            [
+                (row['kind'], band_count + band, value, row['announcement_id'])
+                for row in rows
+                for band, value in enumerate(self.simhasher.plain_bands(row['simhash']))
+            ]
+        )
+        if rows:
+            logger.info(f"公告指纹索引已补充不含数字签名的分段，共 {len(rows)} 条指纹")
+    
+    def _init_auction_fields(self, cursor):
+        """
+        添加竞价交易结构化字段（公告类型、交易日期、品种、标的数量、计划交易数量）及其索引，
+        字段首次添加时为已有公告提取字段
+        
+        :param cursor: 数据库游标
+        """
+        cursor.execute('PRAGMA table_info(announcements)')
+        columns = {row[1] for row in cursor.fetchall()}
+        column_types = {
+            'notice_type': 'TEXT', 'trade_date': 'TEXT', 'commodity': 'TEXT',
+            'lot_count': 'INTEGER', 'quantity_tons': 'REAL'
+        }
+        added = False
+        for name in FIELD_NAMES:
+            if name not in columns:
+                cursor.execute(f'ALTER TABLE announcements ADD COLUMN {name} {column_types[name]}')
+                added = True
+        
+        # 按品种和交易日期范围统计时只需扫描索引，近似重复的公告以及交易结果公告、调整通知不计入
+        cursor.execute('DROP INDEX IF EXISTS idx_announcements_commodity_trade_date')
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_announcements_auction_totals
+            ON announcements (commodity, trade_date, quantity_tons, lot_count)
+            WHERE duplicate_of IS NULL AND notice_type = '{NOTICE_AUCTION}'
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_announcements_trade_date
+            ON announcements (trade_date)
+        ''')
+        
+        # 一次性为已有公告提取字段
+        if added and get_extractor() is not None:
+            rows = cursor.execute('SELECT id, title, content, publish_date FROM announcements').fetchall()
+            cursor.executemany(
+                'UPDATE announcements SET notice_type = ?, trade_date = ?, commodity = ?, lot_count = ?, '
+                'quantity_tons = ? WHERE id = ?',
+                self._extract_auction_fields(rows)
+            )
+            logger.info(f"公告结构化字段提取完成，共 {len(rows)} 条公告")
+    
+    @staticmethod
+    def _extract_auction_fields(rows):
+        """
+        为查询结果中的公告提取结构化字段
+        
+        :param rows: 包含id、title、content、publish_date的查询结果
+        :return: (notice_type, trade_date, commodity, lot_count, quantity_tons, id) 参数列表
+        """
+        extractor = get_extractor()
+        params = []
+        for row in rows:
+            fields = extractor.extract_announcement(
+                row['title'], decompress_content(row['content']), row['publish_date']
+            )
+            params.append(tuple(fields[name] for name in FIELD_NAMES) + (row['id'],))
+        return params
+    
+    def backfill_auction_fields(self, batch_size=1000):
+        """
+        为所有公告重新提取结构化字段（修改品种配置或提取规则后使用）
+        按id分批处理，字段提取在数据库锁之外进行，不会长时间阻塞监控任务的写入
+        
+        :param batch_size: 每批处理的公告数量
+        :return: 处理的公告数量
+        """
+        if get_extractor() is None:
+            return 0
+        
+        last_id = 0
+        total = 0
+        try:
+            while True:
+                with self._transaction() as conn:
+                    rows = conn.execute('''
+                        SELECT id, title, content, publish_date FROM announcements
+                        WHERE id > ? ORDER BY id LIMIT ?
+                    ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                
+                params = self._extract_auction_fields(rows)
+                with self._transaction() as conn:
+                    conn.executemany(
+                        'UPDATE announcements SET notice_type = ?, trade_date = ?, commodity = ?, lot_count = ?, '
+                        'quantity_tons = ? WHERE id = ?',
+                        params
+                    )
+                
+                last_id = rows[-1]['id']
+                total += len(rows)
+            
+            logger.info(f"公告结构化字段重新提取完成，共 {total} 条公告")
+        except Exception as e:
+            logger.error(f"重新提取公告结构化字段失败: {str(e)}")
+        return total
+    
+    def _index_fingerprints(self, cursor):
+        """
+        为所有未标记为重复的公告建立指纹索引（不重新判定重复关系）
+        
+        :param cursor: 数据库游标
+        :return: 建立索引的公告数量
+        """
+        rows = cursor.execute(
+            'SELECT id, title, content FROM announcements WHERE duplicate_of IS NULL ORDER BY id'
+        ).fetchall()
+        for row in rows:
+            for fingerprint in self._fingerprints(row['title'], decompress_content(row['content'])):
+                self._add_fingerprint(cursor, row['id'], fingerprint)
+        return len(rows)
+    
+    def _fingerprints(self, title, content=None):
+        """
+        计算公告的标题指纹和正文指纹（有正文时）
+        
+        :return: Fingerprint列表
+        """
+        fingerprints = [self.simhasher.fingerprint(title, 'title')]
+        if content:
+            fingerprints.append(self.simhasher.fingerprint(content, 'body'))
+        return [fingerprint for fingerprint in fingerprints if fingerprint is not None]
+    
+    def _add_fingerprint(self, cursor, announcement_id, fingerprint):
+        """
+        保存公告指纹及其分段索引
+        """
+        cursor.execute(
+            'DELETE FROM fingerprint_bands WHERE announcement_id = ? AND kind = ?',
+            (announcement_id, fingerprint.kind)
+        )
+        cursor.execute('''
+            INSERT OR REPLACE INTO announcement_fingerprints (announcement_id, kind, simhash, numeric_sig)
+            VALUES (?, ?, ?, ?)
+        ''', (announcement_id, fingerprint.kind, fingerprint.simhash, fingerprint.numeric))
+        # 不含数字签名的分段排在含数字签名的分段之后
+        cursor.executemany(
+            'INSERT OR IGNORE INTO fingerprint_bands (kind, band, value, announcement_id) VALUES (?, ?, ?, ?)',
+            [
+                (fingerprint.kind, band, value, announcement_id)
+                for band, value in enumerate(fingerprint.bands + fingerprint.plain_bands)
+            ]
+        )
+    
+    def _remove_fingerprints(self, cursor, announcement_id):
+        cursor.execute('DELETE FROM fingerprint_bands WHERE announcement_id = ?', (announcement_id,))
+        cursor.execute('DELETE FROM announcement_fingerprints WHERE announcement_id = ?', (announcement_id,))
+    
+    def _find_near_duplicate(self, cursor, fingerprint, before_id=None):
+        """
+        按分段索引查找与指纹近似重复的公告
+        数字签名相同的公告取最早的一条；更正重发的标题找不到时按不含数字签名的分段查找，
+        允许少量数字不同，取最近的一条（更正的通常是最近发布的公告）
+        
+        :param cursor: 数据库游标
+        :param fingerprint: Fingerprint对象
+        :param before_id: 只查找ID小于该值的公告（可选）
+        :return: 公告ID，没有近似重复时返回None
+        """
+        original_id = self._match_bands(cursor, fingerprint, fingerprint.bands, 0, before_id)
+        if original_id is None and fingerprint.correction:
+            original_id = self._match_bands(
+                cursor, fingerprint, fingerprint.plain_bands, len(fingerprint.bands), before_id, latest=True
+            )
+        return original_id
+    
+    def _match_bands(self, cursor, fingerprint, bands, first_band, before_id=None, latest=False):
+        """
+        按一组分段的值查询候选公告，逐个校验是否近似重复
+        
+        :param cursor: 数据库游标
+        :param fingerprint: Fingerprint对象
+        :param bands: 分段的值
+        :param first_band: 第一个分段在索引表中的编号
+        :param before_id: 只查找ID小于该值的公告（可选）
+        :param latest: 是否从最近的公告开始校验（默认从最早的开始）
+        :return: 公告ID，没有近似重复时返回None
+        """
+        query = ' UNION '.join(
+            ['SELECT announcement_id FROM fingerprint_bands WHERE kind = ? AND band = ? AND value = ?'] * len(bands)
+        )
+        params = []
+        for band, value in enumerate(bands, first_band):
+            params.extend((fingerprint.kind, band, value))
+        
+        candidate_ids = sorted(
+            (row[0] for row in cursor.execute(query, params) if before_id is None or row[0] < before_id),
+            reverse=latest
+        )
+        
+        for i in range(0, len(candidate_ids), 500):
+            chunk = candidate_ids[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT announcement_id, simhash, numeric_sig FROM announcement_fingerprints
+                WHERE kind = ? AND announcement_id IN ({placeholders})
+                ORDER BY announcement_id {'DESC' if latest else 'ASC'}
+            ''', [fingerprint.kind] + chunk)
+            for announcement_id, simhash, numeric in cursor.fetchall():
+                if self.simhasher.is_near_duplicate(fingerprint, simhash, numeric):
+                    return announcement_id
+        return None
+    
+    def _link_near_duplicates(self, cursor, announcements, fingerprints):
+        """
+        检测新插入的公告是否与已有公告近似重复，重复的公告关联到最早的公告，其余公告加入指纹索引
+        
+        :param cursor: 数据库游标（需在插入公告的同一事务中）
+        :param announcements: 新插入的公告列表，重复的公告会被设置duplicate_of字段
+        :param fingerprints: URL到指纹列表的映射
+        :return: 近似重复的公告数量
+        """
+        ids = {}
+        urls = [announcement.get('url') for announcement in announcements]
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'SELECT id, url FROM announcements WHERE url IN ({placeholders})', chunk)
+            ids.update((row[1], row[0]) for row in cursor.fetchall())
+        
+        duplicate_count = 0
+        for announcement in announcements:
+            announcement_id = ids.get(announcement.get('url'))
+            if announcement_id is None:
+                continue
+            
+            original_id = None
+            for fingerprint in fingerprints.get(announcement.get('url'), []):
+                original_id = self._find_near_duplicate(cursor, fingerprint, announcement_id)
+                if original_id is not None:
+                    break
+            
+            if original_id is None:
+                for fingerprint in fingerprints.get(announcement.get('url'), []):
+                    self._add_fingerprint(cursor, announcement_id, fingerprint)
+                continue
+            
+            cursor.execute('UPDATE announcements SET duplicate_of = ? WHERE id = ?', (original_id, announcement_id))
+            announcement['duplicate_of'] = original_id
+            duplicate_count += 1
+            logger.info(f"公告与已有公告 {original_id} 近似重复，不再通知: {announcement.get('title')}")
+        
+        return duplicate_count
+    
+    def rebuild_fingerprints(self):
+        """
+        重建指纹索引（修改近似重复检测参数后使用），已有的重复关系保持不变
+        
+        :return: 建立索引的公告数量，失败时返回0
+        """
+        if self.simhasher is None:
+            return 0
+        
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('DELETE FROM fingerprint_bands')
+                cursor.execute('DELETE FROM announcement_fingerprints')
+                count = self._index_fingerprints(cursor)
+                
+                logger.info(f"公告指纹索引重建完成，共 {count} 条公告")
+                return count
+        except Exception as e:
+            logger.error(f"重建公告指纹索引失败: {str(e)}")
+            return 0
+    
+    def insert_announcement(self, announcement):
+        """
+        插入公告数据
+        
+        :param announcement: 公告数据字典
+        :return: 插入结果（True/False）
+        """
+        if self._is_seen(announcement.get('url')):
+            logger.debug(f"公告已存在，跳过插入: {announcement.get('title')}")
+            return False
+        
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                # 兼容新旧表结构，使用publish_date字段名
+                cursor.execute('''
+                    INSERT OR IGNORE INTO announcements 
+                    (title, url, publish_date, source, notice_type, trade_date, commodity, lot_count, quantity_tons) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    announcement.get('title'),
+                    announcement.get('url'),
+                    announcement.get('pub_date'),  # 从pub_date获取值，存入publish_date字段
+                    announcement.get('source') or '',
+                    *(announcement.get(name) for name in FIELD_NAMES)
+                ))
+                
+                conn.commit()
+                self._mark_seen([announcement.get('url')])
+                
+                # 检查是否插入成功（未重复）
+                if cursor.rowcount > 0:
+                    logger.info(f"成功插入公告: {announcement.get('title')}")
+                    return True
+                else:
+                    logger.debug(f"公告已存在，跳过插入: {announcement.get('title')}")
+                    return False
+        except Exception as e:
+            logger.error(f"插入公告失败: {str(e)}")
+            return False
+    
+    def batch_insert_announcements(self, announcements):
+        """
+        批量插入公告数据，在一个事务中完成
+        
+        :param announcements: 公告数据列表
+        :return: 新插入（未重复）的公告列表，与已有公告近似重复的公告带有duplicate_of字段
+        :raises sqlite3.Error: 写入失败时抛出，事务已回滚
+        """
+        if not announcements:
+            return []
+        
+        # 批次内按URL去重，保留第一次出现的公告，内存索引中已有的URL直接跳过
+        unique_announcements = {}
+        for announcement in announcements:
+            url = announcement.get('url')
+            if url is not None and url not in unique_announcements and not self._is_seen(url):
+                unique_announcements[url] = announcement
+        
+        if not unique_announcements:
+            logger.debug(f"批量插入 {len(announcements)} 条公告均已存在，跳过数据库写入")
+            return []
+        
+        # 指纹在获取写锁之前计算，缩短持有写锁的时间
+        fingerprints = {}
+        if self.simhasher is not None:
+            fingerprints = {
+                url: self._fingerprints(announcement.get('title'), announcement.get('content'))
+                for url, announcement in unique_announcements.items()
+            }
+        
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                # 立即获取写锁，保证查询已存在URL与插入之间没有其他写入
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                urls = list(unique_announcements)
+                existing_urls = set()
+                for i in range(0, len(urls), 500):
+                    chunk = urls[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'SELECT url FROM announcements WHERE url IN ({placeholders})', chunk)
+                    existing_urls.update(row[0] for row in cursor.fetchall())
+                
+                new_announcements = [
+                    announcement for url, announcement in unique_announcements.items()
+                    if url not in existing_urls
+                ]
+                
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO announcements 
+                    (title, url, publish_date, source, notice_type, trade_date, commodity, lot_count, quantity_tons) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (
+                        announcement.get('title'),
+                        announcement.get('url'),
+                        announcement.get('pub_date'),
+                        announcement.get('source') or '',
+                        *(announcement.get(name) for name in FIELD_NAMES)
+                    )
+                    for announcement in new_announcements
+                ])
+                
+                # 在同一个写事务中检测近似重复，多个进程同时写入时也不会漏判
+                if self.simhasher is not None and new_announcements:
+                    self._link_near_duplicates(cursor, new_announcements, fingerprints)
+            
+            self._mark_seen(unique_announcements)
+            
+            for announcement in new_announcements:
+                logger.info(f"成功插入公告: {announcement.get('title')}")
+            logger.debug(f"批量插入 {len(announcements)} 条公告，其中 {len(new_announcements)} 条为新公告")
+            
+            return new_announcements
+        except Exception as e:
+            # 调用方据此决定是否推进水位线和回填检查点，失败不能与"没有新公告"混淆
+            logger.error(f"批量插入公告失败: {str(e)}")
+            raise
+    
+    def update_announcement_content(self, url, content):
+        """
+        保存公告正文，正文压缩后存储
+        
+        :param url: 公告URL
+        :param content: 正文文本
+        :return: 更新结果（True/False）
+        """
+        level = self.storage_config.get('content_compress_level', 6)
+        compressed = compress_content(content, level)
+        fingerprint = self.simhasher.fingerprint(content, 'body') if self.simhasher is not None else None
+        
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    'UPDATE announcements SET content = ? WHERE url = ?',
+                    (compressed, url)
+                )
+                updated = cursor.rowcount > 0
+                
+                if updated and fingerprint is not None:
+                    self._link_body_duplicate(cursor, url, fingerprint)
+                
+                if updated:
+                    self._fill_auction_fields(cursor, url, content)
+                
+                conn.commit()
+                return updated
+        except Exception as e:
+            logger.error(f"保存公告正文失败: {str(e)}")
+            return False
+    
+    def _link_body_duplicate(self, cursor, url, fingerprint):
+        """
+        正文抓取完成后按正文指纹检测近似重复，标题不同但正文相同的公告关联到最早的公告
+        
+        :param cursor: 数据库游标
+        :param url: 公告URL
+        :param fingerprint: 正文指纹
+        """
+        row = cursor.execute('SELECT id, duplicate_of FROM announcements WHERE url = ?', (url,)).fetchone()
+        if row is None or row['duplicate_of'] is not None:
+            return
+        
+        original_id = self._find_near_duplicate(cursor, fingerprint, row['id'])
+        if original_id is None:
+            self._add_fingerprint(cursor, row['id'], fingerprint)
+            return
+        
+        # 该公告不再作为原始公告，已关联到它的公告改为关联到最早的公告
+        cursor.execute('UPDATE announcements SET duplicate_of = ? WHERE id = ?', (original_id, row['id']))
+        cursor.execute('UPDATE announcements SET duplicate_of = ? WHERE duplicate_of = ?', (original_id, row['id']))
+        self._remove_fingerprints(cursor, row['id'])
+        logger.info(f"公告 {url} 的正文与已有公告 {original_id} 近似重复")
+    
+    def _fill_auction_fields(self, cursor, url, content):
+        """
+        用正文中提取的字段补全标题中缺少的结构化字段
+        
+        :param cursor: 数据库游标
+        :param url: 公告URL
+        :param content: 正文文本
+        """
+        extractor = get_extractor()
+        if extractor is None:
+            return
+        
+        row = cursor.execute(
+            'SELECT publish_date, notice_type, trade_date, commodity, lot_count, quantity_tons '
+            'FROM announcements WHERE url = ?',
+            (url,)
+        ).fetchone()
+        if row is None or all(row[name] is not None for name in FIELD_NAMES):
+            return
+        
+        fields = extractor.extract(content, row['publish_date'], is_title=False)
+        cursor.execute('''
+            UPDATE announcements SET
+                notice_type = COALESCE(notice_type, ?),
+                trade_date = COALESCE(trade_date, ?),
+                commodity = COALESCE(commodity, ?),
+                lot_count = COALESCE(lot_count, ?),
+                quantity_tons = COALESCE(quantity_tons, ?)
+            WHERE url = ?
+        ''', tuple(fields[name] for name in FIELD_NAMES) + (url,))
+    
+    def get_announcement_content(self, url):
+        """
+        获取公告正文
+        
+        :param url: 公告URL
+        :return: 正文文本，未抓取时返回None
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT content FROM announcements WHERE url = ?', (url,))
+                row = cursor.fetchone()
+                
+                return decompress_content(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"获取公告正文失败: {str(e)}")
+            return None
+    
+    def get_watermark(self, target_name):
+        """
+        获取监控目标的抓取水位线
+        
+        :param target_name: 监控目标名称
+        :return: 水位线字典（last_publish_time、last_url），不存在时返回None
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT last_publish_time, last_url FROM crawl_watermarks
+                    WHERE target_name = ?
+                ''', (target_name,))
+                
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"获取抓取水位线失败: {str(e)}")
+            return None
+    
+    def update_watermark(self, target_name, publish_time, url):
+        """
+        更新监控目标的抓取水位线
+        
+        :param target_name: 监控目标名称
+        :param publish_time: 最新公告的发布时间
+        :param url: 最新公告的URL
+        :return: 更新结果（True/False）
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO crawl_watermarks (target_name, last_publish_time, last_url, updated_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(target_name) DO UPDATE SET
+                        last_publish_time = excluded.last_publish_time,
+                        last_url = excluded.last_url,
+                        updated_at = excluded.updated_at
+                ''', (target_name, publish_time, url))
+                
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"更新抓取水位线失败: {str(e)}")
+            return False
+    
+    def is_announcement_exists(self, url):
+        """
+        检查公告是否已存在
+        
+        :param url: 公告URL
+        :return: 存在结果（True/False）
+        """
+        if self._is_seen(url):
+            return True
+        
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT COUNT(*) FROM announcements WHERE url = ?', (url,))
+                result = cursor.fetchone()
+                
+                if result[0] > 0:
+                    self._mark_seen([url])
+                    return True
+                return False
+        except Exception as e:
+            logger.error(f"检查公告是否存在失败: {str(e)}")
+            return False
+    
+    def get_latest_announcements(self, limit=10):
+        """
+        获取最新的公告
+        
+        :param limit: 获取数量限制
+        :return: 公告列表
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT * FROM announcements 
+                    ORDER BY crawl_date DESC, id DESC 
+                    LIMIT ?
+                ''', (limit,))
+                
+                return [self._row_to_dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取最新公告失败: {str(e)}")
+            return []
+    
+    def get_all_announcements(self):
+        """
+        获取所有公告
+        
+        数据量大时请使用iter_announcements逐批读取
+        
+        :return: 公告列表，查询失败时返回空列表
+        """
+        try:
+            return list(self.iter_announcements(order_by='crawl_date'))
+        except Exception as e:
+            logger.error(f"获取所有公告失败: {str(e)}")
+            return []
+    
+    def _fetch_announcements_page(self, limit, after, order_by):
+        """
+        按键集分页查询公告，查询出错时抛出异常
+        
+        :param limit: 每页数量
+        :param after: 上一页返回的游标，None表示第一页
+        :param order_by: 排序字段
+        :return: (公告列表, 下一页游标)
+        """
+        if order_by not in self.PAGE_ORDER_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        
+        # 以 (排序字段, id) 作为游标，借助索引直接定位到上一页末尾，不受偏移量影响
+        if after is None:
+            where_clause = ''
+            params = []
+        else:
+            where_clause = f'WHERE ({order_by}, id) < (?, ?)'
+            params = list(after)
+        
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT * FROM announcements 
+                {where_clause} 
+                ORDER BY {order_by} DESC, id DESC 
+                LIMIT ?
+            ''', params + [limit])
+            
+            rows = [self._row_to_dict(row) for row in cursor.fetchall()]
+        
+        next_cursor = (rows[-1][order_by], rows[-1]['id']) if len(rows) == limit else None
+        return rows, next_cursor
+    
+    def get_announcements_page(self, limit=100, after=None, order_by='publish_date'):
+        """
+        按键集分页获取公告，从新到旧排列
+        
+        :param limit: 每页数量
+        :param after: 上一页返回的游标，None表示第一页
+        :param order_by: 排序字段（publish_date、crawl_date或id）
+        :return: (公告列表, 下一页游标)，没有更多数据或查询失败时游标为None
+        """
+        if order_by not in self.PAGE_ORDER_COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        
+        try:
+            return self._fetch_announcements_page(limit, after, order_by)
+        except Exception as e:
+            logger.error(f"分页获取公告失败: {str(e)}")
+            return [], None
+    
+    def iter_announcements(self, batch_size=500, order_by='publish_date'):
+        """
+        逐批读取所有公告，从新到旧排列，内存占用与公告总数无关
+        
+        查询出错时抛出异常，调用方不会把读到一半的结果当作全部公告
+        
+        :param batch_size: 每批读取数量
+        :param order_by: 排序字段（publish_date、crawl_date或id）
+        :return: 公告生成器
+        """
+        cursor = None
+        while True:
+            try:
+                rows, cursor = self._fetch_announcements_page(batch_size, cursor, order_by)
+            except Exception as e:
+                logger.error(f"逐批读取公告失败: {str(e)}")
+                raise
+            yield from rows
+            if cursor is None:
+                break
+    
+    def delete_announcement(self, url):
+        """
+        删除指定URL的公告
+        
+        :param url: 公告URL
+        :return: 删除结果（True/False）
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('DELETE FROM announcements WHERE url = ?', (url,))
+                conn.commit()
+                
+                if self.seen_urls is not None:
+                    self.seen_urls.discard(url)
+                
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"删除公告失败: {str(e)}")
+            return False
+    
+    def delete_latest_by_date(self, date_str):
+        """
+        删除指定日期的最新公告
+        
+        :param date_str: 日期字符串（格式：YYYY-MM-DD）
+        :return: 删除结果（True/False）
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                # 先获取指定日期的最新公告URL
+                cursor.execute('''
+                    SELECT url FROM announcements 
+                    WHERE publish_date >= ? AND publish_date < ? 
+                    ORDER BY crawl_date DESC, id DESC 
+                    LIMIT 1
+                ''', (date_str, date_str + '\uffff'))
+                
+                result = cursor.fetchone()
+                if not result:
+                    logger.info(f"未找到 {date_str} 日期的公告")
+                    return False
+                
+                url = result[0]
+                
+                # 删除该公告
+                cursor.execute('DELETE FROM announcements WHERE url = ?', (url,))
+                conn.commit()
+                
+                if self.seen_urls is not None:
+                    self.seen_urls.discard(url)
+                
+                if cursor.rowcount > 0:
+                    logger.info(f"成功删除 {date_str} 日期的最新公告")
+                    return True
+                else:
+                    return False
+        except Exception as e:
+            logger.error(f"删除最新公告失败: {str(e)}")
+            return False
+    
+    def count_announcements(self):
+        """
+        获取公告总数
+        
+        :return: 公告总数
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT COUNT(*) FROM announcements')
+                result = cursor.fetchone()
+                
+                return result[0]
+        except Exception as e:
+            logger.error(f"获取公告总数失败: {str(e)}")
+            return 0
+    
+    def get_announcements_by_keyword(self, keyword):
+        """
+        根据关键词查询标题包含该关键词的公告
+        
+        :param keyword: 关键词
+        :return: 匹配的公告列表，按相关度排序
+        """
+        return self.search_announcements([keyword], limit=None, title_only=True)
     
-    def init_db(self):
+    def search_announcements(self, query, limit=20, offset=0, title_only=False):
         """
-        初始化数据库表
+        全文检索公告标题和正文
+        
+        不少于3个字符的检索词通过trigram索引匹配，两个字的检索词（如"大豆"）通过双字索引匹配，
+        结果按相关度排序；单字、含标点的短检索词或索引不可用时使用LIKE过滤
+        
+        :param query: 检索词列表，或以空格分隔检索词的字符串，多个检索词需同时匹配
+        :param limit: 返回数量限制（None表示不限制）
+        :param offset: 结果偏移量
+        :param title_only: 是否只检索标题
+        :return: 匹配的公告列表，按相关度（没有可用索引的检索词时按发布日期）排序
         """
+        terms = query.split() if isinstance(query, str) else [term for term in query if term]
+        if not terms:
+            return []
+        
+        trigram_terms = [term for term in terms if self.fts_enabled and len(term) >= 3]
+        bigram_terms = [term for term in terms
+                        if self.fts_enabled and len(term) == 2 and all(char.isalnum() for char in term)]
+        like_terms = [term for term in terms if term not in trigram_terms and term not in bigram_terms]
+        
+        def match_query(index_terms):
+            # 每个检索词作为短语匹配，只检索标题时加列过滤
+            column = '{title} : ' if title_only else ''
+            return ' '.join(column + '"' + term.replace('"', '""') + '"' for term in index_terms)
+        
+        conditions = []
+        params = []
+        for term in like_terms:
+            if title_only:
+                conditions.append('a.title LIKE ?')
+                params.append(f'%{term}%')
+            else:
+                conditions.append('(a.title LIKE ? OR decompress_content(a.content) LIKE ?)')
+                params.extend([f'%{term}%', f'%{term}%'])
+        
+        # 以其中一个索引取候选并排序（标题权重高于正文），另一个索引作为子查询过滤
+        if trigram_terms or bigram_terms:
+            table = 'announcements_fts' if trigram_terms else 'announcements_bigram'
+            sql = f'''
+                SELECT a.*, bm25({table}, 10.0, 1.0) AS rank
+                FROM {table}
+                JOIN announcements a ON a.id = {table}.rowid
+                WHERE {table} MATCH ?
+            '''
+            params.insert(0, match_query(trigram_terms or bigram_terms))
+            if trigram_terms and bigram_terms:
+                conditions.insert(
+                    0, 'a.id IN (SELECT rowid FROM announcements_bigram WHERE announcements_bigram MATCH ?)'
+                )
+                params.insert(1, match_query(bigram_terms))
+            if conditions:
+                sql += ' AND ' + ' AND '.join(conditions)
+            sql += ' ORDER BY rank'
+        else:
+            sql = 'SELECT a.* FROM announcements a WHERE ' + ' AND '.join(conditions)
+            sql += ' ORDER BY a.publish_date DESC, a.id DESC'
+        
+        sql += ' LIMIT ? OFFSET ?'
+        params.extend([limit if limit is not None else -1, offset])
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(sql, params)
+                
+                return [self._row_to_dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"全文检索公告失败: {str(e)}")
+            return []
+    
+    def get_auction_totals(self, commodities, start_date, end_date):
+        """
+        统计指定品种在交易日期范围内的竞价交易公告数、标的数量和计划交易数量
+        （只统计竞价交易公告，不含近似重复的公告、交易结果公告和调整通知，避免同一场交易重复计算）
+        
+        :param commodities: 品种名称或品种名称列表（如"进口大豆"）
+        :param start_date: 起始交易日期（YYYY-MM-DD，包含）
+        :param end_date: 截止交易日期（YYYY-MM-DD，包含）
+        :return: 统计字典（announcements、lot_count、quantity_tons）
+        """
+        if isinstance(commodities, str):
+            commodities = [commodities]
+        totals = {'announcements': 0, 'lot_count': 0, 'quantity_tons': 0.0}
+        if not commodities:
+            return totals
+        
+        placeholders = ','.join('?' * len(commodities))
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT COUNT(*), SUM(lot_count), SUM(quantity_tons) FROM announcements
+                    WHERE commodity IN ({placeholders}) AND trade_date BETWEEN ? AND ?
+                    AND duplicate_of IS NULL AND notice_type = '{NOTICE_AUCTION}'
+                ''', [*commodities, start_date, end_date])
+                
+                count, lot_count, quantity_tons = cursor.fetchone()
+                totals.update(announcements=count, lot_count=lot_count or 0, quantity_tons=quantity_tons or 0.0)
+                return totals
+        except Exception as e:
+            logger.error(f"统计竞价交易数量失败: {str(e)}")
+            return totals
+    
+    def get_weekly_auction_totals(self, commodities, date=None):
+        """
+        统计指定品种在某一周（周一至周日）的竞价交易数量
+        
+        :param commodities: 品种名称或品种名称列表
+        :param date: 该周内的任意日期（date对象或YYYY-MM-DD，默认今天）
+        :return: 统计字典（announcements、lot_count、quantity_tons、start_date、end_date）
+        """
+        if date is None:
+            date = datetime.date.today()
+        elif isinstance(date, str):
+            date = datetime.date.fromisoformat(date[:10])
+        
+        start_date = date - datetime.timedelta(days=date.weekday())
+        end_date = start_date + datetime.timedelta(days=6)
+        totals = self.get_auction_totals(commodities, start_date.isoformat(), end_date.isoformat())
+        totals.update(start_date=start_date.isoformat(), end_date=end_date.isoformat())
+        return totals
+    
+    def enqueue_notification(self, subject, content):
+        """
+        将通知写入发件箱
+        
+        :param subject: 邮件主题
+        :param content: 邮件内容
+        :return: 发件箱记录ID，失败时返回None
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    'INSERT INTO notification_outbox (subject, content) VALUES (?, ?)',
+                    (subject, content)
+                )
+                
+                conn.commit()
+                return cursor.lastrowid
+        except Exception as e:
+            logger.error(f"通知写入发件箱失败: {str(e)}")
+            return None
+    
+    def get_pending_notifications(self, limit=20):
+        """
+        获取已到发送时间的待发送通知
+        
+        :param limit: 获取数量限制
+        :return: 通知列表，按创建顺序排列
+        """
+        try:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                # 创建公告表，兼容原有表结构
                 cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS announcements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        url TEXT NOT NULL UNIQUE,
-                        content TEXT,
-                        source TEXT,
-                        publish_date TEXT NOT NULL,
-                        crawl_date TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                        keywords TEXT
-                    )
-                ''')
+                    SELECT * FROM notification_outbox 
+                    WHERE status = 'pending' AND next_attempt_at <= ? 
+                    ORDER BY id 
+                    LIMIT ?
+                ''', (time.time(), limit))
+                
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取待发送通知失败: {str(e)}")
+            return []
+    
+    def claim_pending_notifications(self, limit=20, claim_timeout=300):
+        """
+        取出已到发送时间的待发送通知，并在claim_timeout内不再被其他进程取出
+        
+        :param limit: 获取数量限制
+        :param claim_timeout: 占用时间（秒），发送结果未记录时超时后重新发送
+        :return: 通知列表，按创建顺序排列
+        """
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT * FROM notification_outbox 
+                    WHERE status = 'pending' AND next_attempt_at <= ? 
+                    ORDER BY id 
+                    LIMIT ?
+                ''', (now, limit))
+                rows = [dict(row) for row in cursor.fetchall()]
+                
+                # 条件更新：其他进程已取出的通知next_attempt_at已推后，不会被重复取出
+                claimed = []
+                for row in rows:
+                    cursor.execute('''
+                        UPDATE notification_outbox SET next_attempt_at = ? 
+                        WHERE id = ? AND status = 'pending' AND next_attempt_at <= ?
+                    ''', (now + claim_timeout, row['id'], now))
+                    if cursor.rowcount == 1:
+                        claimed.append(row)
                 
                 conn.commit()
-                logger.info(f"数据库初始化成功: {self.db_path}")
+                return claimed
         except Exception as e:
-            logger.error(f"数据库初始化失败: {str(e)}")
-            raise
+            logger.error(f"取出待发送通知失败: {str(e)}")
+            return []
     
-    def insert_announcement(self, announcement):
+    def mark_notification_sent(self, notification_id):
         """
-        插入公告数据
+        标记通知已发送
         
-        :param announcement: 公告数据字典
-        :return: 插入结果（True/False）
+        :param notification_id: 发件箱记录ID
+        :return: 更新结果（True/False）
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                # 兼容新旧表结构，使用publish_date字段名
                 cursor.execute('''
-                    INSERT OR IGNORE INTO announcements 
-                    (title, url, publish_date, source) 
-                    VALUES (?, ?, ?, ?)
+                    UPDATE notification_outbox 
+                    SET status = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP, last_error = NULL 
+                    WHERE id = ?
+                ''', (notification_id,))
+                
+                conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"标记通知已发送失败: {str(e)}")
+            return False
+    
+    def mark_notification_failed(self, notification_id, error, next_attempt_at=None):
+        """
+        记录通知发送失败
+        
+        :param notification_id: 发件箱记录ID
+        :param error: 错误信息
+        :param next_attempt_at: 下次重试的时间戳，None表示不再重试
+        :return: 更新结果（True/False）
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    UPDATE notification_outbox 
+                    SET status = ?, attempts = attempts + 1, last_error = ?, next_attempt_at = ? 
+                    WHERE id = ?
                 ''', (
-                    announcement.get('title'),
-                    announcement.get('url'),
-                    announcement.get('pub_date'),  # 从pub_date获取值，存入publish_date字段
-                    announcement.get('source') or ''
+                    'pending' if next_attempt_at is not None else 'failed',
+                    error,
+                    next_attempt_at or 0,
+                    notification_id
                 ))
                 
                 conn.commit()
-                
-                # 检查是否插入成功（未重复）
-                if cursor.rowcount > 0:
-                    logger.info(f"成功插入公告: {announcement.get('title')}")
-                    return True
-                else:
-                    logger.debug(f"公告已存在，跳过插入: {announcement.get('title')}")
-                    return False
+                return cursor.rowcount > 0
         except Exception as e:
-            logger.error(f"插入公告失败: {str(e)}")
+            logger.error(f"记录通知发送失败出错: {str(e)}")
             return False
     
-    def batch_insert_announcements(self, announcements):
+    def count_pending_notifications(self):
         """
-        批量插入公告数据
+        获取待发送通知数量
         
-        :param announcements: 公告数据列表
-        :return: 成功插入的数量
+        :return: 待发送通知数量
         """
-        if not announcements:
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT COUNT(*) FROM notification_outbox WHERE status = 'pending'")
+                
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"获取待发送通知数量失败: {str(e)}")
             return 0
+    
+    def get_backfill_checkpoint(self, target_name):
+        """
+        获取监控目标的历史回填检查点
         
-        success_count = 0
-        for announcement in announcements:
-            if self.insert_announcement(announcement):
-                success_count += 1
-        
-        return success_count
+        :param target_name: 监控目标名称
+        :return: 检查点字典（page_size、completed_pages、items、new_items、status、last_error），不存在时返回None
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT page_size, completed_pages, items, new_items, status, last_error
+                    FROM backfill_checkpoints WHERE target_name = ?
+                ''', (target_name,))
+                
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"获取回填检查点失败: {str(e)}")
+            return None
     
-    def is_announcement_exists(self, url):
+    def save_backfill_checkpoint(self, target_name, page_size, completed_pages, items, new_items,
+                                 status='running', last_error=None):
         """
-        检查公告是否已存在
+        保存监控目标的历史回填检查点
         
-        :param url: 公告URL
-        :return: 存在结果（True/False）
+        :param target_name: 监控目标名称
+        :param page_size: 每页公告数量
+        :param completed_pages: 已连续完成并入库的页数
+        :param items: 累计抓取的公告数量
+        :param new_items: 累计新入库的公告数量
+        :param status: 回填状态（running、done、failed、interrupted）
+        :param last_error: 最近一次错误信息
+        :return: 保存结果（True/False）
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('SELECT COUNT(*) FROM announcements WHERE url = ?', (url,))
-                result = cursor.fetchone()
+                cursor.execute('''
+                    INSERT INTO backfill_checkpoints
+                    (target_name, page_size, completed_pages, items, new_items, status, last_error, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(target_name) DO UPDATE SET
+                        page_size = excluded.page_size,
+                        completed_pages = excluded.completed_pages,
+                        items = excluded.items,
+                        new_items = excluded.new_items,
+                        status = excluded.status,
+                        last_error = excluded.last_error,
+                        updated_at = excluded.updated_at
+                ''', (target_name, page_size, completed_pages, items, new_items, status, last_error))
                 
-                return result[0] > 0
+                conn.commit()
+                return True
         except Exception as e:
-            logger.error(f"检查公告是否存在失败: {str(e)}")
+            logger.error(f"保存回填检查点失败: {str(e)}")
             return False
     
-    def get_latest_announcements(self, limit=10):
+    def register_lease_targets(self, target_names):
         """
-        获取最新的公告
+        为监控目标创建租约记录，已存在的记录保持不变
         
-        :param limit: 获取数量限制
-        :return: 公告列表
+        :param target_names: 监控目标名称列表
+        :return: 新创建的记录数量
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO target_leases (target_name) VALUES (?)',
+                    [(name,) for name in target_names]
+                )
+                
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"创建监控目标租约失败: {str(e)}")
+            return 0
+    
+    def claim_due_targets(self, worker_id, target_names, lease_ttl, limit):
+        """
+        认领已到执行时间且未被占用（或租约已过期）的监控目标
+        
+        :param worker_id: 工作进程标识
+        :param target_names: 可认领的监控目标名称集合
+        :param lease_ttl: 租约有效期（秒）
+        :param limit: 最多认领的数量
+        :return: 认领成功的租约列表（target_name、lease_token、last_run_at、poll_rate、poll_interval）
         """
+        if limit <= 0:
+            return []
+        
+        now = time.time()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT * FROM announcements 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                ''', (limit,))
+                    SELECT target_name, lease_token, last_run_at, poll_rate, poll_interval
+                    FROM target_leases
+                    WHERE next_run_at <= ? AND (owner IS NULL OR lease_expires_at <= ?)
+                    ORDER BY next_run_at
+                ''', (now, now))
+                candidates = [dict(row) for row in cursor.fetchall() if row['target_name'] in target_names]
                 
-                return [dict(row) for row in cursor.fetchall()]
+                # 条件更新保证同一租约只有一个进程认领成功，lease_token用于完成时校验租约仍属于自己
+                claimed = []
+                for lease in candidates[:limit]:
+                    cursor.execute('''
+                        UPDATE target_leases
+                        SET owner = ?, lease_token = lease_token + 1, lease_expires_at = ?,
+                            updated_at = CURRENT_TIMESTAMP
+                        WHERE target_name = ? AND lease_token = ?
+                            AND next_run_at <= ? AND (owner IS NULL OR lease_expires_at <= ?)
+                    ''', (worker_id, now + lease_ttl, lease['target_name'], lease['lease_token'], now, now))
+                    if cursor.rowcount == 1:
+                        lease['lease_token'] += 1
+                        claimed.append(lease)
+                
+                conn.commit()
+                return claimed
         except Exception as e:
-            logger.error(f"获取最新公告失败: {str(e)}")
+            logger.error(f"认领监控目标失败: {str(e)}")
             return []
     
-    def get_all_announcements(self):
+    def complete_lease(self, target_name, worker_id, lease_token, next_run_at, last_run_at,
+                       poll_rate=0.0, poll_interval=None):
         """
-        获取所有公告
+        执行完成后释放租约并写入下次执行时间
         
-        :return: 公告列表
+        :param target_name: 监控目标名称
+        :param worker_id: 工作进程标识
+        :param lease_token: 认领时的租约令牌
+        :param next_run_at: 下次执行时间戳
+        :param last_run_at: 本次执行时间戳
+        :param poll_rate: 发布速率估计（条/秒）
+        :param poll_interval: 轮询间隔（秒）
+        :return: 租约仍属于本进程并更新成功返回True，租约已被其他进程接管返回False
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT * FROM announcements 
-                    ORDER BY created_at DESC
-                ''')
+                    UPDATE target_leases
+                    SET owner = NULL, lease_expires_at = 0, next_run_at = ?, last_run_at = ?,
+                        poll_rate = ?, poll_interval = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE target_name = ? AND owner = ? AND lease_token = ?
+                ''', (next_run_at, last_run_at, poll_rate, poll_interval, target_name, worker_id, lease_token))
                 
-                return [dict(row) for row in cursor.fetchall()]
+                conn.commit()
+                return cursor.rowcount == 1
         except Exception as e:
-            logger.error(f"获取所有公告失败: {str(e)}")
-            return []
+            logger.error(f"释放监控目标租约失败: {str(e)}")
+            return False
     
-    def delete_announcement(self, url):
+    def renew_leases(self, worker_id, leases, lease_ttl):
         """
-        删除指定URL的公告
+        延长工作进程正在执行的租约，按(owner, lease_token)校验，已被接管的租约不会被续约
         
-        :param url: 公告URL
-        :return: 删除结果（True/False）
+        :param worker_id: 工作进程标识
+        :param leases: 监控目标名称到认领时租约令牌的映射
+        :param lease_ttl: 租约有效期（秒）
+        :return: 续约的数量
         """
+        if not leases:
+            return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('DELETE FROM announcements WHERE url = ?', (url,))
+                expires_at = time.time() + lease_ttl
+                cursor.executemany('''
+                    UPDATE target_leases SET lease_expires_at = ?
+                    WHERE target_name = ? AND owner = ? AND lease_token = ?
+                ''', [(expires_at, name, worker_id, token) for name, token in leases.items()])
+                
                 conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"续约失败: {str(e)}")
+            return 0
+    
+    def release_leases(self, worker_id):
+        """
+        释放工作进程持有的所有租约，目标保持原来的执行时间，可立即由其他进程认领
+        
+        :param worker_id: 工作进程标识
+        :return: 释放的数量
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
                 
-                return cursor.rowcount > 0
+                cursor.execute(
+                    'UPDATE target_leases SET owner = NULL, lease_expires_at = 0 WHERE owner = ?',
+                    (worker_id,)
+                )
+                
+                conn.commit()
+                return cursor.rowcount
         except Exception as e:
-            logger.error(f"删除公告失败: {str(e)}")
-            return False
+            logger.error(f"释放租约失败: {str(e)}")
+            return 0
     
-    def delete_latest_by_date(self, date_str):
+    def next_lease_due_time(self, target_names):
         """
-        删除指定日期的最新公告
+        获取下一个可认领的时间
         
-        :param date_str: 日期字符串（格式：YYYY-MM-DD）
-        :return: 删除结果（True/False）
+        :param target_names: 监控目标名称集合
+        :return: 时间戳，没有租约记录时返回None
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                # 先获取指定日期的最新公告URL
+                # 被占用的目标最早在租约过期后才能认领
                 cursor.execute('''
-                    SELECT url FROM announcements 
-                    WHERE pub_date LIKE ? 
-                    ORDER BY created_at DESC 
-                    LIMIT 1
-                ''', (f'{date_str}%',))
+                    SELECT target_name,
+                        CASE WHEN owner IS NULL THEN next_run_at ELSE MAX(next_run_at, lease_expires_at) END
+                    FROM target_leases
+                ''')
                 
-                result = cursor.fetchone()
-                if not result:
-                    logger.info(f"未找到 {date_str} 日期的公告")
-                    return False
+                due_times = [row[1] for row in cursor.fetchall() if row[0] in target_names]
+                return min(due_times) if due_times else None
+        except Exception as e:
+            logger.error(f"获取下一个到期租约失败: {str(e)}")
+            return None
+    
+    def heartbeat_worker(self, worker_id, host, pid, started_at):
+        """
+        记录工作进程心跳
+        
+        :param worker_id: 工作进程标识
+        :param host: 主机名
+        :param pid: 进程号
+        :param started_at: 进程启动时间戳
+        :return: 记录结果（True/False）
+        """
+        try:
+            with self._transaction() as conn:
+                cursor = conn.cursor()
                 
-                url = result[0]
+                cursor.execute('''
+                    INSERT INTO worker_heartbeats (worker_id, host, pid, started_at, heartbeat_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(worker_id) DO UPDATE SET
+                        host = excluded.host,
+                        pid = excluded.pid,
+                        started_at = excluded.started_at,
+                        heartbeat_at = excluded.heartbeat_at
+                ''', (worker_id, host, pid, started_at, time.time()))
                 
-                # 删除该公告
-                cursor.execute('DELETE FROM announcements WHERE url = ?', (url,))
                 conn.commit()
-                
-                if cursor.rowcount > 0:
-                    logger.info(f"成功删除 {date_str} 日期的最新公告")
-                    return True
-                else:
-                    return False
+                return True
         except Exception as e:
-            logger.error(f"删除最新公告失败: {str(e)}")
+            logger.error(f"记录工作进程心跳失败: {str(e)}")
             return False
     
-    def count_announcements(self):
+    def count_live_workers(self, max_age):
         """
-        获取公告总数
+        获取最近有心跳的工作进程数量
         
-        :return: 公告总数
+        :param max_age: 心跳的最长间隔（秒）
+        :return: 工作进程数量
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('SELECT COUNT(*) FROM announcements')
-                result = cursor.fetchone()
+                cursor.execute(
+                    'SELECT COUNT(*) FROM worker_heartbeats WHERE heartbeat_at >= ?',
+                    (time.time() - max_age,)
+                )
                 
-                return result[0]
+                return cursor.fetchone()[0]
         except Exception as e:
-            logger.error(f"获取公告总数失败: {str(e)}")
+            logger.error(f"获取工作进程数量失败: {str(e)}")
             return 0
     
-    def get_announcements_by_keyword(self, keyword):
+    def remove_worker(self, worker_id):
         """
-        根据关键词查询公告
+        删除工作进程的心跳记录
         
-        :param keyword: 关键词
-        :return: 匹配的公告列表
+        :param worker_id: 工作进程标识
+        :return: 删除结果（True/False）
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT * FROM announcements 
-                    WHERE title LIKE ? 
-                    ORDER BY created_at DESC
-                ''', (f'%{keyword}%',))
+                cursor.execute('DELETE FROM worker_heartbeats WHERE worker_id = ?', (worker_id,))
                 
-                return [dict(row) for row in cursor.fetchall()]
+                conn.commit()
+                return cursor.rowcount > 0
         except Exception as e:
-            logger.error(f"根据关键词查询公告失败: {str(e)}")
-            return []
+            logger.error(f"删除工作进程心跳失败: {str(e)}")
+            return False
     
     def clear_database(self):
         """
@@ -273,12 +2005,15 @@ class DatabaseManager:
         :return: 清空结果（True/False）
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._transaction() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('DELETE FROM announcements')
                 conn.commit()
                 
+                if self.seen_urls is not None:
+                    self.seen_urls.clear()
+                
                 logger.info("成功清空数据库")
                 return True
         except Exception as e:
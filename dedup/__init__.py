@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复检测模块
+对规范化后的公告标题（和正文）计算SimHash指纹，按分段（banded LSH）建立索引，
+转载、换栏目发布和更正重发的同一公告可在历史记录中以索引查询找到
+"""
+
+import re
+import hashlib
+import unicodedata
+from collections import Counter, namedtuple
+
+# 指纹位数
+SIMHASH_BITS = 64
+
+# 转载、更正等不影响公告身份的标记，以及"关于……的公告"中的虚词
+_NOISE_PATTERN = re.compile(r'【[^】]*】|\[[^\]]*\]|更正|补充|重新发布|重发|转载|转发|关于|有关|的')
+# 更正重发的标记，这类公告可能改动了日期、批次号或数量
+_CORRECTION_PATTERN = re.compile(r'更正|更改|修正|勘误|重新发布|重发')
+# 数字（含小数），用于数字签名，计算指纹时统一替换为占位符
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+# 空白和标点
+_SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+# 按字节查表把哈希值的每一位展开到独立的32位计数槽，累加后即得每一位为1的特征数，避免逐位循环
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_SPREAD_TABLE = [
+    sum(1 << (_LANE_BITS * bit) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+# 文本指纹：kind为'title'或'body'，simhash为有符号64位整数（便于存入SQLite），
+# numeric为数字签名，bands为含数字签名的各分段索引键，plain_bands为不含数字签名的各分段索引键，
+# correction表示标题带有更正重发标记
+Fingerprint = namedtuple('Fingerprint', ['kind', 'simhash', 'numeric', 'bands', 'plain_bands', 'correction'])
+
+
+def normalize_text(text):
+    """
+    规范化文本：全角转半角、转小写，去掉转载/更正标记、虚词、数字、空白和标点
+    
+    :param text: 原始文本
+    :return: 规范化后的文本
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _NOISE_PATTERN.sub('', text)
+    text = _NUMBER_PATTERN.sub('#', text)
+    return _SEPARATOR_PATTERN.sub('', text)
+
+
+def numeric_signature(text):
+    """
+    提取文本中的数字序列
+    同一模板的不同场次（日期、批次号、数量不同）文字几乎相同，只有数字签名一致才可能是同一公告
+    
+    :param text: 原始文本
+    :return: 以逗号连接的数字序列（去掉前导零），较长时（正文）为其摘要
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    numbers = []
+    for number in _NUMBER_PATTERN.findall(text):
+        integer, _, fraction = number.partition('.')
+        integer = integer.lstrip('0') or '0'
+        numbers.append(f"{integer}.{fraction.rstrip('0')}" if fraction.rstrip('0') else integer)
+    signature = ','.join(numbers)
+    if len(signature) > 64:
+        return hashlib.blake2b(signature.encode('utf-8'), digest_size=16).hexdigest()
+    return signature
+
+
+def numeric_difference(a, b):
+    """
+    比较两个数字签名中不同的数字个数
+    
+    :param a: 数字签名
+    :param b: 数字签名
+    :return: 数字个数相同时返回对应位置不同的个数，个数不同时返回None
+    """
+    numbers_a = a.split(',') if a else []
+    numbers_b = b.split(',') if b else []
+    if len(numbers_a) != len(numbers_b):
+        return None
+    return sum(x != y for x, y in zip(numbers_a, numbers_b))
+
+
+def simhash(text, shingle_size=2):
+    """
+    计算文本的SimHash
+    
+    :param text: 规范化后的文本
+    :param shingle_size: 特征的字符长度（中文不分词，按连续字符切分）
+    :return: 无符号64位整数
+    """
+    if len(text) <= shingle_size:
+        shingles = Counter([text])
+    else:
+        shingles = Counter(text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1))
+    
+    # 重复出现的特征按出现次数加权，每个不同的特征只计算一次哈希
+    lanes = 0
+    total = 0
+    for shingle, count in shingles.items():
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        spread = 0
+        for index, byte in enumerate(reversed(digest)):
+            spread |= _SPREAD_TABLE[byte] << (_LANE_BITS * 8 * index)
+        lanes += count * spread
+        total += count
+    
+    # 某一位为1的特征权重超过一半时，指纹的该位为1
+    result = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * ((lanes >> (_LANE_BITS * bit)) & _LANE_MASK) > total:
+            result |= 1 << bit
+    return result
+
+
+def _to_signed(value):
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def hamming_distance(a, b):
+    """
+    计算两个指纹的汉明距离
+    
+    :param a: 指纹（有符号或无符号64位整数）
+    :param b: 指纹
+    :return: 不同的位数
+    """
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count('1')
+
+
+class SimHasher:
+    """
+    SimHash指纹计算器
+    按鸽巢原理把64位指纹分成max_distance + 1段：汉明距离不超过max_distance的两个指纹至少有一段完全相同，
+    因此只需按各段的值做索引查询，再逐个校验候选的汉明距离。
+    公告大多套用同一模板，只有日期、批次等数字不同，索引键中同时包含数字签名的哈希，
+    避免同一模板的历史公告全部成为候选；
+    更正重发的标题可能改动了个别数字，另按不含数字签名的分段查找，允许少量数字不同
+    """
+    
+    def __init__(self, max_distance=3, min_length=6, max_numeric_changes=1):
+        """
+        :param max_distance: 判定为近似重复的最大汉明距离（1-15）
+        :param min_length: 规范化后文本的最短长度，过短的文本（如"公告"）不参与检测
+        :param max_numeric_changes: 更正重发的标题与原公告最多可以不同的数字个数
+        """
+        self.max_distance = min(max(int(max_distance), 1), 15)
+        self.min_length = min_length
+        self.max_numeric_changes = max_numeric_changes
+        
+        band_count = self.max_distance + 1
+        width, extra = divmod(SIMHASH_BITS, band_count)
+        self._band_ranges = []
+        offset = 0
+        for index in range(band_count):
+            band_width = width + (1 if index < extra else 0)
+            self._band_ranges.append((offset, (1 << band_width) - 1))
+            offset += band_width
+    
+    def fingerprint(self, text, kind='title'):
+        """
+        计算文本指纹
+        
+        :param text: 原始文本
+        :param kind: 指纹类型（title 或 body），不同类型分别索引
+        :return: Fingerprint对象，文本过短时返回None
+        """
+        normalized = normalize_text(text)
+        if len(normalized) < self.min_length:
+            return None
+        
+        # 正文较长，用三字符特征减少常用词的影响
+        value = simhash(normalized, 2 if kind == 'title' else 3)
+        numeric = numeric_signature(text)
+        
+        # 分段不超过32位，高32位放数字签名的哈希
+        numeric_hash = int.from_bytes(hashlib.blake2b(numeric.encode('utf-8'), digest_size=4).digest(), 'big')
+        bands = tuple(
+            _to_signed((numeric_hash << 32) | ((value >> offset) & mask))
+            for offset, mask in self._band_ranges
+        )
+        correction = kind == 'title' and _CORRECTION_PATTERN.search(unicodedata.normalize('NFKC', text)) is not None
+        return Fingerprint(kind, _to_signed(value), numeric, bands, self.plain_bands(value), correction)
+    
+    def plain_bands(self, simhash_value):
+        """
+        计算不含数字签名的分段索引键
+        
+        :param simhash_value: 指纹值（有符号或无符号64位整数）
+        :return: 各分段的值
+        """
+        value = simhash_value & ((1 << SIMHASH_BITS) - 1)
+        return tuple((value >> offset) & mask for offset, mask in self._band_ranges)
+    
+    def is_near_duplicate(self, fingerprint, simhash_value, numeric):
+        """
+        校验候选指纹是否与给定指纹近似重复
+        
+        :param fingerprint: Fingerprint对象
+        :param simhash_value: 候选的指纹值
+        :param numeric: 候选的数字签名
+        :return: 近似重复返回True
+        """
+        if numeric != fingerprint.numeric:
+            # 更正重发的标题允许改动少量数字（如日期、批次号、数量），其余公告数字必须一致
+            if not fingerprint.correction:
+                return False
+            changes = numeric_difference(numeric, fingerprint.numeric)
+            if changes is None or changes > self.max_numeric_changes:
+                return False
+        return hamming_distance(simhash_value, fingerprint.simhash) <= self.max_distance
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+结构化字段提取模块
+从竞价交易公告的标题和正文中提取公告类型、交易日期、品种、标的数量和计划交易数量，
+存入数据库的独立字段，统计查询可直接使用索引
+"""
+
+import re
+import datetime
+import functools
+import unicodedata
+from config import MONITOR_CONFIG
+from utils import get_keyword_matcher
+
+# 提取的字段
+FIELD_NAMES = ('notice_type', 'trade_date', 'commodity', 'lot_count', 'quantity_tons')
+
+# 公告类型：竞价交易公告（计划交易数量计入统计）、交易结果公告、调整通知
+NOTICE_AUCTION = 'auction'
+NOTICE_RESULT = 'result'
+NOTICE_ADJUSTMENT = 'adjustment'
+# 按顺序判断标题，"…交易结果公告"、"关于调整…竞价销售…的通知"虽含竞价销售字样，但不是新的交易
+_NOTICE_TYPE_PATTERNS = (
+    (NOTICE_RESULT, re.compile(r'结果|成交(?:情况|结果|统计|明细)')),
+    (NOTICE_ADJUSTMENT, re.compile(r'调整|变更|更改|更正|延期|推迟|暂停|取消|终止|撤销|撤回')),
+    (NOTICE_AUCTION, re.compile(r'竞价|拍卖|销售|采购|投放|交易')),
+)
+
+# 日期：2024年3月15日、2024-03-15、2024/3/15、2024.03.15，以及省略年份的3月15日
+# 省略年份时只接受"月…日"写法，且日期之后不能紧跟数字、"万"或"吨"，避免把"1.5万吨"等数量当作日期
+_DATE_PATTERN = re.compile(
+    r'(?:(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})|(\d{1,2})\s*月\s*(\d{1,2}))'
+    r'\s*日?(?![\d万吨]|\.\d)'
+)
+# 正文中带说明的交易日期，如"交易时间：2024年3月15日"、"定于3月15日"
+_LABELED_DATE_PATTERN = re.compile(
+    r'(?:(?:交易|竞价|拍卖|销售|采购)(?:日期|时间)\s*(?:[:：为是]|定于)?|定于|兹定于)\s*'
+    r'((?:\d{4}\s*[-/.年]\s*)?\d{1,2}\s*[-/.月]\s*\d{1,2})'
+)
+# 标的数量：共25个标的、标的数量：25个、标的25个
+_LOT_PATTERN = re.compile(r'(\d+)\s*个\s*标的|标的(?:数量|总数)?\s*[:：为共]?\s*(\d+)\s*个')
+# 交易数量：带"计划销售/采购/投放"等说明的优先，其次为第一个"xx吨"/"xx万吨"
+_LABELED_QUANTITY_PATTERN = re.compile(
+    r'(?:计划|拟)(?:竞价)?(?:销售|采购|拍卖|投放|交易)?(?:数量|总量)?[^\d。；;]{0,20}?'
+    r'(\d[\d,]*(?:\.\d+)?)\s*(万)?\s*吨'
+)
+_QUANTITY_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(万)?\s*吨')
+
+
+def _normalize(text):
+    # 全角数字、冒号、逗号转为半角
+    return unicodedata.normalize('NFKC', text or '')
+
+
+def _parse_date(match, reference_date=None):
+    """
+    将日期匹配结果转换为YYYY-MM-DD
+    
+    :param match: _DATE_PATTERN的匹配结果
+    :param reference_date: 参考日期（公告发布日期），用于补全省略的年份
+    :return: 日期字符串，无效日期或无法确定年份时返回None
+    """
+    year = match.group(1)
+    month = match.group(2) or match.group(4)
+    day = match.group(3) or match.group(5)
+    reference = None
+    if reference_date:
+        try:
+            reference = datetime.date.fromisoformat(str(reference_date)[:10])
+        except ValueError:
+            reference = None
+    
+    if year is None:
+        if reference is None:
+            return None
+        year = reference.year
+    
+    try:
+        date = datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    
+    # 省略年份时，年末发布的下一年年初的交易日期归入下一年
+    if match.group(1) is None and reference is not None and (reference - date).days > 180:
+        try:
+            date = date.replace(year=date.year + 1)
+        except ValueError:
+            return None
+    return date.isoformat()
+
+
+def classify_notice(title):
+    """
+    根据标题判断公告类型
+    
+    :param title: 公告标题
+    :return: NOTICE_AUCTION、NOTICE_RESULT、NOTICE_ADJUSTMENT之一，无法判断时返回None
+    """
+    title = _normalize(title)
+    for notice_type, pattern in _NOTICE_TYPE_PATTERNS:
+        if pattern.search(title):
+            return notice_type
+    return None
+
+
+def _parse_quantity(match):
+    number, unit = match.groups()
+    try:
+        value = float(number.replace(',', ''))
+    except ValueError:
+        return None
+    return value * 10000 if unit else value
+
+
+class AuctionFieldExtractor:
+    """
+    竞价交易公告字段提取器
+    正则表达式在模块加载时预编译，品种按别名用关键词自动机一次扫描匹配
+    """
+    
+    def __init__(self, commodities=None):
+        """
+        :param commodities: 品种名称到别名列表的映射，默认使用配置中的品种
+        """
+        if commodities is None:
+            commodities = MONITOR_CONFIG.get('extraction', {}).get('commodities', {})
+        
+        # 别名对应的品种名称，同一别名只属于第一个配置它的品种
+        self._aliases = {}
+        for name, aliases in commodities.items():
+            for alias in [name, *aliases]:
+                self._aliases.setdefault(alias, name)
+        self._matcher = get_keyword_matcher(list(self._aliases))
+    
+    def _match_commodity(self, text):
+        # 取最长的别名，"进口大豆"优先于"大豆"，"大豆油"优先于"大豆"
+        aliases = self._matcher.match(text)
+        if not aliases:
+            return None
+        return self._aliases[max(aliases, key=len)]
+    
+    def extract(self, text, reference_date=None, is_title=True):
+        """
+        从一段文本中提取字段
+        
+        :param text: 标题或正文
+        :param reference_date: 参考日期（公告发布日期），用于补全省略的年份
+        :param is_title: 是否为标题，标题中的第一个日期即为交易日期，正文只采用带说明的日期；公告类型只按标题判断
+        :return: 字段字典，未提取到的字段为None
+        """
+        text = _normalize(text)
+        fields = dict.fromkeys(FIELD_NAMES)
+        if not text:
+            return fields
+        
+        if is_title:
+            fields['notice_type'] = classify_notice(text)
+            for match in _DATE_PATTERN.finditer(text):
+                fields['trade_date'] = _parse_date(match, reference_date)
+                if fields['trade_date']:
+                    break
+        else:
+            for labeled in _LABELED_DATE_PATTERN.finditer(text):
+                match = _DATE_PATTERN.fullmatch(labeled.group(1))
+                fields['trade_date'] = _parse_date(match, reference_date) if match else None
+                if fields['trade_date']:
+                    break
+        
+        fields['commodity'] = self._match_commodity(text)
+        
+        match = _LOT_PATTERN.search(text)
+        if match:
+            fields['lot_count'] = int(match.group(1) or match.group(2))
+        
+        match = _LABELED_QUANTITY_PATTERN.search(text) or _QUANTITY_PATTERN.search(text)
+        if match:
+            fields['quantity_tons'] = _parse_quantity(match)
+        
+        return fields
+    
+    def extract_announcement(self, title, content=None, reference_date=None):
+        """
+        从公告标题和正文中提取字段，标题中的字段优先，正文补全标题中缺少的字段
+        
+        :param title: 公告标题
+        :param content: 公告正文（可选）
+        :param reference_date: 参考日期（公告发布日期）
+        :return: 字段字典
+        """
+        fields = self.extract(title, reference_date)
+        if content and any(value is None for value in fields.values()):
+            body_fields = self.extract(content, reference_date, is_title=False)
+            for name, value in fields.items():
+                if value is None:
+                    fields[name] = body_fields[name]
+        return fields
+    
+    def apply(self, announcement):
+        """
+        提取公告的字段并写入公告字典
+        
+        :param announcement: 格式化后的公告数据（title、pub_date，可选content）
+        :return: 公告数据
+        """
+        announcement.update(self.extract_announcement(
+            announcement.get('title'), announcement.get('content'), announcement.get('pub_date')
+        ))
+        return announcement
+
+
+@functools.lru_cache(maxsize=1)
+def get_extractor():
+    """
+    获取按配置创建的字段提取器，进程内只创建一次
+    
+    :return: AuctionFieldExtractor对象，未启用字段提取时返回None
+    """
+    if not MONITOR_CONFIG.get('extraction', {}).get('enabled', True):
+        return None
+    return AuctionFieldExtractor()
+
+
+def extract_fields(announcement):
+    """
+    按配置提取公告的结构化字段（未启用时不做处理）
+    
+    :param announcement: 格式化后的公告数据
+    :return: 公告数据
+    """
+    extractor = get_extractor()
+    if extractor is not None:
+        extractor.apply(announcement)
+    return announcement
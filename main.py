@@ -7,73 +7,211 @@
 """
 
 import time
+import logging
+import functools
+import contextvars
 import requests
-from apscheduler.schedulers.blocking import BlockingScheduler
 
 # 导入配置
 from config import MONITOR_CONFIG
 
 # 导入模块
-from utils import setup_logger
-from crawler import create_crawler
-from database import DatabaseManager
-from notification import NotificationManager
+import metrics
+import profiling
+from utils import setup_logger, get_keyword_matcher, deadline_scope, DeadlineExceeded, CircuitOpenError
+from crawler import create_crawler, commit_fetch
+from runtime import MonitorRuntime
+from scheduler import AdaptiveScheduler, LeaseWorker
+from backfill import run_backfill
 
-# 配置日志
-logger = setup_logger()
+# 日志处理器在main()中配置，导入本模块不创建日志文件和后台线程
+logger = logging.getLogger('GrainMonitor')
+
+
+# 抓取单个监控目标
+def fetch_target(target, watermark=None, crawler=None):
+    """
+    抓取并过滤单个监控目标的公告
+    
+    :param target: 监控目标配置
+    :param watermark: 该目标的抓取水位线（可选）
+    :param crawler: 爬虫实例（可选，默认按目标类型新建）
+    :return: (包含关键词的公告列表, 本次抓取到的最新公告或None, 列表中新发布的公告数量)
+    """
+    logger.info(f"监控目标: {target['name']}")
+    
+    # 创建爬虫实例
+    if crawler is None:
+        crawler = create_crawler(target.get('type', 'api'))
+    
+    # 获取公告，爬虫和重试的指标记录在当前目标名下
+    with metrics.target_scope(target['name']):
+        announcements = crawler.get_announcements(target, watermark)
+    metrics.ITEMS.inc(len(announcements), target=target['name'])
+    
+    # 过滤包含关键词的公告，合并后的关键词匹配器按关键词集合缓存
+    matcher = get_keyword_matcher(MONITOR_CONFIG.get('keywords', []) + target.get('keywords', []))
+    
+    filtered_announcements = []
+    with metrics.stage_timer('keyword_filter', target['name']):
+        for announcement in announcements:
+            title = announcement.get('title', '')
+            matched_keywords = matcher.match(title)
+            if matched_keywords or not matcher:  # 如果没有关键词，不过滤
+                filtered_announcements.append(announcement)
+    metrics.MATCHED_ITEMS.inc(len(filtered_announcements), target=target['name'])
+    
+    # 公告按发布时间从新到旧排列，第一条即为新的水位线
+    latest_announcement = announcements[0] if announcements else None
+    
+    # 自适应调度按目标列表本身的发布速率调整轮询间隔，计数不经过关键词过滤；
+    # 没有水位线时抓取到的是整个第一页，不代表这段时间内的发布数量
+    published_count = len(announcements) if watermark else 0
+    
+    return filtered_announcements, latest_announcement, published_count
+
+
+def fetch_all_targets(targets, watermarks=None, runtime=None):
+    """
+    抓取所有监控目标，按配置决定串行或并发执行
+    
+    :param targets: 监控目标配置列表
+    :param watermarks: 目标名称到抓取水位线的映射（可选）
+    :param runtime: 运行时上下文（可选），提供时复用其中的爬虫
+    :return: (目标配置, fetch_target结果或异常) 列表，顺序与targets一致
+    """
+    watermarks = watermarks or {}
+    get_crawler = runtime.get_crawler if runtime is not None else create_crawler
+    concurrency_config = MONITOR_CONFIG.get('concurrency', {})
+    max_workers = concurrency_config.get('max_workers', 8)
+    
+    if not concurrency_config.get('enabled', True) or max_workers <= 1 or len(targets) <= 1:
+        results = []
+        for target in targets:
+            try:
+                crawler = get_crawler(target.get('type', 'api'))
+                results.append((target, fetch_target(target, watermarks.get(target['name']), crawler)))
+            except Exception as e:
+                results.append((target, e))
+        return results
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    logger.info(f"并发抓取 {len(targets)} 个监控目标，最大并发数: {max_workers}")
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(targets)),
+                            thread_name_prefix='crawler') as executor:
+        # 工作线程沿用提交时的上下文（本次监控任务的截止时间等）
+        futures = [
+            (target, executor.submit(contextvars.copy_context().run, profiling.bind_worker(fetch_target),
+                                     target, watermarks.get(target['name']), get_crawler(target.get('type', 'api'))))
+            for target in targets
+        ]
+        
+        results = []
+        for target, future in futures:
+            try:
+                results.append((target, future.result()))
+            except Exception as e:
+                results.append((target, e))
+        return results
 
 
 # 监控任务
-def monitor_task():
-    """监控任务主函数"""
+def monitor_task(targets=None, runtime=None):
+    """
+    监控任务主函数
+    
+    :param targets: 本次监控的目标配置列表（可选，默认全部目标）
+    :param runtime: 运行时上下文（可选），未提供时创建临时上下文，任务结束后关闭
+    :return: 目标名称到列表中新发布公告数量（关键词过滤前）的映射，供自适应调度估计发布速率
+    """
+    if runtime is None:
+        with MonitorRuntime() as runtime:
+            return monitor_task(targets, runtime)
+    
     logger.info("开始执行监控任务...")
+    metrics.TICKS.inc()
+    
+    # 整个监控任务的重试和请求都不超过截止时间
+    tick_deadline = MONITOR_CONFIG.get('request', {}).get('tick_deadline', 0)
+    with metrics.stage_timer('tick', metrics.ALL_TARGETS), deadline_scope(tick_deadline):
+        return _run_monitor_task(targets, runtime)
+
+
+def _run_monitor_task(targets, runtime):
+    """
+    执行一次监控任务，由monitor_task统计整体耗时
     
-    # 初始化组件
-    db_manager = DatabaseManager()
-    notifier = NotificationManager()
+    :param targets: 本次监控的目标配置列表，为None时使用全部目标
+    :param runtime: 运行时上下文
+    :return: 目标名称到列表中新发布公告数量（关键词过滤前）的映射
+    """
+    db_manager = runtime.db_manager
     
     all_new_announcements = []
+    new_counts = {}
+    
+    targets = targets if targets is not None else MONITOR_CONFIG['targets']
+    watermarks = {target['name']: db_manager.get_watermark(target['name']) for target in targets}
     
-    # 遍历所有监控目标
-    for target in MONITOR_CONFIG['targets']:
-        logger.info(f"监控目标: {target['name']}")
+    # 抓取所有监控目标，结果按目标顺序依次入库
+    for target, result in fetch_all_targets(targets, watermarks, runtime):
+        if isinstance(result, requests.RequestException):
+            logger.error(f"监控目标 {target['name']} 网络连接失败: {str(result)}")
+            logger.error(f"目标URL: {target.get('api_url', target.get('url', ''))}")
+            logger.info("建议检查网络连接或目标网站是否可访问")
+            continue
+        if isinstance(result, (CircuitOpenError, DeadlineExceeded)):
+            logger.warning(f"监控目标 {target['name']} 本次跳过: {str(result)}")
+            continue
+        if isinstance(result, Exception):
+            logger.error(f"处理监控目标 {target['name']} 时出错: {str(result)}")
+            import traceback
+            logger.error(f"错误详情: {''.join(traceback.format_exception(type(result), result, result.__traceback__))}")
+            continue
+        
+        filtered_announcements, latest_announcement, published_count = result
+        new_counts[target['name']] = published_count
         
+        # 保存到数据库并收集新公告；入库失败时不推进水位线，下次监控重新抓取这些公告
         try:
-            # 创建爬虫实例
-            crawler = create_crawler(target.get('type', 'api'))
-            
-            # 获取公告
-            announcements = crawler.get_announcements(target)
-            
-            # 过滤包含关键词的公告
-            keywords = MONITOR_CONFIG.get('keywords', [])
-            target_keywords = target.get('keywords', [])
-            all_keywords = list(set(keywords + target_keywords))  # 合并关键词，去重
+            with metrics.stage_timer('db_insert', target['name']):
+                new_announcements = db_manager.batch_insert_announcements(filtered_announcements)
+        except Exception as e:
+            logger.error(f"监控目标 {target['name']} 公告入库失败，本次不推进水位线: {str(e)}")
+            continue
+        
+        try:
+            # 与已有公告近似重复的公告（转载、更正重发等）已关联到原公告，不再通知
+            unique_announcements = [a for a in new_announcements if a.get('duplicate_of') is None]
+            duplicate_count = len(new_announcements) - len(unique_announcements)
             
-            filtered_announcements = []
-            for announcement in announcements:
-                title = announcement.get('title', '')
-                matched_keywords = [kw for kw in all_keywords if kw in title]
-                if matched_keywords or not all_keywords:  # 如果没有关键词，不过滤
-                    filtered_announcements.append(announcement)
+            all_new_announcements.extend(unique_announcements)
+            metrics.NEW_ITEMS.inc(len(new_announcements), target=target['name'])
+            metrics.DUPLICATES.inc(duplicate_count, target=target['name'])
             
-            # 保存到数据库并收集新公告
-            new_announcements = []
-            for announcement in filtered_announcements:
-                if db_manager.insert_announcement(announcement):
-                    new_announcements.append(announcement)
+            # 在后台抓取新公告的正文
+            detail_fetcher = runtime.detail_fetcher
+            if detail_fetcher and unique_announcements:
+                detail_fetcher.submit(unique_announcements)
             
-            all_new_announcements.extend(new_announcements)
+            # 入库事务提交成功后才推进水位线，避免失败时遗漏公告
+            if latest_announcement:
+                db_manager.update_watermark(
+                    target['name'],
+                    latest_announcement.get('pub_date'),
+                    latest_announcement.get('url')
+                )
+            # 公告已入库，此后列表未变化时才可跳过解析
+            commit_fetch(target)
             
-            if new_announcements:
+            if duplicate_count:
+                logger.info(f"监控目标 {target['name']} 发现 {len(new_announcements)} 条新公告，"
+                            f"其中 {duplicate_count} 条与已有公告近似重复")
+            elif new_announcements:
                 logger.info(f"监控目标 {target['name']} 发现 {len(new_announcements)} 条新公告")
             else:
                 logger.info(f"监控目标 {target['name']} 没有发现新公告")
-        except requests.RequestException as e:
-            logger.error(f"监控目标 {target['name']} 网络连接失败: {str(e)}")
-            logger.error(f"目标URL: {target.get('api_url', target.get('url', ''))}")
-            logger.info("建议检查网络连接或目标网站是否可访问")
-            continue
         except Exception as e:
             logger.error(f"处理监控目标 {target['name']} 时出错: {str(e)}")
             import traceback
@@ -82,55 +220,181 @@ def monitor_task():
     
     # 发送邮件通知
     if all_new_announcements:
-        notifier.notify_new_announcements(all_new_announcements, MONITOR_CONFIG.get('keywords', []))
+        with metrics.stage_timer('notify', metrics.ALL_TARGETS):
+            notified = runtime.notifier.notify_new_announcements(all_new_announcements,
+                                                                 MONITOR_CONFIG.get('keywords', []))
+        outbox_sender = runtime.outbox_sender
+        if notified and outbox_sender is not None:
+            outbox_sender.wakeup()
     
     logger.info("监控任务执行完成")
+    
+    return new_counts
+
+
+def start_metrics_server():
+    """
+    按配置启动HTTP指标接口
+    
+    :return: MetricsServer对象，未启用或启动失败时返回None
+    """
+    http_config = MONITOR_CONFIG.get('metrics', {}).get('http', {})
+    if not http_config.get('enabled', False):
+        return None
+    
+    try:
+        server = metrics.MetricsServer(http_config.get('host', '127.0.0.1'), http_config.get('port', 9108)).start()
+    except OSError as e:
+        logger.error(f"指标接口启动失败: {str(e)}")
+        return None
+    
+    logger.info(f"指标接口已启动: {server.address}/metrics")
+    return server
+
+
+def output_metrics_summary():
+    """
+    输出本次运行的JSON指标摘要，并按配置写入文件
+    """
+    summary = metrics.summary_json()
+    print(summary)
+    
+    summary_file = MONITOR_CONFIG.get('metrics', {}).get('summary_file')
+    if summary_file:
+        try:
+            with open(summary_file, 'w', encoding='utf-8') as f:
+                f.write(summary)
+            logger.info(f"指标摘要已写入: {summary_file}")
+        except OSError as e:
+            logger.error(f"指标摘要写入失败: {str(e)}")
 
 
 import sys
 
+
+def run_backfill_mode(runtime):
+    """
+    回填历史公告：--backfill 之后的参数为目标名称（默认所有目标），--restart 忽略检查点重新开始
+    回填只写入数据库，不发送通知、不更新水位线和租约，不影响同时运行的常规监控
+    
+    :param runtime: 运行时上下文
+    """
+    index = sys.argv.index("--backfill")
+    names = []
+    for arg in sys.argv[index + 1:]:
+        if arg.startswith("--"):
+            break
+        names.append(arg)
+    
+    targets = MONITOR_CONFIG['targets']
+    if names:
+        targets = [target for target in targets if target['name'] in names]
+        unknown = set(names) - {target['name'] for target in targets}
+        if unknown:
+            logger.error(f"未找到监控目标: {', '.join(sorted(unknown))}")
+    
+    try:
+        results = run_backfill(targets, runtime.db_manager, restart="--restart" in sys.argv)
+    except KeyboardInterrupt:
+        logger.info("回填已中断，下次使用--backfill将从检查点继续")
+        results = {}
+    finally:
+        runtime.close(wait=True)
+    
+    output_metrics_summary()
+    failed = [name for name, result in results.items() if result.get('status') != 'done']
+    if failed:
+        logger.error(f"以下目标回填未完成，可再次运行--backfill从检查点继续: {', '.join(failed)}")
+    logger.info("历史公告回填结束")
+
+
 # 主函数
 def main():
     """主程序入口"""
+    setup_logger()
     logger.info("粮食公告监控系统启动")
     
-    # 初始化数据库
+    # 初始化数据库和各组件，运行期间的所有监控任务复用同一个运行时上下文
     try:
-        db_manager = DatabaseManager()
+        runtime = MonitorRuntime()
         logger.info("数据库初始化完成")
     except Exception as e:
         logger.error(f"数据库初始化失败，程序退出: {str(e)}")
         return
     
-    # 立即执行一次监控任务
-    monitor_task()
+    # --backfill 选项回填历史公告后退出，可与常规监控进程同时运行
+    if "--backfill" in sys.argv:
+        run_backfill_mode(runtime)
+        return
+    
+    run_once = "--no-scheduler" in sys.argv
+    # --worker 选项以工作进程方式运行，多个进程通过数据库租约分担监控目标
+    worker_mode = "--worker" in sys.argv and not run_once
+    
+    # --profile 选项对监控任务做CPU分析和内存分配跟踪，按配置每N次任务采样一次
+    task = functools.partial(monitor_task, runtime=runtime)
+    if "--profile" in sys.argv:
+        profiler = profiling.TickProfiler()
+        task = profiler.wrap(task)
+        logger.info(f"已启用性能分析，每 {profiler.every_n_ticks} 次监控任务分析一次，结果保存在: {profiler.output_dir}")
+    
+    # 定时运行时，后台线程持续发送发件箱中的通知（包括上次运行未发送成功的）
+    outbox_sender = runtime.outbox_sender
+    if outbox_sender and not run_once:
+        outbox_sender.start()
+    
+    # 立即执行一次监控任务（工作进程由租约决定各目标的执行时间，不单独执行）
+    initial_results = task() if not worker_mode else None
     
     # 检查命令行参数，决定是否启动定时任务
     # --no-scheduler 选项用于在CI/CD环境中只执行一次
-    if "--no-scheduler" not in sys.argv:
-        # 设置定时任务
+    if run_once:
+        logger.info("已设置--no-scheduler选项，只执行一次监控任务，不启动定时任务")
+        if outbox_sender:
+            outbox_sender.flush()
+        runtime.close(wait=True)
+        output_metrics_summary()
+        logger.info("粮食公告监控系统执行完成")
+        return
+    
+    # 定时运行时提供本地HTTP指标接口
+    metrics_server = start_metrics_server()
+    
+    if worker_mode:
+        scheduler = LeaseWorker(task, MONITOR_CONFIG['targets'], runtime.db_manager)
+        start_scheduler = scheduler.start
+    elif MONITOR_CONFIG.get('schedule', {}).get('mode', 'adaptive') == 'adaptive':
+        # 每个监控目标按发布频率自适应调整轮询间隔
+        scheduler = AdaptiveScheduler(task, MONITOR_CONFIG['targets'])
+        start_scheduler = lambda: scheduler.start(initial_results)
+    else:
+        # 设置定时任务（APScheduler只在固定间隔模式下使用，其余运行方式不导入）
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        
         scheduler = BlockingScheduler()
         scheduler.add_job(
-            monitor_task,
+            task,
             'interval',
             seconds=MONITOR_CONFIG['monitor_interval'],
             id='grain_monitor_job',
             name='粮食公告监控任务'
         )
+        start_scheduler = scheduler.start
         
         logger.info(f"定时任务已设置，监控间隔: {MONITOR_CONFIG['monitor_interval']}秒")
-        
-        try:
-            scheduler.start()
-        except KeyboardInterrupt:
-            logger.info("系统已停止")
-            scheduler.shutdown()
-        except Exception as e:
-            logger.error(f"定时任务执行失败: {str(e)}")
-            scheduler.shutdown()
-    else:
-        logger.info("已设置--no-scheduler选项，只执行一次监控任务，不启动定时任务")
-        logger.info("粮食公告监控系统执行完成")
+    
+    try:
+        start_scheduler()
+    except KeyboardInterrupt:
+        logger.info("系统已停止")
+        scheduler.shutdown()
+    except Exception as e:
+        logger.error(f"定时任务执行失败: {str(e)}")
+        scheduler.shutdown()
+    finally:
+        runtime.close(wait=False)
+        if metrics_server:
+            metrics_server.stop()
 
 
 if __name__ == '__main__':
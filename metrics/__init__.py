@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+指标模块
+按监控目标和处理阶段统计计数器和耗时直方图，支持Prometheus文本格式和JSON摘要输出
+"""
+
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# 默认的耗时直方图分桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 未归属具体监控目标时使用的标签值
+ALL_TARGETS = '_all'
+
+# 当前线程（或协程）正在处理的监控目标，供爬虫、重试等下层代码打标签
+_current_target = contextvars.ContextVar('current_target', default=ALL_TARGETS)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    计数器
+    按标签值分别累计，只增不减
+    """
+    
+    kind = 'counter'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        
+        self._lock = threading.Lock()
+        self._values = {}
+    
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+    
+    def inc(self, value=1, **labels):
+        """
+        增加计数
+        
+        :param value: 增加的数量
+        :param labels: 标签值
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+    
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+    
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+    
+    def summary(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            {'labels': dict(zip(self.labelnames, key)), 'value': value}
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """
+    直方图
+    按标签值分别统计观测值的分桶计数、总和、次数和最大值
+    """
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        
+        self._lock = threading.Lock()
+        # 标签值 -> [各分桶计数, 总和, 次数, 最大值]
+        self._values = {}
+    
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+    
+    def observe(self, value, **labels):
+        """
+        记录一次观测值
+        
+        :param value: 观测值（耗时直方图单位为秒）
+        :param labels: 标签值
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0, 0.0]
+                self._values[key] = state
+            
+            bucket_counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+            if value > state[3]:
+                state[3] = value
+    
+    @contextmanager
+    def time(self, **labels):
+        """
+        统计代码块耗时
+        
+        :param labels: 标签值
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+    
+    def _snapshot(self):
+        with self._lock:
+            return sorted((key, (list(state[0]), state[1], state[2], state[3]))
+                          for key, state in self._values.items())
+    
+    def _quantile(self, bucket_counts, count, quantile):
+        """
+        根据分桶计数估计分位数（取所在分桶的上限）
+        """
+        if not count:
+            return 0.0
+        rank = quantile * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for key, (bucket_counts, total, count, _) in self._snapshot():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+    
+    def summary(self):
+        items = [
+            {
+                'labels': dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': round(total, 6),
+                'avg': round(total / count, 6) if count else 0.0,
+                'p95_le': self._quantile(bucket_counts, count, 0.95),
+                'max': round(maximum, 6)
+            }
+            for key, (bucket_counts, total, count, maximum) in self._snapshot()
+        ]
+        # 按总耗时从高到低排列，便于找出占用时间最多的目标和阶段
+        items.sort(key=lambda item: item['sum'], reverse=True)
+        return items
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+    
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def _all(self):
+        with self._lock:
+            return list(self._metrics.values())
+    
+    def render_prometheus(self):
+        """
+        生成Prometheus文本格式的指标
+        
+        :return: 指标文本
+        """
+        lines = []
+        for metric in self._all():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+    
+    def summary(self):
+        """
+        生成JSON摘要
+        
+        :return: 指标名称到各标签统计值的字典
+        """
+        return {metric.name: metric.summary() for metric in self._all()}
+    
+    def reset(self):
+        for metric in self._all():
+            metric.reset()
+
+
+# 全局指标注册表及监控系统使用的指标
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'grain_stage_duration_seconds', '各处理阶段耗时（秒）', ('stage', 'target'))
+ITEMS = REGISTRY.counter(
+    'grain_items_total', '抓取到的公告数量（水位线之后）', ('target',))
+MATCHED_ITEMS = REGISTRY.counter(
+    'grain_matched_items_total', '通过关键词过滤的公告数量', ('target',))
+NEW_ITEMS = REGISTRY.counter(
+    'grain_new_items_total', '新入库的公告数量', ('target',))
+DUPLICATES = REGISTRY.counter(
+    'grain_near_duplicates_total', '与已有公告近似重复而不通知的新公告数量', ('target',))
+UNCHANGED = REGISTRY.counter(
+    'grain_unchanged_total', '列表未变化而跳过的次数', ('target',))
+RETRIES = REGISTRY.counter(
+    'grain_retries_total', '请求重试次数', ('target', 'func'))
+FAILURES = REGISTRY.counter(
+    'grain_failures_total', '处理失败次数', ('stage', 'target'))
+TICKS = REGISTRY.counter(
+    'grain_ticks_total', '监控任务执行次数')
+CIRCUIT_REJECTED = REGISTRY.counter(
+    'grain_circuit_rejected_total', '主机熔断期间被直接拒绝的请求数量', ('host',))
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    'grain_rate_limit_wait_seconds', '按主机限流的排队等待时间（秒）', ('host',))
+LOG_DROPPED = REGISTRY.counter(
+    'grain_log_dropped_total', '日志队列已满而丢弃的日志数量')
+LEASES_CLAIMED = REGISTRY.counter(
+    'grain_leases_claimed_total', '工作进程认领的监控目标租约数量', ('target',))
+LEASES_LOST = REGISTRY.counter(
+    'grain_leases_lost_total', '执行期间租约过期并被其他进程接管的次数', ('target',))
+BACKFILL_PAGES = REGISTRY.counter(
+    'grain_backfill_pages_total', '历史回填抓取的页数', ('target',))
+
+
+def current_target():
+    """
+    获取当前正在处理的监控目标名称
+    
+    :return: 目标名称，未设置时返回'_all'
+    """
+    return _current_target.get()
+
+
+@contextmanager
+def target_scope(target_name):
+    """
+    在代码块内将当前监控目标设置为指定目标
+    
+    :param target_name: 目标名称
+    """
+    token = _current_target.set(target_name)
+    try:
+        yield
+    finally:
+        _current_target.reset(token)
+
+
+@contextmanager
+def stage_timer(stage, target=None):
+    """
+    统计处理阶段的耗时，代码块抛出异常时同时记录一次失败
+    
+    :param stage: 阶段名称
+    :param target: 目标名称（可选，默认使用当前监控目标）
+    """
+    target = target if target is not None else _current_target.get()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        FAILURES.inc(stage=stage, target=target)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage, target=target)
+
+
+def summary_json(indent=2):
+    """
+    生成JSON格式的指标摘要
+    
+    :param indent: 缩进
+    :return: JSON字符串
+    """
+    return json.dumps(REGISTRY.summary(), ensure_ascii=False, indent=indent)
+
+
+class MetricsServer:
+    """
+    指标HTTP服务
+    /metrics 返回Prometheus文本格式，/metrics.json 返回JSON摘要
+    """
+    
+    def __init__(self, host='127.0.0.1', port=9108, registry=None):
+        # 只有定时运行且启用指标接口时才需要http.server，单次运行不导入
+        from http.server import ThreadingHTTPServer
+        
+        self.registry = registry or REGISTRY
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        
+        registry = self.registry
+        
+        class Handler(BaseHTTPRequestHandler):
+        
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = registry.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(registry.summary(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def start(self):
+        """
+        在后台线程中启动指标服务
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """
+        停止指标服务
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
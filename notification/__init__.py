@@ -6,13 +6,14 @@
 负责发送邮件通知
 """
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from utils import setup_logger
+import random
+import logging
+import threading
+from utils import get_keyword_matcher
 from config import MONITOR_CONFIG
+import metrics
 
-logger = setup_logger()
+logger = logging.getLogger('GrainMonitor')
 
 
 class EmailNotification:
@@ -30,9 +31,88 @@ class EmailNotification:
         
         self.smtp_server = self.email_config.get('smtp_server')
         self.smtp_port = self.email_config.get('smtp_port', 465)
+        self.use_ssl = self.email_config.get('use_ssl', True)
         self.username = self.email_config.get('username')
         self.password = self.email_config.get('password')
         self.recipient = self.email_config.get('recipient')
+        
+        # 复用已登录的SMTP连接
+        self._server = None
+        self._server_lock = threading.Lock()
+    
+    def is_configured(self):
+        """
+        检查邮件配置是否完整
+        
+        :return: 配置完整返回True
+        """
+        return all([self.smtp_server, self.username, self.password, self.recipient])
+    
+    def _get_server(self):
+        """
+        获取已登录的SMTP连接，连接失效时重新建立
+        
+        :return: smtplib.SMTP_SSL或smtplib.SMTP对象
+        """
+        # smtplib和email.mime只在真正发送邮件时导入，没有新公告的运行不必加载
+        import smtplib
+        
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close_server()
+        
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.smtp_server, self.smtp_port)
+        server.login(self.username, self.password)
+        self._server = server
+        logger.debug(f"已建立SMTP连接: {self.smtp_server}:{self.smtp_port}")
+        return server
+    
+    def _close_server(self):
+        if self._server is None:
+            return
+        import smtplib
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+    
+    def send_message(self, subject, content):
+        """
+        通过复用的SMTP连接发送邮件，失败时抛出异常
+        
+        :param subject: 邮件主题
+        :param content: 邮件内容
+        """
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+        
+        # 创建邮件对象
+        msg = MIMEMultipart()
+        msg['From'] = self.username
+        msg['To'] = self.recipient
+        msg['Subject'] = subject
+        
+        # 添加邮件正文
+        msg.attach(MIMEText(content, 'plain', 'utf-8'))
+        
+        # 发送邮件，连接在发送过程中断开时重连一次
+        with self._server_lock:
+            try:
+                self._get_server().send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._server = None
+                self._get_server().send_message(msg)
+        
+        logger.info(f"成功发送邮件到 {self.recipient}")
     
     def send_email(self, subject, content):
         """
@@ -46,31 +126,24 @@ class EmailNotification:
             logger.info("邮件通知已禁用，跳过发送")
             return False
         
-        if not all([self.smtp_server, self.username, self.password, self.recipient]):
+        if not self.is_configured():
             logger.error("邮件配置不完整，无法发送邮件")
             return False
         
         try:
-            # 创建邮件对象
-            msg = MIMEMultipart()
-            msg['From'] = self.username
-            msg['To'] = self.recipient
-            msg['Subject'] = subject
-            
-            # 添加邮件正文
-            msg.attach(MIMEText(content, 'plain', 'utf-8'))
-            
-            # 发送邮件
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port) as server:
-                server.login(self.username, self.password)
-                server.send_message(msg)
-            
-            logger.info(f"成功发送邮件到 {self.recipient}")
+            self.send_message(subject, content)
             return True
         except Exception as e:
             logger.error(f"发送邮件失败: {str(e)}")
             return False
     
+    def close(self):
+        """
+        关闭SMTP连接
+        """
+        with self._server_lock:
+            self._close_server()
+    
     def send_announcement_notification(self, announcements, keywords=None):
         """
         发送公告通知邮件
@@ -79,23 +152,38 @@ class EmailNotification:
         :param keywords: 关键词列表（可选）
         :return: 发送结果（True/False）
         """
+        message = self.build_announcement_message(announcements, keywords)
+        if message is None:
+            return False
+        
+        return self.send_email(*message)
+    
+    def build_announcement_message(self, announcements, keywords=None):
+        """
+        构建公告通知邮件
+        
+        :param announcements: 公告列表
+        :param keywords: 关键词列表（可选）
+        :return: (邮件主题, 邮件内容)，没有需要通知的公告时返回None
+        """
         if not announcements:
             logger.info("没有新公告需要通知")
-            return False
+            return None
         
         # 如果提供了关键词，过滤包含关键词的公告
         if keywords:
+            matcher = get_keyword_matcher(keywords)
             filtered_announcements = []
             for announcement in announcements:
                 title = announcement.get('title', '')
-                matched_keywords = [kw for kw in keywords if kw in title]
+                matched_keywords = matcher.match(title)
                 if matched_keywords:
                     announcement['matched_keywords'] = matched_keywords
                     filtered_announcements.append(announcement)
             
             if not filtered_announcements:
                 logger.info("没有匹配关键词的新公告需要通知")
-                return False
+                return None
             
             announcements = filtered_announcements
         
@@ -117,7 +205,7 @@ class EmailNotification:
         content += f"\n总计: {len(announcements)} 条新公告\n"
         content += f"监控时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
         
-        return self.send_email(subject, content)
+        return subject, content
 
 
 class NotificationManager:
@@ -126,8 +214,15 @@ class NotificationManager:
     负责管理多种通知方式
     """
     
-    def __init__(self):
+    def __init__(self, db_manager=None):
+        """
+        :param db_manager: 数据库管理器（可选），提供时通知写入发件箱由后台线程发送
+        """
         self.email_notifier = EmailNotification()
+        self.db_manager = db_manager
+        
+        outbox_config = MONITOR_CONFIG.get('notification', {}).get('outbox', {})
+        self.use_outbox = db_manager is not None and outbox_config.get('enabled', False)
     
     def notify_new_announcements(self, announcements, keywords=None):
         """
@@ -135,10 +230,146 @@ class NotificationManager:
         
         :param announcements: 公告列表
         :param keywords: 关键词列表（可选）
-        :return: 通知结果（True/False）
+        :return: 通知结果（True/False），使用发件箱时表示是否成功写入发件箱
         """
         # 目前只支持邮件通知
-        return self.email_notifier.send_announcement_notification(announcements, keywords)
+        if not self.use_outbox:
+            return self.email_notifier.send_announcement_notification(announcements, keywords)
+        
+        if not self.email_notifier.enabled:
+            logger.info("邮件通知已禁用，跳过发送")
+            return False
+        
+        message = self.email_notifier.build_announcement_message(announcements, keywords)
+        if message is None:
+            return False
+        
+        notification_id = self.db_manager.enqueue_notification(*message)
+        if notification_id is None:
+            return False
+        
+        logger.info(f"通知已写入发件箱，等待后台发送（ID: {notification_id}）")
+        return True
+
+
+class OutboxSender:
+    """
+    发件箱发送器
+    在后台线程中批量发送发件箱中的通知，复用SMTP连接，失败时按指数退避重试
+    """
+    
+    def __init__(self, db_manager, email_notifier=None):
+        self.outbox_config = MONITOR_CONFIG.get('notification', {}).get('outbox', {})
+        self.batch_size = self.outbox_config.get('batch_size', 20)
+        self.poll_interval = self.outbox_config.get('poll_interval', 10)
+        self.max_attempts = self.outbox_config.get('max_attempts', 8)
+        self.retry_base_delay = self.outbox_config.get('retry_base_delay', 30)
+        self.retry_max_delay = self.outbox_config.get('retry_max_delay', 3600)
+        self.claim_timeout = self.outbox_config.get('claim_timeout', 300)
+        
+        self.db_manager = db_manager
+        self.email_notifier = email_notifier or EmailNotification()
+        
+        self._stop_event = threading.Event()
+        self._wakeup_event = threading.Event()
+        self._thread = None
+    
+    def _retry_delay(self, attempts):
+        # 指数退避并加入随机抖动
+        delay = min(self.retry_base_delay * (2 ** (attempts - 1)), self.retry_max_delay)
+        return delay * random.uniform(0.5, 1.0)
+    
+    def send_pending(self):
+        """
+        发送一批已到发送时间的通知
+        
+        :return: 本批成功发送的数量
+        """
+        if not self.email_notifier.enabled:
+            return 0
+        
+        if not self.email_notifier.is_configured():
+            pending_count = self.db_manager.count_pending_notifications()
+            if pending_count:
+                logger.error(f"邮件配置不完整，发件箱中 {pending_count} 条通知暂缓发送")
+            return 0
+        
+        # 多个进程共用发件箱时，取出的通知在claim_timeout内不会被其他进程重复发送
+        pending = self.db_manager.claim_pending_notifications(self.batch_size, self.claim_timeout)
+        if not pending:
+            return 0
+        
+        sent_count = 0
+        for notification in pending:
+            try:
+                with metrics.stage_timer('send'):
+                    self.email_notifier.send_message(notification['subject'], notification['content'])
+                self.db_manager.mark_notification_sent(notification['id'])
+                sent_count += 1
+            except Exception as e:
+                attempts = notification['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    logger.error(f"通知 {notification['id']} 发送失败 {attempts} 次，不再重试: {str(e)}")
+                    self.db_manager.mark_notification_failed(notification['id'], str(e))
+                else:
+                    delay = self._retry_delay(attempts)
+                    logger.warning(f"通知 {notification['id']} 第 {attempts} 次发送失败，{int(delay)} 秒后重试: {str(e)}")
+                    self.db_manager.mark_notification_failed(notification['id'], str(e), time.time() + delay)
+        
+        return sent_count
+    
+    def flush(self):
+        """
+        发送所有已到发送时间的通知，直到本轮没有可发送的通知为止
+        
+        :return: 成功发送的数量
+        """
+        total = 0
+        while True:
+            sent_count = self.send_pending()
+            total += sent_count
+            if sent_count < self.batch_size:
+                return total
+    
+    def wakeup(self):
+        """
+        唤醒发送线程立即检查发件箱
+        """
+        self._wakeup_event.set()
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"发件箱发送出错: {str(e)}")
+            
+            self._wakeup_event.wait(self.poll_interval)
+            self._wakeup_event.clear()
+    
+    def start(self):
+        """
+        启动后台发送线程
+        """
+        if self._thread is not None:
+            return
+        
+        self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+        self._thread.start()
+        logger.info("发件箱发送线程已启动")
+    
+    def stop(self, timeout=30):
+        """
+        停止后台发送线程并关闭SMTP连接
+        
+        :param timeout: 等待线程退出的时间（秒）
+        """
+        self._stop_event.set()
+        self._wakeup_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.email_notifier.close()
 
 
 # 导入time模块，用于格式化时间
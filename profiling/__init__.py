@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能分析模块
+按采样间隔对监控任务做CPU分析（cProfile）和内存分配跟踪（tracemalloc），结果写入滚动文件
+"""
+
+import os
+import time
+import logging
+import cProfile
+import functools
+import threading
+import itertools
+import tracemalloc
+import contextvars
+from config import MONITOR_CONFIG
+
+logger = logging.getLogger('GrainMonitor')
+
+# 当前正在分析的监控任务，提交到线程池的工作函数据此加入同一次分析
+_current_session = contextvars.ContextVar('profiling_session', default=None)
+
+
+class _ProfileSession:
+    """
+    单次监控任务的分析会话
+    收集任务线程及其工作线程的cProfile结果
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = []
+    
+    def add(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+    
+    def run_in_worker(self, func, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12起cProfile基于sys.monitoring，同一时间只能有一个分析器，
+            # 且任务线程的分析器已覆盖所有线程，此处直接执行即可
+            return func(*args, **kwargs)
+        
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.add(profile)
+
+
+def bind_worker(func):
+    """
+    绑定提交到线程池的工作函数，使其在工作线程中的执行计入当前监控任务的分析
+    
+    :param func: 工作函数
+    :return: 当前没有分析会话时返回原函数，否则返回包装后的函数
+    """
+    session = _current_session.get()
+    if session is None:
+        return func
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return session.run_in_worker(func, *args, **kwargs)
+    return wrapper
+
+
+class TickProfiler:
+    """
+    监控任务分析器
+    每every_n_ticks次监控任务分析一次，同一时间只分析一个任务，其余任务正常执行
+    """
+    
+    def __init__(self, profiling_config=None):
+        config = profiling_config if profiling_config is not None else MONITOR_CONFIG.get('profiling', {})
+        self.output_dir = config.get('output_dir', 'profiles')
+        self.every_n_ticks = max(int(config.get('every_n_ticks', 1)), 1)
+        self.max_files = config.get('max_files', 20)
+        self.top_n = config.get('top_n', 15)
+        self.trace_memory = config.get('trace_memory', True)
+        self.tracemalloc_frames = config.get('tracemalloc_frames', 1)
+        
+        self._ticks = itertools.count(1)
+        self._busy = threading.Lock()
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+    
+    def wrap(self, func):
+        """
+        包装监控任务函数
+        
+        :param func: 监控任务函数
+        :return: 包装后的函数
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+        return wrapper
+    
+    def run(self, func, *args, **kwargs):
+        """
+        执行一次监控任务，按采样间隔决定是否分析
+        
+        :return: 监控任务的返回值
+        """
+        tick = next(self._ticks)
+        if tick % self.every_n_ticks != 0 or not self._busy.acquire(blocking=False):
+            return func(*args, **kwargs)
+        
+        try:
+            return self._profile(tick, func, *args, **kwargs)
+        finally:
+            self._busy.release()
+    
+    def _profile(self, tick, func, *args, **kwargs):
+        session = _ProfileSession()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            logger.warning(f"第 {tick} 次监控任务无法启用CPU分析: {str(e)}")
+            return func(*args, **kwargs)
+        
+        before = None
+        started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            started_tracing = True
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        
+        token = _current_session.set(session)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_session.reset(token)
+            profile.disable()
+            session.add(profile)
+            
+            memory = None
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                memory = (peak, after.compare_to(before, 'lineno'))
+                if started_tracing:
+                    tracemalloc.stop()
+            
+            try:
+                self._report(tick, elapsed, session.profiles, memory)
+            except Exception as e:
+                logger.error(f"保存第 {tick} 次监控任务的分析结果失败: {str(e)}")
+    
+    def _report(self, tick, elapsed, profiles, memory):
+        """
+        保存分析结果，并在日志中输出热点摘要
+        """
+        import io
+        import pstats
+        
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        
+        base_name = os.path.join(self.output_dir, f"tick-{time.strftime('%Y%m%d-%H%M%S')}-{tick}")
+        stats.dump_stats(base_name + '.prof')
+        
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        stream.write("\n按自身耗时排序:\n")
+        stats.sort_stats('tottime').print_stats(self.top_n)
+        
+        hot_spots = self._hot_spots(stats)
+        lines = [f"第 {tick} 次监控任务耗时 {elapsed:.3f} 秒，CPU热点（按自身耗时）:"]
+        lines.extend(
+            f"  {tottime * 1000:9.1f}ms 自身 / {cumtime * 1000:9.1f}ms 累计  {ncalls:>7} 次  {location}"
+            for location, ncalls, tottime, cumtime in hot_spots
+        )
+        
+        if memory is not None:
+            peak, differences = memory
+            stream.write(f"\n内存峰值: {peak / 1024 / 1024:.2f}MB\n内存分配增长:\n")
+            lines.append(f"内存峰值 {peak / 1024 / 1024:.2f}MB，分配增长最多的位置:")
+            for difference in differences[:self.top_n]:
+                stream.write(f"{difference}\n")
+            for difference in differences[:min(self.top_n, 5)]:
+                frame = difference.traceback[0]
+                lines.append(f"  {difference.size_diff / 1024:+9.1f}KB  {difference.count_diff:+7} 个  "
+                             f"{frame.filename}:{frame.lineno}")
+        
+        with open(base_name + '.txt', 'w', encoding='utf-8') as f:
+            f.write(stream.getvalue())
+        
+        self._rotate()
+        lines.append(f"分析结果已保存: {base_name}.prof")
+        logger.info('\n'.join(lines))
+    
+    def _hot_spots(self, stats):
+        """
+        按函数自身耗时取前top_n个热点
+        
+        :return: [(位置, 调用次数, 自身耗时, 累计耗时)] 列表
+        """
+        entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top_n]
+        hot_spots = []
+        for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in entries:
+            location = f"{name}" if filename == '~' else f"{os.path.basename(filename)}:{lineno}({name})"
+            hot_spots.append((location, ncalls, tottime, cumtime))
+        return hot_spots
+    
+    def _rotate(self):
+        """
+        只保留最近max_files次的分析结果
+        """
+        if not self.max_files:
+            return
+        
+        runs = {}
+        for name in os.listdir(self.output_dir):
+            if name.startswith('tick-') and name.endswith(('.prof', '.txt')):
+                path = os.path.join(self.output_dir, name)
+                runs.setdefault(os.path.splitext(name)[0], []).append(path)
+        
+        ordered = sorted(runs.values(), key=lambda paths: max(os.path.getmtime(p) for p in paths), reverse=True)
+        for paths in ordered[self.max_files:]:
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
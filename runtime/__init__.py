@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+运行时上下文模块
+在进程启动时创建一次，持有数据库连接、爬虫、通知管理器、正文抓取器和发件箱发送器，
+供每次监控任务复用，退出时统一关闭
+"""
+
+import logging
+import threading
+from config import MONITOR_CONFIG
+from crawler import create_crawler, close_session, DetailFetcher
+from database import DatabaseManager
+from notification import NotificationManager, OutboxSender
+
+logger = logging.getLogger('GrainMonitor')
+
+
+class MonitorRuntime:
+    """
+    监控运行时上下文
+    数据库只初始化一次，爬虫按类型缓存，后台组件首次使用时创建
+    """
+    
+    def __init__(self, config=None):
+        """
+        :param config: 监控配置（可选，默认使用MONITOR_CONFIG）
+        """
+        self.config = config if config is not None else MONITOR_CONFIG
+        
+        # 持久连接由数据库管理器内部的锁保护，监控任务、正文抓取和发件箱发送共用
+        self.db_manager = DatabaseManager()
+        self.notifier = NotificationManager(self.db_manager)
+        
+        self._lock = threading.Lock()
+        self._crawlers = {}
+        self._detail_fetcher = None
+        self._outbox_sender = None
+        self._closed = False
+    
+    def get_crawler(self, crawler_type='api'):
+        """
+        获取指定类型的爬虫，同一类型的爬虫在各次监控任务和各抓取线程间共享
+        
+        :param crawler_type: 爬虫类型（api 或 web）
+        :return: 爬虫实例
+        """
+        crawler = self._crawlers.get(crawler_type)
+        if crawler is None:
+            with self._lock:
+                crawler = self._crawlers.get(crawler_type)
+                if crawler is None:
+                    crawler = create_crawler(crawler_type)
+                    self._crawlers[crawler_type] = crawler
+        return crawler
+    
+    @property
+    def detail_fetcher(self):
+        """
+        公告正文抓取器，首次使用时创建，未启用正文抓取时为None
+        """
+        if not self.config.get('detail', {}).get('enabled', False):
+            return None
+        with self._lock:
+            if self._detail_fetcher is None and not self._closed:
+                self._detail_fetcher = DetailFetcher(self.db_manager.update_announcement_content)
+            return self._detail_fetcher
+    
+    @property
+    def outbox_sender(self):
+        """
+        通知发件箱发送器，首次使用时创建，未启用发件箱时为None
+        """
+        if not self.config.get('notification', {}).get('outbox', {}).get('enabled', False):
+            return None
+        with self._lock:
+            if self._outbox_sender is None and not self._closed:
+                # 与通知管理器共用邮件通知对象，复用同一个SMTP连接
+                self._outbox_sender = OutboxSender(self.db_manager, self.notifier.email_notifier)
+            return self._outbox_sender
+    
+    def shutdown_detail_fetcher(self, wait=True):
+        """
+        停止公告正文抓取器
+        
+        :param wait: 是否等待已提交的正文抓取完成
+        """
+        with self._lock:
+            detail_fetcher, self._detail_fetcher = self._detail_fetcher, None
+        if detail_fetcher is not None:
+            if wait:
+                logger.info("等待公告正文抓取完成...")
+            detail_fetcher.shutdown(wait=wait)
+    
+    def close(self, wait=True):
+        """
+        停止后台组件并关闭数据库连接和HTTP会话
+        
+        :param wait: 是否等待已提交的正文抓取完成
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            outbox_sender, self._outbox_sender = self._outbox_sender, None
+        
+        # 正文抓取线程还会写库，先停止后台组件再关闭连接
+        if outbox_sender is not None:
+            outbox_sender.stop()
+        self.shutdown_detail_fetcher(wait=wait)
+        self.notifier.email_notifier.close()
+        self.db_manager.close()
+        close_session()
+        self._crawlers.clear()
+        logger.info("运行时资源已释放")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+调度模块
+按监控目标的发布频率自适应调整轮询间隔，支持多个进程通过数据库租约分担监控目标
+"""
+
+import os
+import time
+import random
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import MONITOR_CONFIG
+import metrics
+
+logger = logging.getLogger('GrainMonitor')
+
+
+class TradingHours:
+    """
+    交易时段
+    判断某一时刻是否处于交易时段，并计算下一个交易时段的开始时间
+    """
+    
+    def __init__(self, config):
+        config = config or {}
+        self.weekdays = set(config.get('weekdays', [0, 1, 2, 3, 4]))
+        self.windows = [
+            (self._parse_time(start), self._parse_time(end))
+            for start, end in config.get('windows', [])
+        ]
+    
+    @staticmethod
+    def _parse_time(value):
+        hour, minute = value.split(':')
+        return int(hour) * 60 + int(minute)
+    
+    def __bool__(self):
+        return bool(self.windows)
+    
+    def is_open(self, moment):
+        """
+        判断是否处于交易时段
+        
+        :param moment: datetime对象
+        :return: 处于交易时段返回True，未配置交易时段时始终返回True
+        """
+        if not self.windows:
+            return True
+        if moment.weekday() not in self.weekdays:
+            return False
+        
+        minutes = moment.hour * 60 + moment.minute
+        return any(start <= minutes < end for start, end in self.windows)
+    
+    def next_open(self, moment):
+        """
+        计算下一个交易时段的开始时间
+        
+        :param moment: datetime对象
+        :return: datetime对象，未配置交易时段时返回None
+        """
+        if not self.windows:
+            return None
+        
+        day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in range(8):
+            current = day_start + timedelta(days=day)
+            if current.weekday() not in self.weekdays:
+                continue
+            for start, _ in sorted(self.windows):
+                candidate = current + timedelta(minutes=start)
+                if candidate > moment:
+                    return candidate
+        return None
+
+
+class AdaptiveIntervalPolicy:
+    """
+    自适应轮询间隔策略
+    用指数加权平均估计每个目标的发布速率，按速率计算下一次轮询间隔
+    """
+    
+    def __init__(self, schedule_config=None):
+        self.schedule_config = schedule_config if schedule_config is not None else MONITOR_CONFIG.get('schedule', {})
+        
+        self._lock = threading.Lock()
+        self._states = {}
+    
+    def _target_config(self, target):
+        config = dict(self.schedule_config)
+        config.update(target.get('schedule', {}))
+        return config
+    
+    def _state(self, target):
+        config = self._target_config(target)
+        state = self._states.get(target['name'])
+        if state is None:
+            # 还没有速率估计时按最短间隔轮询
+            state = {'rate': 0.0, 'interval': config.get('min_interval', 300), 'last_poll': None}
+            self._states[target['name']] = state
+        return state
+    
+    def observe(self, target, new_count, now=None):
+        """
+        记录一次轮询结果并计算下一次轮询间隔
+        
+        :param target: 监控目标配置
+        :param new_count: 本次发现的新发布公告数量（关键词过滤前）
+        :param now: 本次轮询时间戳（可选）
+        :return: 下一次轮询间隔（秒，未加抖动）
+        """
+        now = now if now is not None else time.time()
+        config = self._target_config(target)
+        min_interval = config.get('min_interval', 300)
+        max_interval = config.get('max_interval', 7200)
+        smoothing = config.get('smoothing', 0.5)
+        items_per_poll = config.get('items_per_poll', 1)
+        
+        with self._lock:
+            state = self._state(target)
+            
+            # 用本次观测到的发布速率（条/秒）更新指数加权平均
+            first_poll = state['last_poll'] is None
+            if not first_poll:
+                elapsed = max(now - state['last_poll'], 1)
+                observed_rate = new_count / elapsed
+                state['rate'] = smoothing * observed_rate + (1 - smoothing) * state['rate']
+            state['last_poll'] = now
+            
+            # 期望每次轮询平均发现items_per_poll条新公告；
+            # 首次轮询还没有速率估计，按最短间隔再轮询一次以尽快得到估计，而不是直接放慢到最长间隔
+            if state['rate'] > 0:
+                interval = items_per_poll / state['rate']
+            elif first_poll:
+                interval = min_interval
+            else:
+                interval = max_interval
+            
+            state['interval'] = min(max(interval, min_interval), max_interval)
+            return state['interval']
+    
+    def next_run_time(self, target, interval=None, now=None):
+        """
+        计算下一次轮询时间，考虑交易时段和随机抖动
+        
+        :param target: 监控目标配置
+        :param interval: 轮询间隔（秒，可选，默认使用当前间隔）
+        :param now: 当前时间（可选）
+        :return: datetime对象
+        """
+        now = now or datetime.now()
+        config = self._target_config(target)
+        
+        if interval is None:
+            with self._lock:
+                interval = self._state(target)['interval']
+        
+        trading_config = config.get('trading_hours', {})
+        trading_hours = TradingHours(trading_config)
+        if trading_hours and not trading_hours.is_open(now):
+            # 非交易时段放慢轮询，但不晚于下一个交易时段开始
+            interval = max(interval, trading_config.get('off_hours_interval', config.get('max_interval', 7200)))
+            next_open = trading_hours.next_open(now)
+            if next_open is not None:
+                interval = min(interval, (next_open - now).total_seconds())
+        
+        jitter = config.get('jitter', 0)
+        if jitter:
+            interval += random.uniform(0, jitter)
+        
+        return now + timedelta(seconds=max(interval, 1))
+    
+    def current_interval(self, target):
+        """
+        获取目标当前的轮询间隔
+        
+        :param target: 监控目标配置
+        :return: 轮询间隔（秒）
+        """
+        with self._lock:
+            return self._state(target)['interval']
+    
+    def get_state(self, target):
+        """
+        获取目标的速率估计状态，用于在进程间共享
+        
+        :param target: 监控目标配置
+        :return: 状态字典（rate、interval、last_poll）
+        """
+        with self._lock:
+            return dict(self._state(target))
+    
+    def set_state(self, target, rate=0.0, interval=None, last_poll=None):
+        """
+        恢复目标的速率估计状态
+        
+        :param target: 监控目标配置
+        :param rate: 发布速率估计（条/秒）
+        :param interval: 轮询间隔（秒，可选，默认保持当前间隔）
+        :param last_poll: 上次轮询时间戳（可选）
+        """
+        with self._lock:
+            state = self._state(target)
+            state['rate'] = rate or 0.0
+            if interval is not None:
+                state['interval'] = interval
+            state['last_poll'] = last_poll
+
+
+class AdaptiveScheduler:
+    """
+    按目标自适应的调度器
+    每个监控目标一个APScheduler任务，每次执行后根据发布速率重新安排下一次执行时间
+    """
+    
+    def __init__(self, task_func, targets, policy=None):
+        """
+        :param task_func: 监控任务函数，接收目标列表，返回目标名称到列表中新发布公告数量的映射
+        :param targets: 监控目标配置列表
+        :param policy: 轮询间隔策略（可选）
+        """
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        from apscheduler.executors.pool import ThreadPoolExecutor
+        
+        self.task_func = task_func
+        self.targets = targets
+        self.policy = policy or AdaptiveIntervalPolicy()
+        
+        max_workers = MONITOR_CONFIG.get('concurrency', {}).get('max_workers', 8)
+        self.scheduler = BlockingScheduler(
+            executors={'default': ThreadPoolExecutor(max_workers)},
+            job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300}
+        )
+    
+    @staticmethod
+    def _job_id(target):
+        return f"grain_monitor_{target['name']}"
+    
+    def _schedule(self, target, run_date):
+        self.scheduler.add_job(
+            self._run_target,
+            'date',
+            run_date=run_date,
+            args=[target],
+            id=self._job_id(target),
+            name=f"粮食公告监控任务-{target['name']}",
+            replace_existing=True
+        )
+    
+    def _run_target(self, target):
+        new_count = 0
+        try:
+            results = self.task_func([target]) or {}
+            new_count = results.get(target['name'], 0)
+        except Exception as e:
+            logger.error(f"监控目标 {target['name']} 调度执行失败: {str(e)}")
+        finally:
+            interval = self.policy.observe(target, new_count)
+            run_date = self.policy.next_run_time(target, interval)
+            self._schedule(target, run_date)
+            logger.info(f"监控目标 {target['name']} 轮询间隔调整为 {int(interval)} 秒，"
+                        f"下次执行时间: {run_date.strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    def start(self, initial_results=None):
+        """
+        启动调度器（阻塞）
+        
+        :param initial_results: 启动前已执行一次的监控结果（目标名称到新发布公告数量的映射，可选）
+        """
+        for target in self.targets:
+            if initial_results is not None:
+                interval = self.policy.observe(target, initial_results.get(target['name'], 0))
+            else:
+                interval = self.policy.current_interval(target)
+            self._schedule(target, self.policy.next_run_time(target, interval))
+        
+        logger.info(f"自适应调度已启动，共 {len(self.targets)} 个监控目标")
+        self.scheduler.start()
+    
+    def shutdown(self):
+        """
+        停止调度器
+        """
+        self.scheduler.shutdown(wait=False)
+
+
+class LeaseWorker:
+    """
+    租约调度的工作进程
+    多个进程共用同一个数据库，到期的监控目标由其中一个进程以条件更新认领，执行完成后写回下次执行时间；
+    进程定期续约，崩溃进程的租约过期后由其他进程接管
+    """
+    
+    def __init__(self, task_func, targets, db_manager, policy=None, worker_config=None):
+        """
+        :param task_func: 监控任务函数，接收目标列表，返回目标名称到列表中新发布公告数量的映射
+        :param targets: 监控目标配置列表
+        :param db_manager: 数据库管理器
+        :param policy: 轮询间隔策略（可选，固定间隔调度时不使用）
+        :param worker_config: 工作进程配置（可选）
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        config = worker_config if worker_config is not None else MONITOR_CONFIG.get('worker', {})
+        self.worker_id = config.get('worker_id') or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_ttl = config.get('lease_ttl', 90)
+        self.heartbeat_interval = config.get('heartbeat_interval', 30)
+        self.poll_interval = config.get('poll_interval', 5)
+        
+        self.task_func = task_func
+        self.targets = {target['name']: target for target in targets}
+        self.db_manager = db_manager
+        
+        # 自适应调度时，速率估计保存在租约表中，由认领目标的进程恢复后再计算下一次间隔
+        self.adaptive = MONITOR_CONFIG.get('schedule', {}).get('mode', 'adaptive') == 'adaptive'
+        self.policy = policy or AdaptiveIntervalPolicy()
+        self.fixed_interval = MONITOR_CONFIG.get('monitor_interval', 3600)
+        
+        self.max_workers = MONITOR_CONFIG.get('concurrency', {}).get('max_workers', 8)
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='worker')
+        # 正在执行的目标名称到租约令牌的映射，心跳只续约这些租约
+        self._running = {}
+        self._running_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wakeup_event = threading.Event()
+        self._heartbeat_thread = None
+        self._started_at = time.time()
+    
+    def _next_run(self, target, lease, new_count, started):
+        """
+        计算下一次执行时间
+        
+        :return: (下次执行时间戳, 发布速率估计, 轮询间隔)
+        """
+        if not self.adaptive:
+            return max(started + self.fixed_interval, time.time()), 0.0, self.fixed_interval
+        
+        self.policy.set_state(target, lease['poll_rate'], lease['poll_interval'], lease['last_run_at'])
+        interval = self.policy.observe(target, new_count, now=started)
+        run_date = self.policy.next_run_time(target, interval)
+        return run_date.timestamp(), self.policy.get_state(target)['rate'], interval
+    
+    def _run_lease(self, lease):
+        target = self.targets[lease['target_name']]
+        started = time.time()
+        new_count = 0
+        try:
+            results = self.task_func([target]) or {}
+            new_count = results.get(target['name'], 0)
+        except Exception as e:
+            logger.error(f"监控目标 {target['name']} 调度执行失败: {str(e)}")
+        finally:
+            try:
+                next_run_at, rate, interval = self._next_run(target, lease, new_count, started)
+                if self.db_manager.complete_lease(target['name'], self.worker_id, lease['lease_token'],
+                                                  next_run_at, started, rate, interval):
+                    logger.info(f"监控目标 {target['name']} 轮询间隔 {int(interval)} 秒，下次执行时间: "
+                                f"{datetime.fromtimestamp(next_run_at).strftime('%Y-%m-%d %H:%M:%S')}")
+                else:
+                    metrics.LEASES_LOST.inc(target=target['name'])
+                    logger.warning(f"监控目标 {target['name']} 的租约已被其他进程接管，本次结果不更新调度")
+            finally:
+                with self._running_lock:
+                    self._running.pop(target['name'], None)
+                self._wakeup_event.set()
+    
+    def _claim_and_submit(self):
+        """
+        认领到期的监控目标并提交执行
+        """
+        with self._running_lock:
+            available = set(self.targets) - self._running.keys()
+            free_slots = self.max_workers - len(self._running)
+        
+        for lease in self.db_manager.claim_due_targets(self.worker_id, available, self.lease_ttl, free_slots):
+            metrics.LEASES_CLAIMED.inc(target=lease['target_name'])
+            with self._running_lock:
+                self._running[lease['target_name']] = lease['lease_token']
+            self._executor.submit(self._run_lease, lease)
+    
+    def _next_wait(self):
+        """
+        计算距离下一个可认领目标的等待时间
+        
+        :return: 等待秒数
+        """
+        with self._running_lock:
+            if len(self._running) >= self.max_workers:
+                return self.poll_interval
+        
+        due = self.db_manager.next_lease_due_time(set(self.targets))
+        if due is None:
+            return self.poll_interval
+        return min(max(due - time.time(), 0.1), self.poll_interval)
+    
+    def _heartbeat(self):
+        host = socket.gethostname()
+        while not self._stop_event.wait(self.heartbeat_interval):
+            with self._running_lock:
+                leases = dict(self._running)
+            self.db_manager.renew_leases(self.worker_id, leases, self.lease_ttl)
+            self.db_manager.heartbeat_worker(self.worker_id, host, os.getpid(), self._started_at)
+    
+    def start(self, initial_results=None):
+        """
+        启动工作进程（阻塞）
+        
+        :param initial_results: 不使用，与AdaptiveScheduler.start保持一致
+        """
+        self.db_manager.register_lease_targets(list(self.targets))
+        # 以相同WORKER_ID重启时，上一个进程崩溃前持有的租约已无人执行，先释放以便立即重新认领
+        stale = self.db_manager.release_leases(self.worker_id)
+        if stale:
+            logger.warning(f"工作进程 {self.worker_id} 释放了上次运行遗留的 {stale} 个租约")
+        self.db_manager.heartbeat_worker(self.worker_id, socket.gethostname(), os.getpid(), self._started_at)
+        
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat, name='worker-heartbeat', daemon=True)
+        self._heartbeat_thread.start()
+        
+        live_workers = self.db_manager.count_live_workers(self.lease_ttl)
+        logger.info(f"工作进程 {self.worker_id} 已启动，共 {len(self.targets)} 个监控目标，"
+                    f"当前 {live_workers} 个工作进程")
+        
+        try:
+            while not self._stop_event.is_set():
+                self._claim_and_submit()
+                self._wakeup_event.wait(self._next_wait())
+                self._wakeup_event.clear()
+        finally:
+            self._stop()
+    
+    def _stop(self):
+        self._stop_event.set()
+        # 等待执行中的目标完成并写回下次执行时间
+        self._executor.shutdown(wait=True)
+        released = self.db_manager.release_leases(self.worker_id)
+        if released:
+            logger.info(f"工作进程 {self.worker_id} 释放了 {released} 个租约")
+        self.db_manager.remove_worker(self.worker_id)
+        logger.info(f"工作进程 {self.worker_id} 已停止")
+    
+    def shutdown(self):
+        """
+        停止工作进程，执行中的目标完成后退出
+        """
+        self._stop_event.set()
+        self._wakeup_event.set()
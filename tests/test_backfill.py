@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+历史公告回填测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONITOR_CONFIG
+from backfill import HistoricalBackfill, run_backfill
+from benchmarks.fake_grainmarket import FakeGrainMarketServer
+from utils import rate_limiters
+from test_database import DatabaseTestCase
+
+
+class BackfillTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for patcher in (mock.patch.dict(MONITOR_CONFIG, {'keywords': []}),
+                        mock.patch.dict(MONITOR_CONFIG['request']['rate_limit'], {'enabled': False})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        rate_limiters.reset()
+        self.addCleanup(rate_limiters.reset)
+        
+        self.server = FakeGrainMarketServer().start()
+        self.addCleanup(self.server.stop)
+        self.target = {'name': 'fake', 'type': 'api', 'api_url': self.server.api_url,
+                       'tag_id': '3', 'article_type': '4'}
+        self.config = {'page_size': 50, 'window': 4, 'batch_size': 100, 'checkpoint_interval': 2, 'max_pages': 0}
+    
+    def _stored_titles(self):
+        with self.db._transaction() as conn:
+            return [row[0] for row in conn.execute('SELECT title FROM announcements')]
+    
+    def _publish_after_watermark(self, old_count, new_count):
+        """
+        发布old_count条公告并把水位线设为其中最新的一条，之后再发布new_count条
+        """
+        self.server.publish('4', old_count)
+        listing = self.server._listings['4']
+        self.db.update_watermark('fake', listing[0]['publishtime'], listing[0]['contentUrl'])
+        # 接口的发布时间精确到秒
+        time.sleep(1.1)
+        self.server.publish('4', new_count)
+        return {item['title'] for item in listing[:new_count]}
+    
+    def test_skips_live_page_and_items_after_watermark(self):
+        new_titles = self._publish_after_watermark(150, 70)
+        
+        result = HistoricalBackfill(self.target, self.db, backfill_config=self.config).run()
+        self.assertEqual(result['status'], 'done')
+        
+        stored = self._stored_titles()
+        # 第一页和水位线之后发布的公告留给常规监控：列表后移到第二页的20条新公告也不入库
+        self.assertFalse(new_titles & set(stored))
+        self.assertEqual(len(stored), 150)
+    
+    def test_cutoff_without_watermark_is_end_of_first_page(self):
+        self.server.publish('4', 120)
+        time.sleep(1.1)
+        self.server.publish('4', 30)
+        
+        backfill = HistoricalBackfill(self.target, self.db, backfill_config=self.config)
+        backfill.run()
+        # 第一页最后一条公告属于较早的一批，之后的新公告不回填
+        self.assertEqual(backfill.cutoff, self.server._listings['4'][49]['publishtime'])
+        self.assertEqual(len(self._stored_titles()), 150 - 50)
+    
+    def test_rate_is_scaled_during_backfill(self):
+        scales = []
+        
+        def run(backfill, restart=False):
+            scales.append(rate_limiters.scale)
+            return {'status': 'done'}
+        
+        with mock.patch.dict(MONITOR_CONFIG['backfill'], {'rate_limit_scale': 0.5}), \
+                mock.patch.object(HistoricalBackfill, 'run', run):
+            run_backfill([self.target], self.db)
+        self.assertEqual(scales, [0.5])
+        self.assertEqual(rate_limiters.scale, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
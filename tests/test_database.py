@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据库模块测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import sqlite3
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONITOR_CONFIG
+from database import DatabaseManager, SeenUrlIndex, bigram_tokens
+from extraction import extract_fields
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    使用临时数据库文件的测试基类
+    """
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch.dict(MONITOR_CONFIG['storage'], {'file_path': os.path.join(self.tmpdir, 'test.db')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseManager()
+    
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def insert(self, title, content=None, publish_date='2024-06-01'):
+        """
+        插入一条公告并返回其ID
+        """
+        with self.db._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO announcements (title, url, content, source, publish_date) VALUES (?, ?, ?, ?, ?)',
+                (title, f'http://example.com/{title}', content, 'test', publish_date)
+            )
+            return cursor.lastrowid
+
+
+class SearchTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.soy = self.insert('进口大豆竞价销售交易公告', '本次计划销售进口大豆1万吨')
+        self.corn = self.insert('玉米竞价销售交易公告', '本次计划销售玉米2万吨，另附大豆销售安排')
+        self.wheat = self.insert('小麦竞价采购交易公告', '本次计划采购小麦3万吨')
+    
+    def test_bigram_tokens(self):
+        self.assertEqual(bigram_tokens('大豆，玉米'), '大豆 玉米')
+        self.assertEqual(bigram_tokens('进口大豆'), '进口 口大 大豆')
+        self.assertIsNone(bigram_tokens(''))
+    
+    def test_two_character_terms_use_index(self):
+        self.assertEqual({row['id'] for row in self.db.search_announcements('大豆')}, {self.soy, self.corn})
+        # 标题命中的排在正文命中之前
+        self.assertEqual(self.db.search_announcements('大豆')[0]['id'], self.soy)
+        self.assertEqual([row['id'] for row in self.db.search_announcements('玉米 竞价销售')], [self.corn])
+        self.assertEqual([row['id'] for row in self.db.search_announcements('采购 3万吨')], [self.wheat])
+    
+    def test_keyword_search_is_title_only(self):
+        self.assertEqual([row['id'] for row in self.db.get_announcements_by_keyword('大豆')], [self.soy])
+        self.assertEqual([row['id'] for row in self.db.get_announcements_by_keyword('竞价采购')], [self.wheat])
+        self.assertEqual(self.db.get_announcements_by_keyword('万吨'), [])
+    
+    def test_index_follows_updates_and_deletes(self):
+        with self.db._transaction() as conn:
+            conn.execute("UPDATE announcements SET title = '豆粕竞价销售交易公告' WHERE id = ?", (self.wheat,))
+            conn.execute('DELETE FROM announcements WHERE id = ?', (self.soy,))
+        
+        self.assertEqual([row['id'] for row in self.db.get_announcements_by_keyword('豆粕')], [self.wheat])
+        self.assertEqual([row['id'] for row in self.db.search_announcements('大豆')], [self.corn])
+
+
+
+class PaginationTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = [self.insert(f'公告{i}', publish_date=f'2024-06-0{i}') for i in range(1, 6)]
+    
+    def test_iterates_all_pages(self):
+        self.assertEqual([row['id'] for row in self.db.iter_announcements(batch_size=2)], self.ids[::-1])
+        rows, cursor = self.db.get_announcements_page(limit=5)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(self.db.get_announcements_page(limit=5, after=cursor), ([], None))
+    
+    def test_query_error_is_raised_from_iterator(self):
+        announcements = self.db.iter_announcements(batch_size=2)
+        self.assertEqual(len([next(announcements), next(announcements)]), 2)
+        
+        # 读到一半时查询出错，迭代不能像读完一样正常结束
+        with self.db._transaction() as conn:
+            conn.execute('ALTER TABLE announcements RENAME TO announcements_old')
+        with self.assertRaises(sqlite3.OperationalError):
+            list(announcements)
+        
+        self.assertEqual(self.db.get_announcements_page(limit=2), ([], None))
+        self.assertEqual(self.db.get_all_announcements(), [])
+
+
+class AuctionTotalsTest(DatabaseTestCase):
+
+    def test_result_and_adjustment_notices_are_not_counted(self):
+        self.db.batch_insert_announcements([extract_fields(announcement) for announcement in [
+            {'title': '2024年3月15日进口大豆竞价销售交易公告（共20个标的，计划销售5万吨）',
+             'url': 'http://example.com/1', 'pub_date': '2024-03-12'},
+            {'title': '2024年3月15日进口大豆竞价销售交易结果公告（成交4万吨）',
+             'url': 'http://example.com/2', 'pub_date': '2024-03-15'},
+            {'title': '关于调整2024年3月15日进口大豆竞价销售交易（计划销售5万吨）时间的通知',
+             'url': 'http://example.com/3', 'pub_date': '2024-03-13'},
+        ]])
+        # 三条公告都提取到了品种和交易日期，但只有竞价交易公告计入统计
+        with self.db._transaction() as conn:
+            rows = conn.execute('SELECT notice_type, commodity, trade_date FROM announcements ORDER BY id').fetchall()
+        self.assertEqual([tuple(row) for row in rows], [
+            ('auction', '进口大豆', '2024-03-15'),
+            ('result', '进口大豆', '2024-03-15'),
+            ('adjustment', '进口大豆', '2024-03-15'),
+        ])
+        
+        totals = self.db.get_weekly_auction_totals('进口大豆', '2024-03-15')
+        self.assertEqual(totals['announcements'], 1)
+        self.assertEqual(totals['lot_count'], 20)
+        self.assertEqual(totals['quantity_tons'], 50000.0)
+        
+        with self.db._transaction() as conn:
+            plan = conn.execute('''
+                EXPLAIN QUERY PLAN
+                SELECT COUNT(*), SUM(lot_count), SUM(quantity_tons) FROM announcements
+                WHERE commodity IN (?) AND trade_date BETWEEN ? AND ?
+                AND duplicate_of IS NULL AND notice_type = 'auction'
+            ''', ['进口大豆', '2024-03-11', '2024-03-17']).fetchall()
+        self.assertIn('idx_announcements_auction_totals', ' '.join(row[-1] for row in plan))
+
+
+class SeenUrlIndexTest(unittest.TestCase):
+
+    def test_switches_to_bloom_filter(self):
+        index = SeenUrlIndex(max_exact_items=3, bloom_capacity=100, bloom_error_rate=1e-6)
+        urls = [f'http://example.com/{i}' for i in range(5)]
+        for url in urls[:3]:
+            index.add(url)
+        self.assertIsNone(index._bloom)
+        
+        # 超过精确集合上限后转为布隆过滤器，已记录的URL仍能查到
+        index.add(urls[3])
+        self.assertIsNotNone(index._bloom)
+        self.assertEqual(index._exact, set())
+        self.assertTrue(all(url in index for url in urls[:4]))
+        self.assertNotIn(urls[4], index)
+        self.assertEqual(len(index), 4)
+        
+        # 布隆过滤器无法删除，删除的URL单独记录，重新入库后恢复
+        index.discard(urls[0])
+        self.assertNotIn(urls[0], index)
+        index.add(urls[0])
+        self.assertIn(urls[0], index)
+    
+    def test_warm_with_large_total_starts_as_bloom(self):
+        index = SeenUrlIndex(max_exact_items=10, bloom_capacity=100)
+        index.warm(['http://example.com/a', 'http://example.com/b'], total=1000)
+        self.assertIsNotNone(index._bloom)
+        self.assertGreaterEqual(index._bloom.capacity, 2000)
+        self.assertIn('http://example.com/a', index)
+        
+        index.clear()
+        self.assertIsNone(index._bloom)
+        self.assertNotIn('http://example.com/a', index)
+    
+    def test_exact_mode_discard(self):
+        index = SeenUrlIndex(max_exact_items=10)
+        index.add('http://example.com/a')
+        index.discard('http://example.com/a')
+        self.assertNotIn('http://example.com/a', index)
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+近似重复检测测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import SimHasher, numeric_difference
+from test_database import DatabaseTestCase
+
+
+class SimHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hasher = SimHasher(max_distance=3, min_length=6)
+    
+    def test_numeric_difference(self):
+        self.assertEqual(numeric_difference('2024,3,15,12', '2024,3,16,12'), 1)
+        self.assertEqual(numeric_difference('2024,3,15', '2024,3,15'), 0)
+        self.assertIsNone(numeric_difference('2024,3,15', '2024,3'))
+    
+    def test_reissue_with_changed_number_requires_correction_mark(self):
+        original = self.hasher.fingerprint('2024年3月15日进口大豆竞价销售交易公告（第12期）')
+        next_session = self.hasher.fingerprint('2024年3月16日进口大豆竞价销售交易公告（第12期）')
+        corrected = self.hasher.fingerprint('（更正）2024年3月16日进口大豆竞价销售交易公告（第12期）')
+        
+        self.assertFalse(next_session.correction)
+        self.assertTrue(corrected.correction)
+        # 同一模板的另一场交易数字不同，不是重复；更正重发允许改动一个数字
+        self.assertFalse(self.hasher.is_near_duplicate(next_session, original.simhash, original.numeric))
+        self.assertTrue(self.hasher.is_near_duplicate(corrected, original.simhash, original.numeric))
+        # 改动两个数字的不再视为同一公告
+        corrected_twice = self.hasher.fingerprint('（更正）2024年3月16日进口大豆竞价销售交易公告（第13期）')
+        self.assertFalse(self.hasher.is_near_duplicate(corrected_twice, original.simhash, original.numeric))
+        # 数字签名不同，含数字签名的分段不会命中，需按不含数字签名的分段查找
+        self.assertFalse(set(corrected.bands) & set(original.bands))
+        self.assertEqual(corrected.plain_bands, original.plain_bands)
+
+
+class NearDuplicateLinkTest(DatabaseTestCase):
+
+    def insert_batch(self, *titles):
+        return self.db.batch_insert_announcements([
+            {'title': title, 'url': f'http://example.com/{title}', 'pub_date': '2024-03-14'} for title in titles
+        ])
+    
+    def test_corrected_reissue_with_one_changed_number_is_linked(self):
+        self.insert_batch('2024年3月14日进口大豆竞价销售交易公告（第11期）')
+        original = self.insert_batch('2024年3月15日进口大豆竞价销售交易公告（第12期）')[0]
+        
+        # 另一场交易不关联
+        other = self.insert_batch('2024年3月18日进口大豆竞价销售交易公告（第13期）')[0]
+        self.assertIsNone(other.get('duplicate_of'))
+        
+        # 更正了交易日期的重发公告关联到被更正的公告，不再通知
+        corrected = self.insert_batch('关于2024年3月15日进口大豆竞价销售交易公告（第13期）的更正')[0]
+        with self.db._transaction() as conn:
+            original_id = conn.execute('SELECT id FROM announcements WHERE url = ?', (original['url'],)).fetchone()[0]
+            other_id = conn.execute('SELECT id FROM announcements WHERE url = ?', (other['url'],)).fetchone()[0]
+        # 与第12期只差期号、与第13期只差日期，取最近发布的一条
+        self.assertEqual(corrected.get('duplicate_of'), other_id)
+        
+        corrected = self.insert_batch('（更正）2024年3月16日进口大豆竞价销售交易公告（第12期）')[0]
+        self.assertEqual(corrected.get('duplicate_of'), original_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+结构化字段提取测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import AuctionFieldExtractor, NOTICE_AUCTION, NOTICE_RESULT, NOTICE_ADJUSTMENT, classify_notice
+
+
+class AuctionFieldExtractorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = AuctionFieldExtractor({'进口大豆': ['进口大豆'], '玉米': ['玉米']})
+    
+    def test_quantity_only_title_has_no_trade_date(self):
+        # 数量中的小数不能被当作省略年份的日期
+        fields = self.extractor.extract('进口大豆竞价销售1.5万吨', '2024-06-01')
+        self.assertIsNone(fields['trade_date'])
+        self.assertEqual(fields['quantity_tons'], 15000.0)
+        self.assertEqual(fields['commodity'], '进口大豆')
+        
+        fields = self.extractor.extract('关于2.3万吨进口大豆的公告', '2024-06-01')
+        self.assertIsNone(fields['trade_date'])
+        self.assertEqual(fields['quantity_tons'], 23000.0)
+    
+    def test_title_dates(self):
+        self.assertEqual(
+            self.extractor.extract('2024年3月15日进口大豆竞价销售交易公告（第12期）', '2024-03-14')['trade_date'],
+            '2024-03-15'
+        )
+        self.assertEqual(self.extractor.extract('2024-03-15玉米竞价销售公告')['trade_date'], '2024-03-15')
+        # 省略年份时按发布日期补全，年末发布的年初交易归入下一年
+        self.assertEqual(self.extractor.extract('关于3月15日玉米竞价销售的公告', '2024-03-10')['trade_date'],
+                         '2024-03-15')
+        self.assertEqual(self.extractor.extract('1月3日玉米竞价销售公告', '2023-12-28')['trade_date'], '2024-01-03')
+    
+    def test_body_fills_missing_fields(self):
+        fields = self.extractor.extract_announcement(
+            '进口大豆竞价销售交易公告',
+            '交易时间：2024年5月6日。本次计划销售进口大豆12,345.6吨，共25个标的。',
+            '2024-05-01'
+        )
+        self.assertEqual(fields, {
+            'notice_type': NOTICE_AUCTION,
+            'trade_date': '2024-05-06',
+            'commodity': '进口大豆',
+            'lot_count': 25,
+            'quantity_tons': 12345.6
+        })
+    
+    def test_notice_type(self):
+        self.assertEqual(classify_notice('2024年3月15日进口大豆竞价销售交易公告（第12期）'), NOTICE_AUCTION)
+        self.assertEqual(classify_notice('关于3月15日玉米竞价采购的公告'), NOTICE_AUCTION)
+        self.assertEqual(classify_notice('2024年3月15日进口大豆竞价销售交易结果公告'), NOTICE_RESULT)
+        self.assertEqual(classify_notice('进口大豆竞价销售成交情况'), NOTICE_RESULT)
+        self.assertEqual(classify_notice('关于调整3月15日进口大豆竞价销售交易时间的通知'), NOTICE_ADJUSTMENT)
+        self.assertEqual(classify_notice('关于暂停玉米竞价销售的通知'), NOTICE_ADJUSTMENT)
+        self.assertIsNone(classify_notice('关于开展粮食安全宣传周活动的通知'))
+        
+        # 结果公告和调整通知同样提取品种和日期，但类型不同，统计时不计入
+        fields = self.extractor.extract('2024年3月15日进口大豆竞价销售交易结果公告', '2024-03-15')
+        self.assertEqual(fields['notice_type'], NOTICE_RESULT)
+        self.assertEqual(fields['trade_date'], '2024-03-15')
+        self.assertEqual(fields['commodity'], '进口大豆')
+        
+        # 正文不改变按标题判断的类型
+        fields = self.extractor.extract_announcement('进口大豆竞价销售交易公告', '交易结束后公布交易结果', '2024-05-01')
+        self.assertEqual(fields['notice_type'], NOTICE_AUCTION)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+监控任务测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONITOR_CONFIG
+import main
+
+
+class FakeCrawler:
+
+    def __init__(self, titles):
+        self.titles = titles
+    
+    def get_announcements(self, target, watermark=None):
+        return [{'title': title, 'url': f'http://example.com/{i}', 'pub_date': '2024-06-01'}
+                for i, title in enumerate(self.titles)]
+
+
+class FetchTargetTest(unittest.TestCase):
+
+    def test_published_count_is_before_keyword_filter(self):
+        crawler = FakeCrawler(['进口大豆竞价销售交易公告', '玉米竞价销售交易公告', '小麦竞价采购交易公告'])
+        target = {'name': 'a', 'keywords': []}
+        watermark = {'last_publish_time': '2024-05-31', 'last_url': 'http://example.com/old'}
+        
+        with mock.patch.dict(MONITOR_CONFIG, {'keywords': ['进口大豆']}):
+            filtered, latest, published_count = main.fetch_target(target, watermark, crawler)
+        
+        self.assertEqual([announcement['title'] for announcement in filtered], ['进口大豆竞价销售交易公告'])
+        self.assertEqual(latest['url'], 'http://example.com/0')
+        # 发布速率按目标列表本身计算，不只是匹配关键词的公告
+        self.assertEqual(published_count, 3)
+        
+        # 没有水位线时抓取到的是整个第一页，不计入发布数量
+        with mock.patch.dict(MONITOR_CONFIG, {'keywords': ['进口大豆']}):
+            self.assertEqual(main.fetch_target(target, None, crawler)[2], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+通知发件箱测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notification import OutboxSender
+from test_database import DatabaseTestCase
+
+
+class FakeEmailNotification:
+    """
+    记录发送内容的邮件通知，failures中的主题发送失败
+    """
+    
+    enabled = True
+    
+    def __init__(self):
+        self.sent = []
+        self.failures = set()
+    
+    def is_configured(self):
+        return True
+    
+    def send_message(self, subject, content):
+        if subject in self.failures:
+            raise ConnectionError(f"发送 {subject} 失败")
+        self.sent.append(subject)
+
+
+class OutboxTest(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.email = FakeEmailNotification()
+        self.sender = OutboxSender(self.db, self.email)
+        self.sender.max_attempts = 2
+    
+    def _row(self, notification_id):
+        with self.db._transaction() as conn:
+            return dict(conn.execute('SELECT * FROM notification_outbox WHERE id = ?', (notification_id,)).fetchone())
+    
+    def test_claimed_notifications_are_not_claimed_again(self):
+        first = self.db.enqueue_notification('a', 'A')
+        second = self.db.enqueue_notification('b', 'B')
+        
+        claimed = self.db.claim_pending_notifications(limit=1, claim_timeout=300)
+        self.assertEqual([row['id'] for row in claimed], [first])
+        # 其他进程只能取出尚未被占用的通知
+        self.assertEqual([row['id'] for row in self.db.claim_pending_notifications(10, 300)], [second])
+        self.assertEqual(self.db.claim_pending_notifications(10, 300), [])
+        self.assertEqual(self.db.count_pending_notifications(), 2)
+        
+        # 占用超时后（进程崩溃未记录结果）重新取出
+        with self.db._transaction() as conn:
+            conn.execute('UPDATE notification_outbox SET next_attempt_at = ? WHERE id = ?', (time.time() - 1, first))
+        self.assertEqual([row['id'] for row in self.db.claim_pending_notifications(10, 300)], [first])
+    
+    def test_retry_then_fail(self):
+        ok = self.db.enqueue_notification('ok', 'OK')
+        broken = self.db.enqueue_notification('broken', 'BROKEN')
+        self.email.failures.add('broken')
+        
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.assertEqual(self.email.sent, ['ok'])
+        self.assertEqual(self._row(ok)['status'], 'sent')
+        
+        # 第一次失败后退避重试，未到重试时间不会再发送
+        row = self._row(broken)
+        self.assertEqual((row['status'], row['attempts']), ('pending', 1))
+        self.assertGreater(row['next_attempt_at'], time.time())
+        self.assertIn('发送 broken 失败', row['last_error'])
+        self.assertEqual(self.sender.send_pending(), 0)
+        
+        # 达到最大发送次数后标记为失败，不再取出
+        with self.db._transaction() as conn:
+            conn.execute('UPDATE notification_outbox SET next_attempt_at = 0 WHERE id = ?', (broken,))
+        self.assertEqual(self.sender.send_pending(), 0)
+        row = self._row(broken)
+        self.assertEqual((row['status'], row['attempts']), ('failed', 2))
+        self.assertEqual(self.db.count_pending_notifications(), 0)
+        self.assertEqual(self.db.claim_pending_notifications(10, 300), [])
+    
+    def test_retry_succeeds(self):
+        notification_id = self.db.enqueue_notification('flaky', 'FLAKY')
+        self.email.failures.add('flaky')
+        self.sender.send_pending()
+        
+        self.email.failures.clear()
+        with self.db._transaction() as conn:
+            conn.execute('UPDATE notification_outbox SET next_attempt_at = 0 WHERE id = ?', (notification_id,))
+        self.assertEqual(self.sender.flush(), 1)
+        row = self._row(notification_id)
+        self.assertEqual((row['status'], row['attempts'], row['last_error']), ('sent', 2, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
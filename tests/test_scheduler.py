@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+租约调度测试
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MONITOR_CONFIG
+from database import DatabaseManager
+from scheduler import AdaptiveIntervalPolicy, LeaseWorker
+
+
+class AdaptiveIntervalPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = AdaptiveIntervalPolicy({
+            'min_interval': 300, 'max_interval': 7200, 'items_per_poll': 1, 'smoothing': 0.5, 'jitter': 0
+        })
+        self.target = {'name': 'a'}
+    
+    def test_first_poll_uses_min_interval(self):
+        self.assertEqual(self.policy.current_interval(self.target), 300)
+        self.assertEqual(self.policy.observe(self.target, 0, now=1000), 300)
+        # 有了两次观测后，长时间没有新公告才放慢到最长间隔
+        self.assertEqual(self.policy.observe(self.target, 0, now=1300), 7200)
+    
+    def test_busy_feed_is_polled_often(self):
+        self.policy.observe(self.target, 0, now=0)
+        # 每10分钟发布6条，按速率计算的间隔约为200秒，不低于最短间隔
+        interval = self.policy.observe(self.target, 6, now=600)
+        self.assertEqual(interval, 300)
+    
+    def test_restored_state(self):
+        self.policy.set_state(self.target, rate=1 / 1200, interval=1200, last_poll=0)
+        self.assertAlmostEqual(self.policy.observe(self.target, 1, now=1200), 1200)
+
+
+class LeaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = mock.patch.dict(MONITOR_CONFIG['storage'], {'file_path': os.path.join(self.tmpdir, 'test.db')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = DatabaseManager()
+        self.db.register_lease_targets(['a', 'b'])
+    
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def _worker(self, worker_id, calls):
+        def task(targets):
+            calls.extend(target['name'] for target in targets)
+            return {target['name']: 0 for target in targets}
+        
+        config = {'worker_id': worker_id, 'lease_ttl': 60, 'heartbeat_interval': 0.05, 'poll_interval': 0.05}
+        return LeaseWorker(task, [{'name': 'a'}, {'name': 'b'}], self.db, worker_config=config)
+    
+    def _run_until(self, worker, condition, timeout=5):
+        thread = threading.Thread(target=worker.start, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        worker.shutdown()
+        thread.join(timeout)
+    
+    def test_claim_is_exclusive(self):
+        claimed = self.db.claim_due_targets('w1', {'a', 'b'}, 60, 1)
+        self.assertEqual(len(claimed), 1)
+        # 已被占用的目标不能再认领，只能认领剩下的目标
+        others = self.db.claim_due_targets('w2', {'a', 'b'}, 60, 10)
+        self.assertEqual([lease['target_name'] for lease in others],
+                         [name for name in ('a', 'b') if name != claimed[0]['target_name']])
+        self.assertEqual(self.db.claim_due_targets('w3', {'a', 'b'}, 60, 10), [])
+        
+        # 完成后在下次执行时间之前不会被认领
+        lease = claimed[0]
+        self.assertTrue(self.db.complete_lease(lease['target_name'], 'w1', lease['lease_token'],
+                                               time.time() + 300, time.time()))
+        self.assertEqual(self.db.claim_due_targets('w3', {'a', 'b'}, 60, 10), [])
+    
+    def test_expired_lease_is_taken_over_and_fenced(self):
+        stale = self.db.claim_due_targets('w1', {'a'}, 60, 10)[0]
+        # w1崩溃，租约过期后由w2接管
+        with self.db._transaction() as conn:
+            conn.execute("UPDATE target_leases SET lease_expires_at = ? WHERE target_name = 'a'", (time.time() - 1,))
+        fresh = self.db.claim_due_targets('w2', {'a'}, 60, 10)[0]
+        self.assertGreater(fresh['lease_token'], stale['lease_token'])
+        
+        # w1恢复后不能续约或完成已被接管的租约
+        self.assertEqual(self.db.renew_leases('w1', {'a': stale['lease_token']}, 60), 0)
+        self.assertFalse(self.db.complete_lease('a', 'w1', stale['lease_token'], time.time(), time.time()))
+        self.assertTrue(self.db.complete_lease('a', 'w2', fresh['lease_token'], time.time() + 300, time.time()))
+    
+    def test_renew_only_fenced_leases(self):
+        leases = {lease['target_name']: lease['lease_token']
+                  for lease in self.db.claim_due_targets('w1', {'a', 'b'}, 60, 10)}
+        self.assertEqual(set(leases), {'a', 'b'})
+        
+        # 只续约正在执行的a，令牌不符的续约无效
+        self.assertEqual(self.db.renew_leases('w1', {'a': leases['a']}, 60), 1)
+        self.assertEqual(self.db.renew_leases('w1', {'a': leases['a'] + 1}, 60), 0)
+        self.assertEqual(self.db.renew_leases('w2', {'a': leases['a']}, 60), 0)
+    
+    def test_restart_with_same_worker_id_reclaims_stale_leases(self):
+        # w1认领a、b后崩溃，租约尚未过期
+        self.assertEqual(len(self.db.claim_due_targets('w1', {'a', 'b'}, 60, 10)), 2)
+        
+        # 以相同WORKER_ID重启后应立即重新认领并执行，而不是一直续约遗留的租约
+        calls = []
+        self._run_until(self._worker('w1', calls), lambda: {'a', 'b'} <= set(calls))
+        self.assertEqual(sorted(calls), ['a', 'b'])
+        self.assertEqual(self.db.claim_due_targets('w2', {'a', 'b'}, 60, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+工具模块测试：关键词匹配、重试策略、熔断器和限流器
+
+用法（在项目根目录执行）:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import random
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (
+    KeywordMatcher, RetryPolicy, CircuitBreaker, CircuitOpenError, RateLimiter, deadline_scope, parse_retry_after
+)
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {'Retry-After': retry_after} if retry_after is not None else {}
+
+
+class FakeHTTPError(Exception):
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, retry_after)
+
+
+class KeywordMatcherTest(unittest.TestCase):
+
+    def test_matches_naive_substring_search(self):
+        rng = random.Random(7)
+        alphabet = '大豆玉米进口竞价销售'
+        for _ in range(300):
+            keywords = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                        for _ in range(rng.randint(1, 6))]
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            expected = [kw for kw in dict.fromkeys(keywords) if kw in text]
+            self.assertEqual(KeywordMatcher(keywords).match(text), expected, (keywords, text))
+    
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(['进口大豆', '大豆', '豆油', '', '大豆'])
+        self.assertEqual(matcher.match('进口大豆油竞价销售'), ['进口大豆', '大豆', '豆油'])
+        self.assertEqual(matcher.match('玉米'), [])
+        self.assertFalse(KeywordMatcher([]))
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = mock.Mock()
+        self.policy = RetryPolicy(max_retries=5, delay=2, backoff=2, max_delay=30, jitter=0)
+    
+    def test_exponential_backoff(self):
+        self.assertEqual([self.policy.next_delay(attempt) for attempt in range(1, 6)], [2, 4, 8, 16, 30])
+        self.assertIsNone(self.policy.on_failure(5, Exception('boom'), self.logger))
+    
+    def test_retry_after(self):
+        self.assertEqual(parse_retry_after('15'), 15.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertEqual(self.policy.next_delay(1, FakeHTTPError(429, '15')), 15.0)
+        self.assertEqual(self.policy.next_delay(1, FakeHTTPError(503, '1')), 2)
+        # 其他状态码的Retry-After不生效，过长的等待不超过retry_after_max
+        self.assertEqual(self.policy.next_delay(1, FakeHTTPError(500, '15')), 2)
+        self.assertEqual(self.policy.next_delay(1, FakeHTTPError(429, '100000')), self.policy.retry_after_max)
+    
+    def test_deadline_stops_retrying(self):
+        with deadline_scope(10):
+            self.assertEqual(self.policy.on_failure(1, Exception('boom'), self.logger), 2)
+            # 剩余时间不足以等待Retry-After时放弃重试
+            self.assertIsNone(self.policy.on_failure(1, FakeHTTPError(429, '60'), self.logger))
+            self.assertIsNone(self.policy.on_failure(4, Exception('boom'), self.logger))
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('example.com', failure_threshold=2, reset_timeout=60)
+    
+    def _open(self):
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+    
+    def test_opens_after_threshold(self):
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertRaises(CircuitOpenError, self.breaker.before_call)
+    
+    def test_half_open_allows_single_probe(self):
+        self._open()
+        self.now += 61
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        # 探测期间其他请求仍被拒绝
+        self.assertRaises(CircuitOpenError, self.breaker.before_call)
+        
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.before_call()
+    
+    def test_failed_probe_reopens(self):
+        self._open()
+        self.now += 61
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.before_call)
+        
+        # 未实际发出的探测请求释放名额
+        self.now += 61
+        self.breaker.before_call()
+        self.breaker.release()
+        self.breaker.before_call()
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_burst_then_spacing(self):
+        limiter = RateLimiter('example.com', rate=2, burst=3)
+        # 突发的3个请求立即发送，之后按0.5秒间隔排队
+        self.assertEqual([limiter._reserve() for _ in range(5)], [0, 0, 0, 0.5, 1.0])
+        self.now += 10
+        self.assertEqual(limiter._reserve(), 0)
+    
+    def test_max_wait(self):
+        limiter = RateLimiter('example.com', rate=1)
+        self.assertEqual(limiter._reserve(max_wait=0.5), 0)
+        self.assertIsNone(limiter._reserve(max_wait=0.5))
+        # 未预约成功的请求不占用发送时间
+        self.assertEqual(limiter._reserve(), 1.0)
+    
+    def test_adaptive_rate(self):
+        limiter = RateLimiter('example.com', rate=2, min_rate=0.5, max_rate=2.5, adaptive=True, increase_step=0.5)
+        limiter.on_throttled()
+        limiter.on_throttled()
+        limiter.on_throttled()
+        self.assertEqual(limiter.rate, 0.5)
+        for _ in range(10):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 2.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,11 +6,65 @@
 包含日志配置、重试装饰器和其他通用工具函数
 """
 
+import json
+import queue
+import atexit
+import random
+import inspect
 import logging
+import threading
+import contextvars
 import time
 import functools
-from logging.handlers import RotatingFileHandler
-from config import LOG_CONFIG
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from config import LOG_CONFIG, MONITOR_CONFIG
+import metrics
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    JSON日志格式
+    每条日志输出为一行JSON对象，便于日志系统采集
+    """
+    
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    有界队列日志处理器
+    队列已满时丢弃日志并计数，不阻塞业务线程
+    """
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped_count = 0
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+            metrics.LOG_DROPPED.inc()
+
+
+# 异步日志的后台监听线程和队列处理器
+_log_listener = None
+_queue_handler = None
 
 
 def setup_logger():
@@ -18,6 +72,8 @@ def setup_logger():
     配置日志系统
     :return: 配置好的logger对象
     """
+    global _log_listener, _queue_handler
+    
     logger = logging.getLogger('GrainMonitor')
     logger.setLevel(getattr(logging, LOG_CONFIG['level']))
     
@@ -39,48 +95,558 @@ def setup_logger():
     file_handler.setLevel(getattr(logging, LOG_CONFIG['level']))
     
     # 日志格式
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if LOG_CONFIG.get('format', 'text') == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
     
     # 添加处理器
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    if LOG_CONFIG.get('async', False):
+        # 业务线程只负责入队，由后台线程写控制台和文件
+        _queue_handler = DroppingQueueHandler(queue.Queue(LOG_CONFIG.get('queue_size', 10000)))
+        _log_listener = QueueListener(_queue_handler.queue, console_handler, file_handler,
+                                      respect_handler_level=True)
+        _log_listener.start()
+        atexit.register(shutdown_logger)
+        logger.addHandler(_queue_handler)
+    else:
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
     
     return logger
 
 
-def retry(max_retries=3, delay=1, backoff=2, exceptions=(Exception,)):
+def shutdown_logger():
+    """
+    停止异步日志的后台线程，写完队列中剩余的日志
+    """
+    global _log_listener
+    if _log_listener is None:
+        return
+    
+    listener, _log_listener = _log_listener, None
+    listener.stop()
+    
+    if _queue_handler is not None and _queue_handler.dropped_count:
+        # 监听线程已停止，直接写入各处理器
+        record = logging.LogRecord('GrainMonitor', logging.WARNING, __file__, 0,
+                                   f"日志队列已满，共丢弃 {_queue_handler.dropped_count} 条日志", None, None)
+        for handler in listener.handlers:
+            handler.handle(record)
+
+
+def get_dropped_log_count():
+    """
+    获取因日志队列已满而丢弃的日志数量
+    
+    :return: 丢弃的日志数量
+    """
+    return _queue_handler.dropped_count if _queue_handler is not None else 0
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    已超过本次监控任务的截止时间
     """
-    重试装饰器
+
+
+# 当前监控任务的截止时间（time.monotonic()时间戳），None表示不限制
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+
+@contextmanager
+def deadline_scope(seconds):
+    """
+    在代码块内设置截止时间，嵌套时取较早的截止时间
+    
+    :param seconds: 从现在起的秒数，为空或0时不限制
+    """
+    if not seconds:
+        yield
+        return
+    
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
     
-    :param max_retries: 最大重试次数
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """
+    获取距截止时间的剩余秒数
+    
+    :return: 剩余秒数（不小于0），未设置截止时间时返回None
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def deadline_timeout(timeout):
+    """
+    按剩余时间缩短请求超时
+    
+    :param timeout: 配置的超时时间（秒）
+    :return: 不超过剩余时间的超时时间
+    :raises DeadlineExceeded: 已超过截止时间
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("已超过本次监控任务的截止时间")
+    return min(timeout, remaining) if timeout else remaining
+
+
+def parse_retry_after(value):
+    """
+    解析Retry-After响应头
+    
+    :param value: 秒数或HTTP日期
+    :return: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    
+    from email.utils import parsedate_to_datetime
+    
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def get_retry_after(error):
+    """
+    从异常携带的HTTP响应（429/503）中获取Retry-After等待时间
+    
+    :param error: 异常对象
+    :return: 需要等待的秒数，没有时返回None
+    """
+    response = getattr(error, 'response', None)
+    if response is None or getattr(response, 'status_code', None) not in (429, 503):
+        return None
+    return parse_retry_after(response.headers.get('Retry-After'))
+
+
+class RetryPolicy:
+    """
+    重试策略
+    带抖动的指数退避，遵循Retry-After，并且不会等待到超过截止时间
+    未指定的参数使用MONITOR_CONFIG['request']中的配置
+    """
+    
+    def __init__(self, max_retries=None, delay=None, backoff=None, max_delay=None, jitter=None):
+        request_config = MONITOR_CONFIG.get('request', {})
+        self.max_retries = max_retries if max_retries is not None else request_config.get('retry_count', 3)
+        self.delay = delay if delay is not None else request_config.get('retry_delay', 2)
+        self.backoff = backoff if backoff is not None else request_config.get('retry_backoff', 2)
+        self.max_delay = max_delay if max_delay is not None else request_config.get('retry_max_delay', 30)
+        self.jitter = jitter if jitter is not None else request_config.get('retry_jitter', 0.5)
+        self.retry_after_max = request_config.get('retry_after_max', 120)
+    
+    def next_delay(self, attempt, error=None):
+        """
+        计算第attempt次失败后的等待时间
+        
+        :param attempt: 已失败的次数（从1开始）
+        :param error: 本次失败的异常（可选）
+        :return: 等待秒数
+        """
+        delay = min(self.delay * self.backoff ** (attempt - 1), self.max_delay)
+        if self.jitter:
+            # 在[1 - jitter, 1]倍之间随机，避免多个目标同时重试
+            delay *= 1 - self.jitter * random.random()
+        
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.retry_after_max))
+        return delay
+    
+    def on_failure(self, attempt, error, logger):
+        """
+        处理一次失败，决定是否重试
+        
+        :param attempt: 已失败的次数（从1开始）
+        :param error: 本次失败的异常
+        :param logger: 日志对象
+        :return: 需要等待的秒数，不再重试时返回None
+        """
+        if attempt >= self.max_retries:
+            logger.error(f"尝试 {attempt} 次后失败: {str(error)}")
+            return None
+        
+        delay = self.next_delay(attempt, error)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            logger.error(f"第 {attempt} 次尝试失败: {str(error)}, 剩余时间 {remaining:.1f} 秒不足以等待重试，放弃")
+            return None
+        
+        logger.warning(f"第 {attempt} 次尝试失败: {str(error)}, 等待 {delay:.1f} 秒后重试")
+        return delay
+
+
+def retry(max_retries=None, delay=None, backoff=None, exceptions=(Exception,), max_delay=None, jitter=None):
+    """
+    重试装饰器，同时支持普通函数和协程函数
+    
+    未指定的参数使用MONITOR_CONFIG['request']中的retry_*配置；
+    等待时间带随机抖动，遵循429/503响应的Retry-After，且不会超过当前监控任务的截止时间
+    
+    :param max_retries: 最大尝试次数
     :param delay: 初始延迟（秒）
     :param backoff: 延迟增长倍数
     :param exceptions: 捕获的异常类型
+    :param max_delay: 最大延迟（秒）
+    :param jitter: 随机抖动比例（0-1）
     :return: 装饰后的函数
     """
     def decorator(func):
+        # 装饰时获取一次logger，避免每次调用都重新获取；日志处理器由程序入口配置
+        logger = logging.getLogger('GrainMonitor')
+        
+        def on_failure(attempt, error):
+            # 每次调用时读取配置，运行期间修改的配置也能生效
+            policy = RetryPolicy(max_retries, delay, backoff, max_delay, jitter)
+            wait = policy.on_failure(attempt, error, logger)
+            if wait is not None:
+                metrics.RETRIES.inc(target=metrics.current_target(), func=func.__name__)
+            return wait
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                attempt = 0
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        attempt += 1
+                        wait = on_failure(attempt, e)
+                        if wait is None:
+                            raise
+                        import asyncio
+                        await asyncio.sleep(wait)
+            return async_wrapper
+        
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            logger = setup_logger()
-            current_delay = delay
-            
-            for attempt in range(max_retries):
+            attempt = 0
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"尝试 {max_retries} 次后失败: {str(e)}")
+                    attempt += 1
+                    wait = on_failure(attempt, e)
+                    if wait is None:
                         raise
-                    
-                    logger.warning(f"第 {attempt + 1} 次尝试失败: {str(e)}, 等待 {current_delay} 秒后重试")
-                    time.sleep(current_delay)
-                    current_delay *= backoff
+                    time.sleep(wait)
         return wrapper
     return decorator
 
 
+class CircuitOpenError(Exception):
+    """
+    熔断器处于打开状态，请求被直接拒绝
+    """
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    连续失败达到阈值后打开，打开期间直接拒绝请求；
+    超过恢复时间后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, reset_timeout=60):
+        """
+        :param name: 名称（通常为主机名）
+        :param failure_threshold: 连续失败多少次后打开
+        :param reset_timeout: 打开多少秒后允许探测
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+    
+    def before_call(self):
+        """
+        请求前检查是否放行
+        
+        :raises CircuitOpenError: 熔断器打开或半开状态下已有探测请求
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            
+            if self.state == self.OPEN:
+                wait = self.opened_at + self.reset_timeout - time.monotonic()
+                if wait > 0:
+                    raise CircuitOpenError(f"主机 {self.name} 熔断中，{wait:.0f} 秒后重新探测")
+                self.state = self.HALF_OPEN
+                self._probing = False
+            
+            if self._probing:
+                raise CircuitOpenError(f"主机 {self.name} 熔断探测中")
+            self._probing = True
+    
+    def release(self):
+        """
+        请求未实际发出时调用，释放半开状态的探测名额
+        """
+        with self._lock:
+            self._probing = False
+    
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+        if recovered:
+            logging.getLogger('GrainMonitor').info(f"主机 {self.name} 探测成功，熔断器已关闭")
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            opened = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != self.OPEN
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+        if opened:
+            logging.getLogger('GrainMonitor').warning(f"主机 {self.name} 连续失败 {self.failures} 次，熔断 {self.reset_timeout} 秒")
+
+
+class CircuitBreakerRegistry:
+    """
+    按主机管理熔断器
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+    
+    def get(self, host):
+        """
+        获取主机对应的熔断器
+        
+        :param host: 主机名
+        :return: CircuitBreaker对象，未启用熔断时返回None
+        """
+        config = MONITOR_CONFIG.get('request', {}).get('circuit_breaker', {})
+        if not config.get('enabled', False):
+            return None
+        
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(host)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        host,
+                        config.get('failure_threshold', 5),
+                        config.get('reset_timeout', 60)
+                    )
+                    self._breakers[host] = breaker
+        return breaker
+    
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+# 进程内共享的主机熔断器
+circuit_breakers = CircuitBreakerRegistry()
+
+
+class RateLimiter:
+    """
+    令牌桶限流器（GCRA实现）
+    每个请求按到达顺序预约发送时间，同一主机的请求先到先发，多个目标公平排队；
+    启用自适应时遇到限流响应将速率减半，连续成功后逐步提高，直到max_rate
+    """
+    
+    def __init__(self, name, rate, burst=1, min_rate=None, max_rate=None, adaptive=False, increase_step=0.05):
+        """
+        :param name: 名称（通常为主机名）
+        :param rate: 初始速率（请求/秒）
+        :param burst: 允许的突发请求数
+        :param min_rate: 自适应时的最低速率
+        :param max_rate: 自适应时的最高速率
+        :param adaptive: 是否根据限流响应自动调整速率
+        :param increase_step: 每次成功后提高的速率
+        """
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self.min_rate = float(min_rate) if min_rate else self.rate
+        self.max_rate = float(max_rate) if max_rate else self.rate
+        self.adaptive = adaptive
+        self.increase_step = increase_step
+        
+        self._lock = threading.Lock()
+        # 理论到达时间：按当前速率，下一个请求在不突发的情况下最早可以发送的时间
+        self._tat = 0.0
+    
+    def _reserve(self, max_wait=None):
+        """
+        预约一个发送时间
+        
+        :param max_wait: 最长可等待时间（秒），None表示不限制
+        :return: 需要等待的秒数，超过max_wait时不预约并返回None
+        """
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tat = max(self._tat, now)
+            wait = max(tat - (self.burst - 1) * interval - now, 0.0)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tat = tat + interval
+            return wait
+    
+    def acquire(self):
+        """
+        等待直到允许发送请求
+        
+        :return: 实际等待的秒数
+        :raises DeadlineExceeded: 等待时间将超过当前监控任务的截止时间
+        """
+        wait = self._reserve(remaining_time())
+        if wait is None:
+            raise DeadlineExceeded(f"主机 {self.name} 限流等待将超过本次监控任务的截止时间")
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self):
+        """
+        acquire的协程版本
+        
+        :return: 实际等待的秒数
+        """
+        wait = self._reserve(remaining_time())
+        if wait is None:
+            raise DeadlineExceeded(f"主机 {self.name} 限流等待将超过本次监控任务的截止时间")
+        if wait > 0:
+            import asyncio
+            await asyncio.sleep(wait)
+        return wait
+    
+    def on_throttled(self):
+        """
+        收到限流响应（429/503）时调用，速率减半
+        """
+        if not self.adaptive:
+            return
+        with self._lock:
+            previous = self.rate
+            self.rate = max(self.rate / 2, self.min_rate)
+        if self.rate < previous:
+            logging.getLogger('GrainMonitor').warning(f"主机 {self.name} 返回限流响应，请求速率降至 {self.rate:.2f} 次/秒")
+    
+    def on_success(self):
+        """
+        请求成功时调用，逐步提高速率
+        """
+        if not self.adaptive or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.rate + self.increase_step, self.max_rate)
+
+
+class RateLimiterRegistry:
+    """
+    按主机管理限流器，配置为默认值与该主机配置的合并
+    限流器只在进程内共享，另行运行的进程（如--backfill）可按比例降低自身的速率
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters = {}
+        self.scale = 1.0
+    
+    def get(self, host):
+        """
+        获取主机对应的限流器
+        
+        :param host: 主机名
+        :return: RateLimiter对象，未启用限流时返回None
+        """
+        config = MONITOR_CONFIG.get('request', {}).get('rate_limit', {})
+        if not config.get('enabled', False):
+            return None
+        
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(host)
+                if limiter is None:
+                    options = dict(config.get('default', {}))
+                    options.update(config.get('domains', {}).get(host, {}))
+                    min_rate = options.get('min_rate')
+                    max_rate = options.get('max_rate')
+                    limiter = RateLimiter(
+                        host,
+                        options.get('rate', 2.0) * self.scale,
+                        options.get('burst', 1),
+                        min_rate * self.scale if min_rate is not None else None,
+                        max_rate * self.scale if max_rate is not None else None,
+                        options.get('adaptive', False),
+                        options.get('increase_step', 0.05) * self.scale
+                    )
+                    self._limiters[host] = limiter
+        return limiter
+    
+    def reset(self):
+        with self._lock:
+            self._limiters.clear()
+    
+    def set_scale(self, scale):
+        """
+        按比例调整本进程所有主机的速率（含自适应的上下限），已创建的限流器按新比例重建
+        
+        :param scale: 速率比例
+        :return: 原来的比例
+        """
+        with self._lock:
+            previous = self.scale
+            self.scale = scale
+            self._limiters.clear()
+        return previous
+
+
+# 进程内共享的主机限流器
+rate_limiters = RateLimiterRegistry()
+
+
 def validate_url(url):
     """
     验证URL是否有效
@@ -120,6 +686,97 @@ def extract_domain(url):
     return parsed.netloc
 
 
+class KeywordMatcher:
+    """
+    多关键词匹配器
+    基于Aho-Corasick自动机，一次扫描文本即可找出所有匹配的关键词
+    """
+    
+    def __init__(self, keywords):
+        # 去重并保持关键词原有顺序，匹配结果按此顺序返回
+        self.keywords = list(dict.fromkeys(kw for kw in keywords if kw))
+        
+        # 状态转移表、失败指针、每个状态命中的关键词序号
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        
+        self._build()
+    
+    def _build(self):
+        """
+        构建Trie树及失败指针
+        """
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+        
+        # 广度优先计算失败指针，并合并失败状态的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def match(self, text):
+        """
+        查找文本中出现的所有关键词
+        
+        :param text: 待检查文本
+        :return: 匹配的关键词列表（按关键词顺序）
+        """
+        if not text or not self.keywords:
+            return []
+        
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        
+        return [self.keywords[index] for index in sorted(found)]
+    
+    def __bool__(self):
+        return bool(self.keywords)
+
+
+@functools.lru_cache(maxsize=256)
+def _build_keyword_matcher(keywords):
+    return KeywordMatcher(keywords)
+
+
+def get_keyword_matcher(keywords):
+    """
+    获取关键词匹配器，相同的关键词集合只构建一次
+    
+    :param keywords: 关键词列表
+    :return: KeywordMatcher对象
+    """
+    return _build_keyword_matcher(tuple(keywords or ()))
+
+
 def filter_keywords(text, keywords):
     """
     检查文本是否包含关键词列表中的任何一个关键词
@@ -131,5 +788,4 @@ def filter_keywords(text, keywords):
     if not keywords:
         return []
     
-    matched_keywords = [kw for kw in keywords if kw in text]
-    return matched_keywords
+    return get_keyword_matcher(keywords).match(text)